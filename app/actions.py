@@ -8,42 +8,158 @@ Dependencies:
 - `Session` (class): Session class from the `sqlalchemy.orm` module.
 - `models` (module): Database models.
 - `schemas` (module): Pydantic schemas for data validation.
-- `get_pokemon_name` (function): Function from the `utils.pokeapi` module.
+- `get_cached_pokemon_name` (function): Function from the `utils.pokeapi` module.
+
+The list queries accept an `after_id` for keyset pagination: when it is
+given, `skip` is ignored and the rows with `id > after_id` are returned
+in id order, so a deep page costs the same as the first one.
+
+The trainer queries load the inventory and the pokemons eagerly, so that
+serializing trainers does not issue one query per trainer and relationship.
 
 1. **Trainer Operations:**
     - `get_trainer(database: Session, trainer_id: int):`
         - Find a trainer by their ID.
     - `get_trainer_by_name(database: Session, name: str):`
         - Find a trainer by their name.
-    - `get_trainers(database: Session, skip: int = 0, limit: int = 100):`
+    - `trainer_exists(database: Session, trainer_id: int):`
+        - Check that a trainer exists, without loading it.
+    - `get_trainers(database: Session, skip: int = 0, limit: int = 100, after_id: int = None):`
         - Find all trainers.
+    - `get_trainer_rows(database: Session, skip: int = 0, limit: int = 100, after_id: int = None):`
+        - Find all trainers, as dicts shaped like `schemas.Trainer`.
+    - `search_trainers(database: Session, terms: str, skip: int = 0, limit: int = 100):`
+        - Find the trainers matching search terms, best match first, as dicts
+          shaped like `schemas.Trainer`.
     - `create_trainer(database: Session, trainer: schemas.TrainerCreate):`
         - Create a new trainer.
+    - `iter_trainers(database: Session, batch_size: int = EXPORT_BATCH_SIZE):`
+        - Iterate over all trainers, with their inventory and Pokemon.
+    - `get_trainer_team(database: Session, trainer_id: int):`
+        - Find the `api_id` of the Pokemon and the count of each item of a trainer.
 
 2. **Pokemon Operations:**
-    - `add_trainer_pokemon(database: Session, pokemon: schemas.PokemonCreate, trainer_id: int):`
+    - `add_trainer_pokemon(database: Session, pokemon: schemas.PokemonCreate, trainer_id: int,
+      name: str = None):`
         - Create a Pokemon and link it to a trainer.
+    - `add_trainer_pokemons(database: Session, pokemons: List[schemas.PokemonCreate],
+      names: Dict[int, str], trainer_id: int):`
+        - Create several Pokemon in one transaction and link them to a trainer.
+    - `fill_pokemon_names(database: Session, names: Dict[int, str]):`
+        - Set the name of the Pokemon created before their name was known.
+    - `missing_pokemon_names(database: Session):`
+        - Find the `api_id` of the Pokemon still waiting for their name.
     - `get_pokemon(database: Session, pokemon_id: int):`
         - Find a Pokemon by its ID.
-    - `get_pokemons(database: Session, skip: int = 0, limit: int = 100):`
+    - `get_pokemons(database: Session, skip: int = 0, limit: int = 100, after_id: int = None):`
         - Find all Pokemon.
+    - `get_pokemon_rows(database: Session, skip: int = 0, limit: int = 100, after_id: int = None):`
+        - Find all Pokemon, as dicts shaped like `schemas.Pokemon`.
+    - `iter_pokemons(database: Session, batch_size: int = EXPORT_BATCH_SIZE):`
+        - Iterate over all Pokemon.
 
 3. **Item Operations:**
     - `add_trainer_item(database: Session, item: schemas.ItemCreate, trainer_id: int):`
         - Create an item and link it to a trainer.
-    - `get_items(database: Session, skip: int = 0, limit: int = 100):`
+    - `add_trainer_items(database: Session, items: List[schemas.ItemCreate], trainer_id: int):`
+        - Create several items in one transaction and link them to a trainer.
+    - `get_items(database: Session, skip: int = 0, limit: int = 100, after_id: int = None):`
         - Find all items.
+    - `get_item_rows(database: Session, skip: int = 0, limit: int = 100, after_id: int = None):`
+        - Find all items, as dicts shaped like `schemas.Item`.
+    - `iter_items(database: Session, batch_size: int = EXPORT_BATCH_SIZE):`
+        - Iterate over all items.
+
+The `iter_*` functions stream the rows from a server-side cursor, in
+batches of `batch_size` rows, so a full-table export keeps a flat memory use.
+
+The Pokemon are inserted without waiting for the PokeAPI: their name comes
+from the local PokeAPI data when it is known, otherwise it is left empty
+and filled later by `fill_pokemon_names` (see `utils.name_resolver`).
+
+The `get_*_rows` functions select only the columns of the response schema
+and return plain dicts, with the keys in the order of the schema fields,
+so the list endpoints can encode them without building ORM objects and
+validating them with Pydantic.
+
+`search_trainers` reads the FTS5 index `models.SEARCH_TABLE`: each word
+of the terms matches the words starting with it, in the trainer name or in
+the custom names of their pokemons. The results are ranked with bm25, a
+match in the name weighing more (`SEARCH_WEIGHTS`).
 """
-from sqlalchemy.orm import Session
+import re
+from typing import Dict, List, Optional
+from sqlalchemy import func, insert, text, update
+from sqlalchemy.orm import Session, joinedload, selectinload
+from sqlalchemy.orm.attributes import set_committed_value
 from . import models, schemas
-from .utils.pokeapi import get_pokemon_name
+from .utils.pokeapi import get_cached_pokemon_name
+
+EXPORT_BATCH_SIZE = 500
+
+# A match in the trainer name weighs more than one in a pokemon custom name
+SEARCH_WEIGHTS = (10.0, 1.0)
+SEARCH_STATEMENT = text(
+    f"SELECT rowid FROM {models.SEARCH_TABLE} WHERE {models.SEARCH_TABLE} MATCH :query "
+    f"ORDER BY bm25({models.SEARCH_TABLE}, {', '.join(map(str, SEARCH_WEIGHTS))}), rowid "
+    "LIMIT :limit OFFSET :skip"
+)
+
+
+def paginate(query, model, skip: int, limit: int, after_id: Optional[int] = None):
+    """
+        Apply skip/limit pagination, or keyset pagination if after_id is given
+    """
+    if after_id is not None:
+        return query.filter(model.id > after_id).order_by(model.id).limit(limit)
+    return query.offset(skip).limit(limit)
+
+
+def schema_columns(model, schema):
+    """
+        Return the columns of a model that are fields of a response schema
+    """
+    columns = model.__table__.columns
+    return [getattr(model, name) for name in schema.__fields__ if name in columns]
+
+
+def row_dicts(rows):
+    """
+        Convert the rows of a column query to dicts
+    """
+    return [row._asdict() for row in rows]  # pylint: disable=protected-access
+
+
+def stream(query, model, batch_size: int):
+    """
+        Iterate over the rows of a query from a server-side cursor, in id order
+    """
+    return (
+        query.order_by(model.id)
+        .execution_options(stream_results=True)
+        .yield_per(batch_size)
+    )
 
 
 def get_trainer(database: Session, trainer_id: int):
     """
         Find a user by his id
+        The pokemons are joined, the inventory is loaded in a second query
+    """
+    return (
+        database.query(models.Trainer)
+        .options(joinedload(models.Trainer.pokemons), selectinload(models.Trainer.inventory))
+        .filter(models.Trainer.id == trainer_id)
+        .first()
+    )
+
+
+def trainer_exists(database: Session, trainer_id: int):
+    """
+        Check that a user exists
     """
-    return database.query(models.Trainer).filter(models.Trainer.id == trainer_id).first()
+    query = database.query(models.Trainer.id).filter(models.Trainer.id == trainer_id)
+    return query.first() is not None
 
 
 def get_trainer_by_name(database: Session, name: str):
@@ -53,37 +169,200 @@ def get_trainer_by_name(database: Session, name: str):
     return database.query(models.Trainer).filter(models.Trainer.name == name).all()
 
 
-def get_trainers(database: Session, skip: int = 0, limit: int = 100):
+def get_trainers(database: Session, skip: int = 0, limit: int = 100,
+                 after_id: Optional[int] = None):
     """
         Find all users
         Default limit is 100
+        The inventories and the pokemons are loaded in one query each
+    """
+    query = database.query(models.Trainer).options(
+        selectinload(models.Trainer.inventory), selectinload(models.Trainer.pokemons)
+    )
+    return paginate(query, models.Trainer, skip, limit, after_id).all()
+
+
+def get_trainer_rows(database: Session, skip: int = 0, limit: int = 100,
+                     after_id: Optional[int] = None):
+    """
+        Find all users, as dicts with their inventory and pokemons
+        One query for the trainers, then one for each relationship
+    """
+    query = database.query(*schema_columns(models.Trainer, schemas.Trainer))
+    return with_relationship_rows(
+        database, row_dicts(paginate(query, models.Trainer, skip, limit, after_id)))
+
+
+def with_relationship_rows(database: Session, trainers: List[dict]):
+    """
+        Add the inventory and the pokemons, as dicts, to trainer dicts
+        One query for each relationship
+    """
+    by_id = {}
+    for trainer in trainers:
+        trainer["inventory"], trainer["pokemons"] = [], []
+        by_id[trainer["id"]] = trainer
+    if by_id:
+        for model, schema, field in ((models.Item, schemas.Item, "inventory"),
+                                     (models.Pokemon, schemas.Pokemon, "pokemons")):
+            rows = (database.query(*schema_columns(model, schema))
+                    .filter(model.trainer_id.in_(by_id)).order_by(model.id))
+            for row in row_dicts(rows):
+                by_id[row["trainer_id"]][field].append(row)
+    return trainers
+
+
+def search_query(terms: str):
+    """
+        Build an FTS5 query matching every word of the search terms as a prefix
+        Return None if there is no word
+    """
+    words = re.findall(r"\w+", terms)
+    if not words:
+        return None
+    return " ".join(f'"{word}"*' for word in words)
+
+
+def search_trainers(database: Session, terms: str, skip: int = 0, limit: int = 100):
+    """
+        Find the trainers whose name or pokemon custom names match the terms,
+        best match first, as dicts with their inventory and pokemons
+    """
+    query = search_query(terms)
+    if query is None:
+        return []
+    ids = [trainer_id for (trainer_id,) in database.execute(
+        SEARCH_STATEMENT, {"query": query, "skip": skip, "limit": limit})]
+    if not ids:
+        return []
+    rows = (database.query(*schema_columns(models.Trainer, schemas.Trainer))
+            .filter(models.Trainer.id.in_(ids)))
+    by_id = {row["id"]: row for row in row_dicts(rows)}
+    return with_relationship_rows(database, [by_id[trainer_id] for trainer_id in ids
+                                             if trainer_id in by_id])
+
+
+def iter_trainers(database: Session, batch_size: int = EXPORT_BATCH_SIZE):
+    """
+        Iterate over all users, batch by batch
+        The inventories and the pokemons are loaded once per batch
+    """
+    query = database.query(models.Trainer).options(
+        selectinload(models.Trainer.inventory), selectinload(models.Trainer.pokemons)
+    )
+    return stream(query, models.Trainer, batch_size)
+
+
+def get_trainer_team(database: Session, trainer_id: int):
     """
-    return database.query(models.Trainer).offset(skip).limit(limit).all()
+        Find the pokemon api_ids and the item counts by name of a user
+        Return None if the user does not exist
+    """
+    if not trainer_exists(database, trainer_id):
+        return None
+    api_ids = [api_id for (api_id,) in database.query(models.Pokemon.api_id)
+               .filter(models.Pokemon.trainer_id == trainer_id).order_by(models.Pokemon.id)]
+    items = dict(database.query(models.Item.name, func.count())
+                 .filter(models.Item.trainer_id == trainer_id).group_by(models.Item.name))
+    return api_ids, items
 
 
-def create_trainer(database: Session):
+def create_trainer(database: Session, trainer: schemas.TrainerCreate):
     """
         Create a new trainer
     """
-    db_trainer = models.Trainer()
+    db_trainer = models.Trainer(**trainer.dict())
     database.add(db_trainer)
     database.commit()
     database.refresh(db_trainer)
+    # A new trainer owns nothing, no need to query the relationships
+    set_committed_value(db_trainer, "inventory", [])
+    set_committed_value(db_trainer, "pokemons", [])
     return db_trainer
 
 
-def add_trainer_pokemon(database: Session, pokemon: schemas.PokemonCreate, trainer_id: int):
+def add_trainer_pokemon(database: Session, pokemon: schemas.PokemonCreate, trainer_id: int,
+                        name: Optional[str] = None):
     """
         Create a pokemon and link it to a trainer
+        If the name is not given, it is read from the local pokeapi data,
+        and left empty if the pokemon is not known yet
     """
-    db_item = models.Pokemon(
-        **pokemon.dict(), name=get_pokemon_name(pokemon.api_id), trainer_id=trainer_id)
+    if name is None:
+        name = get_cached_pokemon_name(pokemon.api_id)
+    db_item = models.Pokemon(**pokemon.dict(), name=name, trainer_id=trainer_id)
     database.add(db_item)
     database.commit()
     database.refresh(db_item)
     return db_item
 
 
+def add_trainer_pokemons(database: Session, pokemons: List[schemas.PokemonCreate],
+                         names: Dict[int, str], trainer_id: int):
+    """
+        Create several pokemons in one transaction and link them to a trainer
+        names maps each api_id to the pokemon name, missing names are left empty
+    """
+    rows = [
+        {**pokemon.dict(), "name": names.get(pokemon.api_id), "trainer_id": trainer_id}
+        for pokemon in pokemons
+    ]
+    return bulk_insert(database, models.Pokemon, rows, trainer_id)
+
+
+def add_trainer_items(database: Session, items: List[schemas.ItemCreate], trainer_id: int):
+    """
+        Create several items in one transaction and link them to a trainer
+    """
+    rows = [{**item.dict(), "trainer_id": trainer_id} for item in items]
+    return bulk_insert(database, models.Item, rows, trainer_id)
+
+
+def bulk_insert(database: Session, model, rows: List[dict], trainer_id: int):
+    """
+        Insert rows of a trainer with a single executemany and commit
+        Return the created rows, in id order
+    """
+    if not rows:
+        return []
+    database.execute(insert(model), rows)
+    # The transaction holds the SQLite write lock until the commit,
+    # so the last ids of the trainer are the rows just inserted.
+    created = (
+        database.query(model)
+        .filter(model.trainer_id == trainer_id)
+        .order_by(model.id.desc())
+        .limit(len(rows))
+        .all()
+    )
+    # Detached rows keep their loaded values instead of being expired by the commit
+    database.expunge_all()
+    database.commit()
+    return created[::-1]
+
+
+def fill_pokemon_names(database: Session, names: Dict[int, str]):
+    """
+        Set the name of the pokemons created without one
+        names maps each api_id to the pokemon name
+    """
+    for api_id, name in names.items():
+        database.execute(
+            update(models.Pokemon)
+            .where(models.Pokemon.api_id == api_id, models.Pokemon.name.is_(None))
+            .values(name=name)
+        )
+    database.commit()
+
+
+def missing_pokemon_names(database: Session):
+    """
+        Find the api_id of the pokemons created without a name
+    """
+    rows = database.query(models.Pokemon.api_id).filter(models.Pokemon.name.is_(None)).distinct()
+    return [api_id for (api_id,) in rows]
+
+
 def add_trainer_item(database: Session, item: schemas.ItemCreate, trainer_id: int):
     """
         Create an item and link it to a trainer
@@ -95,12 +374,29 @@ def add_trainer_item(database: Session, item: schemas.ItemCreate, trainer_id: in
     return db_item
 
 
-def get_items(database: Session, skip: int = 0, limit: int = 100):
+def get_items(database: Session, skip: int = 0, limit: int = 100,
+              after_id: Optional[int] = None):
     """
         Find all items
         Default limit is 100
     """
-    return database.query(models.Item).offset(skip).limit(limit).all()
+    return paginate(database.query(models.Item), models.Item, skip, limit, after_id).all()
+
+
+def get_item_rows(database: Session, skip: int = 0, limit: int = 100,
+                  after_id: Optional[int] = None):
+    """
+        Find all items, as dicts
+    """
+    query = database.query(*schema_columns(models.Item, schemas.Item))
+    return row_dicts(paginate(query, models.Item, skip, limit, after_id))
+
+
+def iter_items(database: Session, batch_size: int = EXPORT_BATCH_SIZE):
+    """
+        Iterate over all items, batch by batch
+    """
+    return stream(database.query(models.Item), models.Item, batch_size)
 
 
 def get_pokemon(database: Session, pokemon_id: int):
@@ -110,9 +406,26 @@ def get_pokemon(database: Session, pokemon_id: int):
     return database.query(models.Pokemon).filter(models.Pokemon.id == pokemon_id).first()
 
 
-def get_pokemons(database: Session, skip: int = 0, limit: int = 100):
+def get_pokemons(database: Session, skip: int = 0, limit: int = 100,
+                 after_id: Optional[int] = None):
     """
         Find all pokemons
         Default limit is 100
     """
-    return database.query(models.Pokemon).offset(skip).limit(limit).all()
+    return paginate(database.query(models.Pokemon), models.Pokemon, skip, limit, after_id).all()
+
+
+def get_pokemon_rows(database: Session, skip: int = 0, limit: int = 100,
+                     after_id: Optional[int] = None):
+    """
+        Find all pokemons, as dicts
+    """
+    query = database.query(*schema_columns(models.Pokemon, schemas.Pokemon))
+    return row_dicts(paginate(query, models.Pokemon, skip, limit, after_id))
+
+
+def iter_pokemons(database: Session, batch_size: int = EXPORT_BATCH_SIZE):
+    """
+        Iterate over all pokemons, batch by batch
+    """
+    return stream(database.query(models.Pokemon), models.Pokemon, batch_size)
@@ -0,0 +1,204 @@
+"""
+Asynchronous Database Operations for Trainers, Pokemon, and Items.
+
+Async versions of the CRUD functions of `actions`, for `async def`
+endpoints using an `AsyncSession` (see `utils.get_async_db`).
+
+Each function runs the matching function of `actions` through
+`AsyncSession.run_sync`, so the queries, the eager loading and the
+pagination are shared with the synchronous functions and the database
+is awaited through aiosqlite instead of blocking a threadpool worker.
+
+Dependencies:
+- `AsyncSession` (class): Session class from the `sqlalchemy.ext.asyncio` module.
+- `actions` (module): Synchronous database operations.
+- `schemas` (module): Pydantic schemas for data validation.
+- `name_resolver` (module): Background worker resolving the Pokemon names.
+- `anyio`: Read the locally known Pokemon names in a worker thread, so a
+  write never waits on the on-disk PokeAPI store.
+
+1. **Trainer Operations:**
+    - `get_trainer(database, trainer_id)`
+    - `trainer_exists(database, trainer_id)`
+    - `get_trainer_by_name(database, name)`
+    - `get_trainers(database, skip, limit, after_id)`
+    - `get_trainer_rows(database, skip, limit, after_id)`
+    - `search_trainers(database, terms, skip, limit)`
+    - `get_trainer_team(database, trainer_id)`
+    - `create_trainer(database, trainer)`
+
+2. **Pokemon Operations:**
+    - `add_trainer_pokemon(database, pokemon, trainer_id)`
+    - `add_trainer_pokemons(database, pokemons, trainer_id)`
+    - `get_pokemon(database, pokemon_id)`
+    - `get_pokemons(database, skip, limit, after_id)`
+    - `get_pokemon_rows(database, skip, limit, after_id)`
+
+3. **Item Operations:**
+    - `add_trainer_item(database, item, trainer_id)`
+    - `add_trainer_items(database, items, trainer_id)`
+    - `get_items(database, skip, limit, after_id)`
+    - `get_item_rows(database, skip, limit, after_id)`
+"""
+from typing import List, Optional
+import anyio
+from sqlalchemy.ext.asyncio import AsyncSession
+from . import actions, schemas
+from .utils.name_resolver import NAME_RESOLVER
+from .utils.pokeapi import get_cached_pokemon_name
+
+
+async def get_trainer(database: AsyncSession, trainer_id: int):
+    """
+        Find a user by his id
+    """
+    return await database.run_sync(actions.get_trainer, trainer_id)
+
+
+async def trainer_exists(database: AsyncSession, trainer_id: int):
+    """
+        Check that a user exists
+    """
+    return await database.run_sync(actions.trainer_exists, trainer_id)
+
+
+async def get_trainer_by_name(database: AsyncSession, name: str):
+    """
+        Find a user by his name
+    """
+    return await database.run_sync(actions.get_trainer_by_name, name)
+
+
+async def get_trainers(database: AsyncSession, skip: int = 0, limit: int = 100,
+                       after_id: Optional[int] = None):
+    """
+        Find all users
+        Default limit is 100
+    """
+    return await database.run_sync(actions.get_trainers, skip, limit, after_id)
+
+
+async def get_trainer_rows(database: AsyncSession, skip: int = 0, limit: int = 100,
+                           after_id: Optional[int] = None):
+    """
+        Find all users, as dicts
+        Default limit is 100
+    """
+    return await database.run_sync(actions.get_trainer_rows, skip, limit, after_id)
+
+
+async def search_trainers(database: AsyncSession, terms: str, skip: int = 0, limit: int = 100):
+    """
+        Find the users matching search terms, best match first, as dicts
+    """
+    return await database.run_sync(actions.search_trainers, terms, skip, limit)
+
+
+async def get_trainer_team(database: AsyncSession, trainer_id: int):
+    """
+        Find the pokemon api_ids and the item counts by name of a user
+    """
+    return await database.run_sync(actions.get_trainer_team, trainer_id)
+
+
+async def create_trainer(database: AsyncSession, trainer: schemas.TrainerCreate):
+    """
+        Create a new trainer
+    """
+    return await database.run_sync(actions.create_trainer, trainer)
+
+
+async def add_trainer_pokemon(database: AsyncSession, pokemon: schemas.PokemonCreate,
+                              trainer_id: int):
+    """
+        Create a pokemon and link it to a trainer
+        An unknown name is resolved in the background
+    """
+    names = await get_cached_pokemon_names([pokemon.api_id])
+    [db_pokemon] = await database.run_sync(actions.add_trainer_pokemons, [pokemon], names,
+                                           trainer_id)
+    if db_pokemon.name is None:
+        NAME_RESOLVER.schedule(db_pokemon.api_id)
+    return db_pokemon
+
+
+async def add_trainer_pokemons(database: AsyncSession, pokemons: List[schemas.PokemonCreate],
+                               trainer_id: int):
+    """
+        Create several pokemons in one transaction and link them to a trainer
+        The unknown names are resolved in the background
+    """
+    names = await get_cached_pokemon_names([pokemon.api_id for pokemon in pokemons])
+    db_pokemons = await database.run_sync(actions.add_trainer_pokemons, pokemons, names,
+                                          trainer_id)
+    for api_id, name in names.items():
+        if name is None:
+            NAME_RESOLVER.schedule(api_id)
+    return db_pokemons
+
+
+async def get_cached_pokemon_names(api_ids: List[int]):
+    """
+        Map each api_id to its locally known name, or None
+        A miss of the in-process cache reads the on-disk store, in a worker thread
+    """
+    return await anyio.to_thread.run_sync(
+        lambda: {api_id: get_cached_pokemon_name(api_id) for api_id in api_ids})
+
+
+async def add_trainer_item(database: AsyncSession, item: schemas.ItemCreate, trainer_id: int):
+    """
+        Create an item and link it to a trainer
+    """
+    return await database.run_sync(actions.add_trainer_item, item, trainer_id)
+
+
+async def add_trainer_items(database: AsyncSession, items: List[schemas.ItemCreate],
+                            trainer_id: int):
+    """
+        Create several items in one transaction and link them to a trainer
+    """
+    return await database.run_sync(actions.add_trainer_items, items, trainer_id)
+
+
+async def get_items(database: AsyncSession, skip: int = 0, limit: int = 100,
+                    after_id: Optional[int] = None):
+    """
+        Find all items
+        Default limit is 100
+    """
+    return await database.run_sync(actions.get_items, skip, limit, after_id)
+
+
+async def get_item_rows(database: AsyncSession, skip: int = 0, limit: int = 100,
+                        after_id: Optional[int] = None):
+    """
+        Find all items, as dicts
+        Default limit is 100
+    """
+    return await database.run_sync(actions.get_item_rows, skip, limit, after_id)
+
+
+async def get_pokemon(database: AsyncSession, pokemon_id: int):
+    """
+        Find a pokemon by his id
+    """
+    return await database.run_sync(actions.get_pokemon, pokemon_id)
+
+
+async def get_pokemons(database: AsyncSession, skip: int = 0, limit: int = 100,
+                       after_id: Optional[int] = None):
+    """
+        Find all pokemons
+        Default limit is 100
+    """
+    return await database.run_sync(actions.get_pokemons, skip, limit, after_id)
+
+
+async def get_pokemon_rows(database: AsyncSession, skip: int = 0, limit: int = 100,
+                           after_id: Optional[int] = None):
+    """
+        Find all pokemons, as dicts
+        Default limit is 100
+    """
+    return await database.run_sync(actions.get_pokemon_rows, skip, limit, after_id)
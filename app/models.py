@@ -5,10 +5,9 @@ This module defines SQLAlchemy models for representing trainers,
 Pokemon, and items in the database.
 
 Dependencies:
-- `dataclasses` (module): Module providing a decorator and functions 
-for defining data classes.
 - `Column` (class): Column class from the `sqlalchemy` module.
 - `ForeignKey` (class): ForeignKey class from the `sqlalchemy` module.
+- `Index` (class): Index class from the `sqlalchemy` module.
 - `Integer` (class): Integer class from the `sqlalchemy` module.
 - `String` (class): String class from the `sqlalchemy` module.
 - `Date` (class): Date class from the `sqlalchemy` module.
@@ -41,28 +40,53 @@ for defining data classes.
         - `description` (str): Item's description.
         - `trainer_id` (int): Foreign key referencing the Trainer model.
         - `trainer` (relationship): Many-to-One relationship with Trainer.
+
+4. **Indexes:**
+    - Only the query patterns of `actions` are indexed, an unused index
+      only slows down the writes (the primary keys are the rowids).
+    - `ix_trainers_name`: Trainers by name.
+    - `ix_items_trainer_id_id` and `ix_pokemons_trainer_id_id`: Foreign
+      key lookups (relationship loads, bulk inserts), in id order, so a
+      trainer's items and pokemons can be paginated by cursor.
+    - `ix_pokemons_unnamed_api_id`: Partial index of the pokemons whose
+      name is not resolved yet, by api_id (see `utils.name_resolver`).
+    - `sync_indexes(bind)`: Bring the indexes of an existing database in
+      line with the models, `create_all` only creates those of new tables:
+      create the missing ones and drop the `OBSOLETE_INDEXES`, the indexes
+      the models used to declare. Other indexes, added by hand, are kept.
+      Run explicitly with `python -m app.utils.migrate`, never on import.
+
+5. **Trainer Search Index:**
+    - `trainer_search`: FTS5 table with one row per trainer (the rowid is
+      the trainer id), holding its `name` and the `custom_names` of its
+      pokemons. The tokens are case and accent insensitive, with prefix
+      indexes of 2 and 3 characters for the prefix queries.
+    - Kept in sync by triggers on `trainers` and `pokemons`: a new pokemon
+      appends its custom name, an update or a delete rebuilds the custom
+      names of the trainer from its pokemons.
+    - `create_search_index(connection)`: Create the table and its triggers,
+      and index the existing trainers. Run by `create_all`, it does nothing
+      when the table exists.
 """
 
-import dataclasses
-from sqlalchemy import Column, ForeignKey, Integer, String, Date
+from sqlalchemy import (Column, ForeignKey, Index, Integer, MetaData, String, Date, Table, event,
+                        inspect)
 from sqlalchemy.orm import relationship
 from .sqlite import Base
 
-@dataclasses.dataclass
 class Trainer(Base):
     """
         Class representing a pokemon trainer
     """
     __tablename__ = "trainers"
 
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True)
     name = Column(String, index=True)
     birthdate = Column(Date)
 
     inventory = relationship("Item", back_populates="trainer")
     pokemons = relationship("Pokemon", back_populates="trainer")
 
-@dataclasses.dataclass
 class Pokemon(Base):
     """
         Class representing a pokemon
@@ -72,24 +96,113 @@ class Pokemon(Base):
     """
     __tablename__ = "pokemons"
 
-    id = Column(Integer, primary_key=True, index=True)
-    api_id = Column(Integer, index=True)
-    name = Column(String, index=True)
-    custom_name = Column(String, index=True)
+    id = Column(Integer, primary_key=True)
+    api_id = Column(Integer)
+    name = Column(String)
+    custom_name = Column(String)
     trainer_id = Column(Integer, ForeignKey("trainers.id"))
 
     trainer = relationship("Trainer", back_populates="pokemons")
 
-@dataclasses.dataclass
+    __table_args__ = (
+        Index("ix_pokemons_trainer_id_id", "trainer_id", "id"),
+        Index("ix_pokemons_unnamed_api_id", "api_id", sqlite_where=name.is_(None)),
+    )
+
 class Item(Base):
     """
         Class representing a pokemon trainer
     """
     __tablename__ = "items"
 
-    id = Column(Integer, primary_key=True, index=True)
-    name = Column(String, index=True)
-    description = Column(String, index=True)
+    id = Column(Integer, primary_key=True)
+    name = Column(String)
+    description = Column(String)
     trainer_id = Column(Integer, ForeignKey("trainers.id"))
 
     trainer = relationship("Trainer", back_populates="inventory")
+
+    __table_args__ = (
+        Index("ix_items_trainer_id_id", "trainer_id", "id"),
+    )
+
+
+# Indexes declared by earlier versions of the models
+OBSOLETE_INDEXES = frozenset({
+    "ix_trainers_id",
+    "ix_items_id", "ix_items_name", "ix_items_description",
+    "ix_pokemons_id", "ix_pokemons_api_id", "ix_pokemons_name", "ix_pokemons_custom_name",
+})
+
+
+def sync_indexes(bind):
+    """
+        Create the missing indexes of the models on an existing database,
+        and drop the obsolete ones
+    """
+    inspector = inspect(bind)
+    for table in Base.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        declared = {index.name: index for index in table.indexes}
+        existing = Table(table.name, MetaData(), autoload_with=bind).indexes
+        for index in existing:
+            if index.name in OBSOLETE_INDEXES:
+                index.drop(bind)
+        for name in declared.keys() - {index.name for index in existing}:
+            declared[name].create(bind)
+
+
+SEARCH_TABLE = "trainer_search"
+
+SEARCH_INDEX_DDL = [
+    f"""CREATE VIRTUAL TABLE {SEARCH_TABLE} USING fts5(
+        name, custom_names, tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')""",
+    f"""CREATE TRIGGER {SEARCH_TABLE}_trainer_insert AFTER INSERT ON trainers BEGIN
+        INSERT INTO {SEARCH_TABLE}(rowid, name, custom_names) VALUES (new.id, new.name, '');
+    END""",
+    f"""CREATE TRIGGER {SEARCH_TABLE}_trainer_update AFTER UPDATE OF name ON trainers BEGIN
+        UPDATE {SEARCH_TABLE} SET name = new.name WHERE rowid = new.id;
+    END""",
+    f"""CREATE TRIGGER {SEARCH_TABLE}_trainer_delete AFTER DELETE ON trainers BEGIN
+        DELETE FROM {SEARCH_TABLE} WHERE rowid = old.id;
+    END""",
+    f"""CREATE TRIGGER {SEARCH_TABLE}_pokemon_insert AFTER INSERT ON pokemons
+        WHEN new.custom_name IS NOT NULL BEGIN
+        UPDATE {SEARCH_TABLE} SET custom_names = custom_names || ' ' || new.custom_name
+        WHERE rowid = new.trainer_id;
+    END""",
+    f"""CREATE TRIGGER {SEARCH_TABLE}_pokemon_update
+        AFTER UPDATE OF custom_name, trainer_id ON pokemons BEGIN
+        UPDATE {SEARCH_TABLE} SET custom_names = (
+            SELECT coalesce(group_concat(custom_name, ' '), '') FROM pokemons
+            WHERE trainer_id = {SEARCH_TABLE}.rowid
+        ) WHERE rowid IN (old.trainer_id, new.trainer_id);
+    END""",
+    f"""CREATE TRIGGER {SEARCH_TABLE}_pokemon_delete AFTER DELETE ON pokemons BEGIN
+        UPDATE {SEARCH_TABLE} SET custom_names = (
+            SELECT coalesce(group_concat(custom_name, ' '), '') FROM pokemons
+            WHERE trainer_id = {SEARCH_TABLE}.rowid
+        ) WHERE rowid = old.trainer_id;
+    END""",
+    f"""INSERT INTO {SEARCH_TABLE}(rowid, name, custom_names)
+        SELECT trainers.id, trainers.name, (
+            SELECT coalesce(group_concat(custom_name, ' '), '') FROM pokemons
+            WHERE trainer_id = trainers.id
+        ) FROM trainers""",
+]
+
+
+def create_search_index(connection):
+    """
+        Create the trainer search index and its triggers if they do not exist
+    """
+    if inspect(connection).has_table(SEARCH_TABLE):
+        return
+    for statement in SEARCH_INDEX_DDL:
+        connection.exec_driver_sql(statement)
+
+
+@event.listens_for(Base.metadata, "after_create")
+def _create_search_index(target, connection, **kwargs):  # pylint: disable=unused-argument
+    create_search_index(connection)
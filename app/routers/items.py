@@ -6,7 +6,7 @@ It includes the following endpoints:
 
 - GET /: Retrieve a list of items with optional pagination.
 - Dependencies:
-  - database: Session dependency to interact with the database.
+  - database: AsyncSession dependency to interact with the database.
   - actions: Functions for handling item-related actions.
   - schemas: Data models (schemas) used by the API.
 
@@ -14,26 +14,50 @@ Endpoint Details:
 - GET /:
   - Returns a list of items.
   - Default limit is set to 100.
+  - Pass `cursor` (empty for the first page) to paginate by id instead of
+    `skip`; the cursor of the next page is sent in the `X-Next-Cursor` header.
+  - The items are read as dicts and encoded with orjson, without Pydantic.
+- GET /export:
+  - Streams every item as NDJSON, one item per line.
 
 """
 
-from typing import List
+from typing import List, Optional
 
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from fastapi import APIRouter, Depends, HTTPException
-from ..utils.utils import get_db
-from .. import actions, schemas
+from fastapi.responses import ORJSONResponse
+from ..utils.utils import get_async_db, get_db, ndjson_response
+from ..utils.pagination import cursor_after_id, set_next_cursor
+from .. import actions, async_actions, schemas
 
 router = APIRouter()
 
 @router.get("/", response_model=List[schemas.Item])
-def get_items(skip: int = 0, limit: int = 100, database: Session = Depends(get_db)):
+async def get_items(skip: int = 0, limit: int = 100,
+                    cursor: Optional[str] = None,
+                    database: AsyncSession = Depends(get_async_db)):
     """
     Return all items.
     Default limit is 100.
+    With a cursor, return the items after it and the next cursor.
     """
+    after_id = cursor_after_id(cursor)
     try:
-        items = actions.get_items(database, skip=skip, limit=limit)
-        return items
+        items = await async_actions.get_item_rows(database, skip=skip, limit=limit,
+                                                  after_id=after_id)
+        response = ORJSONResponse(items)
+        if after_id is not None:
+            set_next_cursor(response, items, limit)
+        return response
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Internal Server Error: {str(e)}") from e
+
+
+@router.get("/export")
+def export_items(database: Session = Depends(get_db)):
+    """
+    Stream all items as NDJSON.
+    """
+    return ndjson_response(actions.iter_items(database), schemas.Item)
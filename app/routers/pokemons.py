@@ -2,11 +2,26 @@
 API routes for Pokemon information using FastAPI and Flask.
 
 Endpoints:
-- GET /: Retrieve a list of Pokemon with optional pagination.
+- GET /: Retrieve a list of Pokemon with optional pagination
+(skip/limit, or `cursor` with the next one in the `X-Next-Cursor` header).
+- GET /export: Stream every Pokemon as NDJSON, one Pokemon per line.
 - GET /stats/{first_pokemon_id}: Get the stats of a specific Pokemon.
 - GET /battle_stats/{first_pokemon_id}/{second_pokemon_id}: 
 Conduct a battle between two Pokemon and compare their stats.
-- GET /random: Retrieve information about three randomly selected Pokemon.
+- GET /simulation/{first_pokemon_id}/{second_pokemon_id}: Simulate
+`fights` battles (see `utils.battle`) and return the win probability of
+each Pokemon with its 95% confidence interval. A `seed` gives
+reproducible fights.
+- GET /simulation/tournament: Simulated round-robin tournament between a
+list of Pokemon or a trainer's team, spread over a process pool when it is
+large: the result of every matchup and the leaderboard by expected wins.
+- GET /random: Retrieve information about randomly selected Pokemon
+(3 by default, see `count`), drawn without replacement from a preloaded
+pool of the 151 first Pokemon. A `seed` gives reproducible draws.
+- GET /tournament: Round-robin tournament between a list of Pokemon
+or a trainer's team (up to `MAX_TOURNAMENT_POKEMONS` distinct Pokemon),
+streamed as NDJSON (matrix rows, then the leaderboard). The matrix is
+computed in one vectorized pass over the stat rows.
 
 Dependencies:
 - FastAPI: Web framework for building APIs with Python type hints.
@@ -17,49 +32,79 @@ Modules:
 - schemas: Defines data models (schemas) for the API.
 - utils: Utility functions, including database connection 
 and PokeAPI integration.
+
+The database endpoints await an `AsyncSession`, except the export which
+streams from a synchronous server-side cursor. The list is read as dicts
+and encoded with orjson, without validating each row with Pydantic.
+The PokeAPI backed endpoints are `async def` and await the shared,
+pooled client of `pokeapi_async`, so an upstream round trip does not
+hold a threadpool worker. Each pokemon is fetched once per request.
 """
-from typing import List
+import json
+from typing import List, Optional
+import anyio
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from fastapi import APIRouter, Depends
-
-from .. import actions, schemas
-from ..utils.utils import get_db
-from ..utils.pokeapi import (
-    get_pokemon_stats,
-    battle_compare_stats,
-    get_pokemon_name,
-    random_pokemon,
-)
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import ORJSONResponse, StreamingResponse
+
+from .. import actions, async_actions, schemas
+from ..utils.utils import get_async_db, get_db, ndjson_response
+from ..utils.pagination import cursor_after_id, set_next_cursor
+from ..utils.pokeapi import STAT_NAMES, STAT_TABLE
+from ..utils.stat_table import WIN, DRAW, LOSE
+from ..utils import battle
+from ..utils.pokeapi_async import get_fighters, get_pokemon_stats, get_pokemon_records
+from ..utils.random_pool import RANDOM_POOL
 router = APIRouter()
 
 
 @router.get("/", response_model=List[schemas.Pokemon])
-def get_pokemons(skip: int = 0, limit: int = 100, database: Session = Depends(get_db)):
+async def get_pokemons(skip: int = 0, limit: int = 100,
+                       cursor: Optional[str] = None,
+                       database: AsyncSession = Depends(get_async_db)):
     """
     Return all pokemons
     Default limit is 100
+    With a cursor, return the pokemons after it and the next cursor
+    """
+    after_id = cursor_after_id(cursor)
+    pokemons = await async_actions.get_pokemon_rows(database, skip=skip, limit=limit,
+                                                    after_id=after_id)
+    response = ORJSONResponse(pokemons)
+    if after_id is not None:
+        set_next_cursor(response, pokemons, limit)
+    return response
+
+
+@router.get("/export")
+def export_pokemons(database: Session = Depends(get_db)):
+    """
+    Stream all pokemons as NDJSON
     """
-    pokemons = actions.get_pokemons(database, skip=skip, limit=limit)
-    return pokemons
+    return ndjson_response(actions.iter_pokemons(database), schemas.Pokemon)
 
 
 @router.get("/stats/{first_pokemon_id}")
-def get_stats(first_pokemon_id: int):
+async def get_stats(first_pokemon_id: int):
     """
     Return only one pokemon stats
     """
-    stats = get_pokemon_stats(first_pokemon_id)
+    stats = await get_pokemon_stats(first_pokemon_id)
     return stats
 
 
 @router.get("/battle_stats/{first_pokemon_id}/{second_pokemon_id}")
-def battle_pokemons(first_pokemon_id: int, second_pokemon_id: int):
+async def battle_pokemons(first_pokemon_id: int, second_pokemon_id: int):
     """
     Return pokemons stats
     """
-    stats = battle_compare_stats(first_pokemon_id, second_pokemon_id)
-    first_pokemon_name = get_pokemon_name(first_pokemon_id)
-    second_pokemon_name = get_pokemon_name(second_pokemon_id)
+    first_pokemon, second_pokemon = await get_pokemon_records(
+        [first_pokemon_id, second_pokemon_id]
+    )
+    stats = STAT_TABLE.compare(first_pokemon_id, second_pokemon_id)
+    first_pokemon_name = first_pokemon.name
+    second_pokemon_name = second_pokemon.name
     first_pokemon_counter, second_pokemon_counter, equal_counter = stats
 
     result = ""
@@ -94,21 +139,113 @@ def battle_pokemons(first_pokemon_id: int, second_pokemon_id: int):
     return result
 
 
+@router.get("/simulation/tournament")
+async def simulate_tournament(
+    api_ids: Optional[List[int]] = Query(None),
+    trainer_id: Optional[int] = None,
+    fights: int = Query(200, ge=1, le=battle.MAX_FIGHTS),
+    seed: Optional[int] = Query(None, ge=0),
+    database: AsyncSession = Depends(get_async_db),
+):
+    """
+    Simulated round-robin tournament between pokemons or the team of a trainer
+    Return the win probabilities of every matchup and the leaderboard
+    """
+    api_ids = await tournament_api_ids(api_ids, trainer_id, database)
+    if len(api_ids) * (len(api_ids) - 1) // 2 * fights > battle.MAX_TOURNAMENT_FIGHTS:
+        raise HTTPException(status_code=400, detail="Too many fights in the tournament")
+    fighters = await get_fighters(api_ids)
+    results = await anyio.to_thread.run_sync(battle.simulate_tournament, fighters, fights, seed)
+    return battle.tournament_report(fighters, results)
+
+
+@router.get("/simulation/{first_pokemon_id}/{second_pokemon_id}")
+async def simulate_battle(first_pokemon_id: int, second_pokemon_id: int,
+                          fights: int = Query(battle.DEFAULT_FIGHTS, ge=1, le=battle.MAX_FIGHTS),
+                          seed: Optional[int] = Query(None, ge=0)):
+    """
+    Return the win probability of each pokemon, with its confidence interval
+    """
+    first_fighter, second_fighter = await get_fighters([first_pokemon_id, second_pokemon_id])
+    result = await anyio.to_thread.run_sync(battle.simulate_battle, first_fighter,
+                                            second_fighter, fights, seed)
+    return battle.battle_report(result)
+
+
 @router.get("/random")
-def random_pokemons():
+async def random_pokemons(count: int = Query(3, ge=1, le=len(RANDOM_POOL)),
+                          seed: Optional[int] = None):
     """
     Return pokemons randomly
     """
-    pokemons = random_pokemon()
+    pool = await RANDOM_POOL.get()
+    pokemons = pool.draw(count, seed=seed)
 
     result = []
 
-    # Utiliser une boucle pour récupérer les trois premiers Pokémon
-    for i in range(3):
+    for pokemon in pokemons:
         pokemon_data = {
-            "pokemon": pokemons[1][i],
-            "stats": pokemons[0][i * 6 : (i + 1) * 6],
+            "pokemon": pokemon.name,
+            "stats": list(zip(STAT_NAMES, pokemon.stats)),
         }
         result.append(pokemon_data)
 
     return result
+
+
+OUTCOMES = {WIN: "win", DRAW: "draw", LOSE: "lose"}
+# Largest roster of /tournament, its matrix has a row and a column per pokemon
+MAX_TOURNAMENT_POKEMONS = 256
+
+
+async def tournament_api_ids(api_ids, trainer_id, database):
+    """
+    Return the distinct pokemons of a tournament, given or of a trainer's team
+    """
+    if trainer_id is not None:
+        db_trainer = await async_actions.get_trainer(database, trainer_id)
+        if db_trainer is None:
+            raise HTTPException(status_code=404, detail="Trainer not found")
+        api_ids = [pokemon.api_id for pokemon in db_trainer.pokemons]
+    if not api_ids:
+        raise HTTPException(status_code=400, detail="No pokemon in the tournament")
+    return list(dict.fromkeys(api_ids))
+
+
+@router.get("/tournament")
+async def tournament(
+    api_ids: Optional[List[int]] = Query(None),
+    trainer_id: Optional[int] = None,
+    database: AsyncSession = Depends(get_async_db),
+):
+    """
+    Round-robin tournament between pokemons or the team of a trainer
+    Stream one NDJSON line per matrix row, then the leaderboard
+    """
+    api_ids = await tournament_api_ids(api_ids, trainer_id, database)
+    if len(api_ids) > MAX_TOURNAMENT_POKEMONS:
+        raise HTTPException(status_code=400, detail="Too many pokemons in the tournament")
+    pokemons = await get_pokemon_records(api_ids)
+
+    def lines():
+        yield json.dumps({
+            "pokemons": [{"api_id": pokemon.api_id, "name": pokemon.name}
+                         for pokemon in pokemons]
+        }) + "\n"
+        scores = []
+        for (api_id, outcomes), pokemon in zip(STAT_TABLE.battle_matrix(api_ids), pokemons):
+            scores.append({
+                "api_id": api_id,
+                "name": pokemon.name,
+                "wins": outcomes.count(WIN),
+                "draws": outcomes.count(DRAW) - 1,
+                "losses": outcomes.count(LOSE),
+            })
+            yield json.dumps({
+                "api_id": api_id,
+                "results": [OUTCOMES[outcome] for outcome in outcomes],
+            }) + "\n"
+        scores.sort(key=lambda score: (-score["wins"], -score["draws"]))
+        yield json.dumps({"leaderboard": scores}) + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
@@ -16,10 +16,30 @@ trainers, items, and Pokemon. It includes the following endpoints:
     - Parameters:
         - `skip` (int): Number of trainers to skip (default: 0).
         - `limit` (int): Maximum number of trainers to return (default: 100).
+        - `cursor` (str): Opaque cursor for keyset pagination, empty for the
+          first page. When given, `skip` is ignored and the cursor of the
+          next page is sent in the `X-Next-Cursor` header.
     - Returns:
-        - A list of trainers.
+        - A list of trainers, read as dicts and encoded with orjson
+          (see `actions.get_trainer_rows`).
 
-3. **Get Trainer by ID (GET /{trainer_id}):**
+3. **Search Trainers (GET /search):**
+    - Find trainers by the words of their name or of their Pokemon custom
+      names. Each word matches as a prefix, ignoring case and accents.
+    - Parameters:
+        - `q` (str): Search terms.
+        - `skip` (int): Number of results to skip (default: 0).
+        - `limit` (int): Maximum number of results, up to 100 (default: 20).
+    - Returns:
+        - The matching trainers, best match first. The search reads the
+          FTS5 index `trainer_search`, it never scans the trainers.
+
+4. **Export Trainers (GET /export):**
+    - Stream every trainer, with their inventory and Pokemon, as NDJSON.
+    - Returns:
+        - One trainer per line.
+
+5. **Get Trainer by ID (GET /{trainer_id}):**
     - Retrieve a specific trainer by their ID.
     - Parameters:
         - `trainer_id` (int): ID of the trainer to retrieve.
@@ -28,85 +48,225 @@ trainers, items, and Pokemon. It includes the following endpoints:
     - Raises:
         - HTTPException (404): If the trainer is not found.
 
-4. **Add Item to Trainer's Inventory (POST /{trainer_id}/item/):**
+6. **Get Team Summary (GET /{trainer_id}/summary):**
+    - Retrieve the aggregates of a trainer's team: number of Pokemon and
+      items, items count by name, and for each stat the total, the mean
+      and the best Pokemon.
+    - Parameters:
+        - `trainer_id` (int): ID of the trainer.
+    - Returns:
+        - The summary, computed once and then updated by the item and
+          Pokemon endpoints (see `utils.team_summary`).
+    - Raises:
+        - HTTPException (404): If the trainer is not found.
+
+7. **Add Item to Trainer's Inventory (POST /{trainer_id}/item/):**
     - Add an item to a trainer's inventory.
     - Parameters:
         - `trainer_id` (int): ID of the trainer.
         - `item` (schemas.ItemCreate): Item data to be added.
     - Returns:
         - The created item.
+    - Raises:
+        - HTTPException (404): If the trainer is not found.
 
-5. **Add Pokemon to Trainer's Collection (POST /{trainer_id}/pokemon/):**
+8. **Add Pokemon to Trainer's Collection (POST /{trainer_id}/pokemon/):**
     - Add a Pokemon to a trainer's collection.
     - Parameters:
         - `trainer_id` (int): ID of the trainer.
         - `pokemon` (schemas.PokemonCreate): Pokemon data to be added.
+    - Returns:
+        - The created Pokemon. Its name is taken from the local PokeAPI data,
+          or left empty and resolved in the background.
+    - Raises:
+        - HTTPException (404): If the trainer is not found.
+
+9. **Add Items in Batch (POST /{trainer_id}/items:batch):**
+    - Add several items to a trainer's inventory in one transaction.
+    - Parameters:
+        - `trainer_id` (int): ID of the trainer.
+        - `items` (List[schemas.ItemCreate]): Items data to be added.
+    - Returns:
+        - The created items.
+    - Raises:
+        - HTTPException (404): If the trainer is not found.
+
+10. **Add Pokemon in Batch (POST /{trainer_id}/pokemons:batch):**
+    - Add several Pokemon to a trainer's collection in one transaction.
+    - Parameters:
+        - `trainer_id` (int): ID of the trainer.
+        - `pokemons` (List[schemas.PokemonCreate]): Pokemon data to be added.
     - Returns:
         - The created Pokemon.
+    - Raises:
+        - HTTPException (404): If the trainer is not found.
 
 Dependencies:
-- `database` (Session): Dependency to interact with the database.
+- `database` (AsyncSession): Dependency to interact with the database.
+  The endpoints are `async def` and await the database, except the
+  export which streams from a synchronous server-side cursor.
 - `actions` (module): Functions for handling trainer-related actions.
+- `async_actions` (module): Async versions of the `actions` functions.
 - `schemas` (module): Data models (schemas) used by the API.
 
+Response Cache:
+- The read endpoints are cached by `ResponseCacheMiddleware`. Every write
+  endpoint invalidates the cached trainer, item and Pokemon lists.
+- The team summaries are not cached as responses: the item and Pokemon
+  endpoints add their new rows to the cached summary of the trainer.
+
 Exception Handling:
 - If an internal server error occurs during any operation, it raises an
  HTTPException with a 500 status code.
 
 """
 
-from typing import List
+from typing import List, Optional
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from fastapi import APIRouter,  Depends, HTTPException
-from ..utils.utils import get_db
-from .. import actions, schemas
+from fastapi import APIRouter,  Depends, HTTPException, Query
+from fastapi.responses import ORJSONResponse
+from ..utils.utils import get_async_db, get_db, ndjson_response
+from ..utils.pagination import cursor_after_id, set_next_cursor
+from ..utils.response_cache import DATABASE_TAGS, RESPONSE_CACHE
+from ..utils.team_summary import TEAM_SUMMARIES, get_team_summary
+from .. import actions, async_actions, schemas
 router = APIRouter()
 
 
 @router.post("/", response_model=schemas.Trainer)
-def create_trainer(database: Session = Depends(get_db)):
+async def create_trainer(trainer: schemas.TrainerCreate,
+                         database: AsyncSession = Depends(get_async_db)):
     """
         Create a trainer
     """
-    return actions.create_trainer(database=database)
+    db_trainer = await async_actions.create_trainer(database=database, trainer=trainer)
+    RESPONSE_CACHE.invalidate(*DATABASE_TAGS)
+    return db_trainer
 
 
 @router.get("", response_model=List[schemas.Trainer])
-def get_trainers(skip: int = 0, limit: int = 100, database: Session = Depends(get_db)):
+async def get_trainers(skip: int = 0, limit: int = 100,
+                       cursor: Optional[str] = None,
+                       database: AsyncSession = Depends(get_async_db)):
     """
         Return all trainers
         Default limit is 100
+        With a cursor, return the trainers after it and the next cursor
+    """
+    after_id = cursor_after_id(cursor)
+    trainers = await async_actions.get_trainer_rows(database, skip=skip, limit=limit,
+                                                    after_id=after_id)
+    response = ORJSONResponse(trainers)
+    if after_id is not None:
+        set_next_cursor(response, trainers, limit)
+    return response
+
+
+@router.get("/search", response_model=List[schemas.Trainer])
+async def search_trainers(terms: str = Query(..., alias="q", min_length=1, max_length=200),
+                          skip: int = Query(0, ge=0), limit: int = Query(20, ge=1, le=100),
+                          database: AsyncSession = Depends(get_async_db)):
+    """
+        Return the trainers matching the search terms, best match first
+    """
+    trainers = await async_actions.search_trainers(database, terms, skip=skip, limit=limit)
+    return ORJSONResponse(trainers)
+
+
+@router.get("/export")
+def export_trainers(database: Session = Depends(get_db)):
+    """
+        Stream all trainers as NDJSON
     """
-    trainers = actions.get_trainers(database, skip=skip, limit=limit)
-    return trainers
+    return ndjson_response(actions.iter_trainers(database), schemas.Trainer)
 
 
 @router.get("/{trainer_id}", response_model=schemas.Trainer)
-def get_trainer(trainer_id: int, database: Session = Depends(get_db)):
+async def get_trainer(trainer_id: int, database: AsyncSession = Depends(get_async_db)):
     """
         Return trainer from his id
     """
-    db_trainer = actions.get_trainer(database, trainer_id=trainer_id)
+    db_trainer = await async_actions.get_trainer(database, trainer_id=trainer_id)
     if db_trainer is None:
         raise HTTPException(status_code=404, detail="Trainer not found")
     return db_trainer
 
 
+@router.get("/{trainer_id}/summary")
+async def get_trainer_summary(trainer_id: int, database: AsyncSession = Depends(get_async_db)):
+    """
+        Return the team summary of a trainer
+    """
+    summary = await get_team_summary(database, trainer_id)
+    if summary is None:
+        raise HTTPException(status_code=404, detail="Trainer not found")
+    return ORJSONResponse(summary)
+
+
 @router.post("/{trainer_id}/item/", response_model=schemas.Item)
-def create_item_for_trainer(
-    trainer_id: int, item: schemas.ItemCreate, database: Session = Depends(get_db)
+async def create_item_for_trainer(
+    trainer_id: int, item: schemas.ItemCreate, database: AsyncSession = Depends(get_async_db)
 ):
     """
         Add an item in trainer inventory
     """
-    return actions.add_trainer_item(database=database, item=item, trainer_id=trainer_id)
+    if not await async_actions.trainer_exists(database, trainer_id=trainer_id):
+        raise HTTPException(status_code=404, detail="Trainer not found")
+    db_item = await async_actions.add_trainer_item(database=database, item=item,
+                                                   trainer_id=trainer_id)
+    RESPONSE_CACHE.invalidate(*DATABASE_TAGS)
+    TEAM_SUMMARIES.add_items(trainer_id, [db_item.name])
+    return db_item
 
 
 @router.post("/{trainer_id}/pokemon/", response_model=schemas.Pokemon)
-def create_pokemon_for_trainer(
-    trainer_id: int, pokemon: schemas.PokemonCreate, database: Session = Depends(get_db)
+async def create_pokemon_for_trainer(
+    trainer_id: int, pokemon: schemas.PokemonCreate,
+    database: AsyncSession = Depends(get_async_db)
 ):
     """
         Add a Pokemon to a trainer
     """
-    return actions.add_trainer_pokemon(database=database, pokemon=pokemon, trainer_id=trainer_id)
+    if not await async_actions.trainer_exists(database, trainer_id=trainer_id):
+        raise HTTPException(status_code=404, detail="Trainer not found")
+    db_pokemon = await async_actions.add_trainer_pokemon(database=database, pokemon=pokemon,
+                                                         trainer_id=trainer_id)
+    RESPONSE_CACHE.invalidate(*DATABASE_TAGS)
+    TEAM_SUMMARIES.add_pokemons(trainer_id, [db_pokemon.api_id])
+    return db_pokemon
+
+
+@router.post("/{trainer_id}/items:batch", response_model=List[schemas.Item])
+async def create_items_for_trainer(
+    trainer_id: int, items: List[schemas.ItemCreate],
+    database: AsyncSession = Depends(get_async_db)
+):
+    """
+        Add several items in trainer inventory, in one transaction
+    """
+    if not await async_actions.trainer_exists(database, trainer_id=trainer_id):
+        raise HTTPException(status_code=404, detail="Trainer not found")
+    db_items = await async_actions.add_trainer_items(database=database, items=items,
+                                                     trainer_id=trainer_id)
+    RESPONSE_CACHE.invalidate(*DATABASE_TAGS)
+    TEAM_SUMMARIES.add_items(trainer_id, [item.name for item in items])
+    return db_items
+
+
+@router.post("/{trainer_id}/pokemons:batch", response_model=List[schemas.Pokemon])
+async def create_pokemons_for_trainer(
+    trainer_id: int, pokemons: List[schemas.PokemonCreate],
+    database: AsyncSession = Depends(get_async_db)
+):
+    """
+        Add several Pokemons to a trainer, in one transaction
+        The unknown names are resolved in the background
+    """
+    if not await async_actions.trainer_exists(database, trainer_id=trainer_id):
+        raise HTTPException(status_code=404, detail="Trainer not found")
+    db_pokemons = await async_actions.add_trainer_pokemons(database=database, pokemons=pokemons,
+                                                           trainer_id=trainer_id)
+    RESPONSE_CACHE.invalidate(*DATABASE_TAGS)
+    TEAM_SUMMARIES.add_pokemons(trainer_id, [pokemon.api_id for pokemon in pokemons])
+    return db_pokemons
@@ -65,9 +65,10 @@ class PokemonCreate(PokemonBase):
 class Pokemon(PokemonBase):
     """
     Model for representing a Pokemon with additional details.
+    `name` is None until it is resolved from the PokeAPI.
     """
     id: int
-    name: str
+    name: Optional[str] = None
     trainer_id: int
 
     @dataclasses.dataclass
@@ -91,6 +92,11 @@ class TrainerBase(BaseModel):
     birthdate: date
 
 
+class TrainerCreate(TrainerBase):
+    """
+    Model for creating a new trainer.
+    """
+
 
 class Trainer(TrainerBase):
     """
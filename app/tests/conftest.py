@@ -0,0 +1,154 @@
+import contextlib
+from datetime import date
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
+
+from .. import models
+from ..sqlite import create_async_sqlite_engine, create_sqlite_engine
+from ..utils import pokeapi
+from ..utils.pokeapi_store import PokeapiStore
+from ..utils.pokeapi_stub import StubServer
+from ..utils.random_pool import RANDOM_POOL
+from ..utils.response_cache import RESPONSE_CACHE
+from ..utils.team_summary import TEAM_SUMMARIES
+
+
+@pytest.fixture(scope="session")
+def pokeapi_stub():
+    """
+        Local stand-in of the PokeAPI, shared by the tests
+    """
+    server = StubServer().start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture(autouse=True)
+def offline_pokeapi(monkeypatch, pokeapi_stub):
+    """
+        Send the PokeAPI requests to the local stand-in instead of pokeapi.co
+    """
+    monkeypatch.setattr(pokeapi, "BASE_URL", pokeapi_stub.base_url)
+    return pokeapi_stub
+
+
+@pytest.fixture(autouse=True)
+def clear_pokeapi_cache(monkeypatch, tmp_path):
+    pokeapi.POKEMON_CACHE.clear()
+    pokeapi.STAT_TABLE.clear()
+    RANDOM_POOL.clear()
+    RESPONSE_CACHE.clear()
+    TEAM_SUMMARIES.clear()
+    pokeapi.UPSTREAM_BREAKER.reset()
+    monkeypatch.setattr(pokeapi, "POKEMON_STORE", PokeapiStore(tmp_path / "pokeapi.db"))
+    yield
+    pokeapi.POKEMON_STORE.close()
+    pokeapi.POKEMON_CACHE.clear()
+    pokeapi.STAT_TABLE.clear()
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_sqlite_engine(f"sqlite:///{tmp_path / 'sqlite.db'}", poolclass=NullPool)
+    models.Base.metadata.create_all(bind=engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def async_engine(engine):
+    async_engine = create_async_sqlite_engine(
+        engine.url.set(drivername="sqlite+aiosqlite"), poolclass=NullPool
+    )
+    yield async_engine
+
+
+@pytest.fixture
+def database(engine):
+    session = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def make_trainer(database):
+    """
+        Add a trainer with its items and pokemons, and return its id
+
+        trainer_id = make_trainer("red", inventory=[models.Item(name="potion")])
+    """
+    def make(name="red", inventory=(), pokemons=()):
+        trainer = models.Trainer(name=name, birthdate=date(2000, 1, 1))
+        trainer.inventory = list(inventory)
+        trainer.pokemons = list(pokemons)
+        database.add(trainer)
+        database.commit()
+        return trainer.id
+
+    return make
+
+
+@pytest.fixture
+def trainer(make_trainer):
+    """
+        Id of a trainer without items nor pokemons
+    """
+    return make_trainer()
+
+
+@pytest.fixture
+def count_queries(engine, async_engine):
+    """
+        Count the SQL statements executed in a block, and fail if there are too many
+
+        with count_queries(3) as queries:
+            ...
+    """
+    @contextlib.contextmanager
+    def counter(max_queries):
+        statements = []
+
+        def before_cursor_execute(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        engines = (engine, async_engine.sync_engine)
+        for counted_engine in engines:
+            event.listen(counted_engine, "before_cursor_execute", before_cursor_execute)
+        try:
+            yield statements
+        finally:
+            for counted_engine in engines:
+                event.remove(counted_engine, "before_cursor_execute", before_cursor_execute)
+        assert len(statements) <= max_queries, (
+            f"{len(statements)} queries executed, expected at most {max_queries}:\n"
+            + "\n".join(statements)
+        )
+
+    return counter
+
+
+@pytest.fixture
+def client(database, async_engine, monkeypatch):
+    # pylint: disable=import-outside-toplevel
+    from fastapi.testclient import TestClient
+    from sqlalchemy.ext.asyncio import AsyncSession
+    from main import app
+    from ..utils.name_resolver import NAME_RESOLVER
+    from ..utils.utils import get_async_db, get_db
+
+    def async_session():
+        return AsyncSession(async_engine, autoflush=False, expire_on_commit=False)
+
+    async def get_test_async_db():
+        async with async_session() as async_database:
+            yield async_database
+
+    app.dependency_overrides[get_db] = lambda: database
+    app.dependency_overrides[get_async_db] = get_test_async_db
+    monkeypatch.setattr(NAME_RESOLVER, "session_factory", async_session)
+    with TestClient(app) as test_client:
+        yield test_client
+    app.dependency_overrides.clear()
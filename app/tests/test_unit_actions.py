@@ -0,0 +1,76 @@
+import pytest
+
+from .. import actions, models, schemas
+
+
+@pytest.fixture
+def trainers(database, make_trainer):
+    for index in range(20):
+        make_trainer(f"trainer {index}",
+                     inventory=[models.Item(name="potion"), models.Item(name="pokeball")],
+                     pokemons=[models.Pokemon(api_id=25, name="pikachu")])
+    database.expunge_all()
+
+
+def test_get_trainers_has_no_n_plus_one(database, trainers, count_queries):
+    with count_queries(3):
+        result = [schemas.Trainer.from_orm(trainer)
+                  for trainer in actions.get_trainers(database, limit=20)]
+    assert len(result) == 20
+    assert all(len(trainer.inventory) == 2 for trainer in result)
+    assert all(trainer.pokemons[0].name == "pikachu" for trainer in result)
+
+
+def test_get_trainer_has_no_n_plus_one(database, trainers, count_queries):
+    with count_queries(2):
+        result = schemas.Trainer.from_orm(actions.get_trainer(database, trainer_id=3))
+    assert result.name == "trainer 2"
+    assert len(result.inventory) == 2
+    assert len(result.pokemons) == 1
+
+
+def test_trainer_endpoints_use_the_async_session(client, trainers, count_queries):
+    with count_queries(3 + 2):
+        trainers = client.get("/trainers", params={"limit": 20}).json()
+        trainer = client.get("/trainers/3").json()
+    assert len(trainers) == 20
+    assert trainers[0]["pokemons"][0]["name"] == "pikachu"
+    assert trainer["inventory"][1]["name"] == "pokeball"
+
+
+def test_create_trainer(client):
+    response = client.post("/trainers/", json={"name": "Sacha", "birthdate": "2000-01-01"})
+    assert response.status_code == 200
+    trainer = response.json()
+    assert trainer["name"] == "Sacha"
+    assert trainer["inventory"] == [] and trainer["pokemons"] == []
+    assert client.get(f"/trainers/{trainer['id']}").json()["birthdate"] == "2000-01-01"
+
+
+@pytest.mark.parametrize("get_models, get_rows, schema", [
+    (actions.get_trainers, actions.get_trainer_rows, schemas.Trainer),
+    (actions.get_items, actions.get_item_rows, schemas.Item),
+    (actions.get_pokemons, actions.get_pokemon_rows, schemas.Pokemon),
+])
+def test_rows_match_the_schema(database, trainers, get_models, get_rows, schema):
+    expected = [schema.from_orm(row).dict() for row in get_models(database, limit=15)]
+    database.expunge_all()
+    rows = get_rows(database, limit=15)
+    assert rows == expected
+    assert [list(row) for row in rows] == [list(row) for row in expected]
+    assert get_rows(database, limit=5, after_id=rows[-1]["id"]) == [
+        schema.from_orm(row).dict() for row in get_models(database, limit=5, after_id=15)]
+
+
+def test_get_trainer_rows_has_no_n_plus_one(database, trainers, count_queries):
+    with count_queries(3):
+        rows = actions.get_trainer_rows(database, limit=20)
+    assert len(rows) == 20
+    assert all(len(trainer["inventory"]) == 2 for trainer in rows)
+
+
+def test_list_endpoints_keep_their_openapi_schema(client):
+    paths = client.get("/openapi.json").json()["paths"]
+    for path, schema in (("/trainers", "Trainer"), ("/items/", "Item"), ("/pokemons/", "Pokemon")):
+        content = paths[path]["get"]["responses"]["200"]["content"]["application/json"]
+        assert content["schema"]["items"] == {"$ref": f"#/components/schemas/{schema}"}
@@ -0,0 +1,29 @@
+from ..utils import pokeapi, pokeapi_async
+from .test_unit_pokeapi import sample_pokemon_data
+
+
+def test_create_items_batch(client, trainer, count_queries):
+    items = [{"name": f"item {index}", "description": "test"} for index in range(50)]
+    with count_queries(4):
+        response = client.post(f"/trainers/{trainer}/items:batch", json=items)
+    assert response.status_code == 200
+    created = response.json()
+    assert [item["name"] for item in created] == [item["name"] for item in items]
+    assert all(item["trainer_id"] == trainer for item in created)
+    assert len({item["id"] for item in created}) == 50
+
+
+def test_create_pokemons_batch_resolves_each_name_once(client, trainer, mocker):
+    fetch_pokemon_data = mocker.patch.object(pokeapi_async, "fetch_pokemon_data")
+    pokeapi.POKEMON_CACHE.set(25, sample_pokemon_data)
+    pokeapi.POKEMON_CACHE.set(1, {**sample_pokemon_data, "name": "bulbasaur"})
+    pokemons = [{"api_id": 25, "custom_name": "sparky"}, {"api_id": 1}, {"api_id": 25}]
+    response = client.post(f"/trainers/{trainer}/pokemons:batch", json=pokemons)
+    assert response.status_code == 200
+    assert [pokemon["name"] for pokemon in response.json()] == ["Pikachu", "bulbasaur", "Pikachu"]
+    assert response.json()[0]["custom_name"] == "sparky"
+    fetch_pokemon_data.assert_not_called()
+
+
+def test_batch_for_unknown_trainer(client):
+    assert client.post("/trainers/404/items:batch", json=[{"name": "potion"}]).status_code == 404
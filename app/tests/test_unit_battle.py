@@ -0,0 +1,120 @@
+import pytest
+
+from ..utils import battle, pokeapi
+from ..utils.pokeapi_stub import make_payload
+
+PIKACHU = battle.Fighter(25, "pikachu", (35, 55, 40, 50, 50, 90), ("electric",))
+GYARADOS = battle.Fighter(130, "gyarados", (95, 125, 79, 60, 100, 81), ("water", "flying"))
+MEWTWO = battle.Fighter(150, "mewtwo", (106, 110, 90, 154, 90, 130), ("psychic",))
+MAGIKARP = battle.Fighter(129, "magikarp", (20, 10, 55, 15, 20, 80), ("water",))
+
+
+@pytest.fixture(autouse=True)
+def process_pool():
+    yield
+    battle.shutdown()
+
+
+def test_battle_stats():
+    assert battle.battle_stats(PIKACHU) == (110, 75, 60, 70, 70, 110)
+
+
+def test_effectiveness():
+    assert battle.effectiveness("electric", ("water", "flying")) == 4
+    assert battle.effectiveness("electric", ("ground",)) == 0
+    assert battle.effectiveness("water", ("water", "dragon")) == 0.25
+    assert battle.effectiveness("normal", ()) == 1
+    assert battle.type_modifier(PIKACHU, GYARADOS) == 6
+    assert battle.type_modifier(PIKACHU._replace(types=()), GYARADOS) == 1
+
+
+def test_simulate_battle():
+    result = battle.simulate_battle(MEWTWO, MAGIKARP, fights=500, seed=1)
+    assert result.wins + result.losses + result.draws == result.fights == 500
+    assert result.wins == 500
+    assert battle.simulate_battle(MEWTWO, MAGIKARP, fights=500, seed=1) == result
+
+
+def test_types_change_the_odds():
+    neutral = battle.simulate_battle(PIKACHU._replace(types=()), GYARADOS._replace(types=()),
+                                     fights=2000, seed=1)
+    typed = battle.simulate_battle(PIKACHU, GYARADOS, fights=2000, seed=1)
+    assert typed.wins > neutral.wins
+
+
+def test_mirror_match_is_fair():
+    result = battle.simulate_battle(PIKACHU, PIKACHU, fights=20000, seed=3)
+    low, high = battle.win_interval(result.wins, result.fights)
+    assert low < 0.5 < high
+
+
+def test_immune_fighters_draw(monkeypatch):
+    monkeypatch.setattr(battle, "MAX_TURNS", 10)
+    normal = battle.Fighter(1, "normal", (50,) * 6, ("normal",))
+    ghost = battle.Fighter(2, "ghost", (50,) * 6, ("ghost",))
+    assert battle.simulate_battle(normal, ghost, fights=100, seed=1).draws == 100
+
+
+def test_win_interval():
+    assert battle.win_interval(0, 0) == (0.0, 1.0)
+    low, high = battle.win_interval(0, 100)
+    assert low == 0 and 0 < high < 0.05
+    low, high = battle.win_interval(50, 100)
+    assert low == pytest.approx(1 - high) and low < 0.5 < high
+
+
+def test_battle_report():
+    report = battle.battle_report(battle.simulate_battle(PIKACHU, GYARADOS, fights=1000, seed=1))
+    assert report["first"]["name"] == "pikachu" and report["second"]["api_id"] == 130
+    assert report["first"]["wins"] + report["second"]["wins"] + report["draws"] == 1000
+    for side in ("first", "second"):
+        low, high = report[side]["confidence_interval"]
+        assert low <= report[side]["win_probability"] <= high
+
+
+def test_tournament_in_a_process_pool(monkeypatch):
+    fighters = [PIKACHU, GYARADOS, MEWTWO, MAGIKARP]
+    serial = battle.simulate_tournament(fighters, fights=200, seed=7, workers=1)
+    monkeypatch.setattr(battle, "PARALLEL_THRESHOLD", 0)
+    parallel = battle.simulate_tournament(fighters, fights=200, seed=7, workers=2)
+    pool = battle.get_process_pool()
+    assert pool._mp_context.get_start_method() == "spawn"  # pylint: disable=protected-access
+    assert parallel == serial
+    assert len(serial) == 6
+    report = battle.tournament_report(fighters, serial)
+    assert report["leaderboard"][0]["name"] == "mewtwo"
+    assert report["leaderboard"][-1]["name"] == "magikarp"
+    assert sum(score["expected_wins"] for score in report["leaderboard"]) == pytest.approx(6)
+
+
+def test_battle_pokemon():
+    assert pokeapi.battle_pokemon(150, 129, fights=200, seed=1)["name"] == "mewtwo"
+    assert pokeapi.battle_pokemon(129, 150, fights=200, seed=1)["name"] == "mewtwo"
+
+
+def test_make_fighter():
+    assert pokeapi.make_fighter(25, make_payload(25)) == PIKACHU._replace(types=())
+    data = {**make_payload(25), "types": [
+        {"slot": 2, "type": {"name": "flying"}}, {"slot": 1, "type": {"name": "electric"}}]}
+    assert pokeapi.make_fighter(25, data).types == ("electric", "flying")
+
+
+def test_simulation_endpoints(client):
+    report = client.get("/pokemons/simulation/150/129", params={"fights": 200, "seed": 1}).json()
+    assert report["first"]["name"] == "mewtwo" and report["first"]["win_probability"] == 1
+    assert client.get("/pokemons/simulation/150/129", params={"fights": 0}).status_code == 422
+
+    report = client.get("/pokemons/simulation/tournament",
+                        params={"api_ids": [150, 129, 25], "fights": 100, "seed": 1}).json()
+    assert len(report["matchups"]) == 3
+    assert report["leaderboard"][0]["name"] == "mewtwo"
+    response = client.get("/pokemons/simulation/tournament",
+                          params={"api_ids": list(range(1, 152)), "fights": 100_000})
+    assert response.status_code == 400
+
+
+def test_negative_seed_is_rejected(client):
+    assert client.get("/pokemons/simulation/1/4", params={"seed": -1}).status_code == 422
+    response = client.get("/pokemons/simulation/tournament",
+                          params={"api_ids": [1, 4], "seed": -1})
+    assert response.status_code == 422
@@ -0,0 +1,116 @@
+import csv
+import sqlite3
+
+import pytest
+
+from benchmarks import compare, generate, scaling, serialization
+
+FIELDS = ["Type", "Name", "Request Count", "Failure Count", "Requests/s", "95%", "99%"]
+
+
+def write_stats(path, rows):
+    with open(path, "w", newline="", encoding="utf-8") as stats_file:
+        writer = csv.writer(stats_file)
+        writer.writerow(FIELDS)
+        writer.writerows(rows)
+    return path
+
+
+@pytest.fixture
+def baseline(tmp_path):
+    return write_stats(tmp_path / "baseline_stats.csv", [
+        ["GET", "/pokemons/stats/[id]", 1000, 0, 100.0, 40, 80],
+        ["", "Aggregated", 1000, 0, 100.0, 40, 80],
+    ])
+
+
+def test_no_regression(baseline, tmp_path):
+    current = write_stats(tmp_path / "run_stats.csv", [
+        ["GET", "/pokemons/stats/[id]", 1000, 0, 95.0, 44, 90],
+        ["GET", "/pokemons/random", 10, 0, 1.0, 400, 800],
+    ])
+    assert not compare.compare(compare.read_stats(baseline), compare.read_stats(current))
+    assert compare.main([str(current), "--baseline", str(baseline)]) == 0
+
+
+def test_rps_and_latency_regressions(baseline, tmp_path):
+    current = write_stats(tmp_path / "run_stats.csv", [
+        ["GET", "/pokemons/stats/[id]", 1000, 0, 80.0, 60, 81],
+        ["", "Aggregated", 1000, 0, 100.0, 40, 200],
+    ])
+    regressions = compare.compare(compare.read_stats(baseline), compare.read_stats(current))
+    assert {(regression.name, regression.metric) for regression in regressions} == {
+        ("GET /pokemons/stats/[id]", "rps"),
+        ("GET /pokemons/stats/[id]", "p95"),
+        ("Aggregated", "p99"),
+    }
+    assert compare.main([str(current), "--baseline", str(baseline)]) == 1
+
+
+def test_small_latencies_are_ignored(tmp_path):
+    baseline = compare.read_stats(write_stats(tmp_path / "a.csv", [["GET", "/", 10, 0, 1, 1, 2]]))
+    current = compare.read_stats(write_stats(tmp_path / "b.csv", [["GET", "/", 10, 0, 1, 3, 4]]))
+    assert not compare.compare(baseline, current)
+
+
+def test_missing_percentiles_are_skipped(baseline, tmp_path, capsys):
+    current = write_stats(tmp_path / "run_stats.csv", [
+        ["GET", "/pokemons/stats/[id]", 0, 0, 0.0, "N/A", "N/A"],
+        ["", "Aggregated", 1000, 0, 100.0, 40, 80],
+    ])
+    stats = compare.read_stats(current)
+    assert stats["GET /pokemons/stats/[id]"].p95 is None
+    regressions = compare.compare(compare.read_stats(baseline), stats)
+    assert [(regression.name, regression.metric) for regression in regressions] == [
+        ("GET /pokemons/stats/[id]", "rps"),
+    ]
+    assert compare.main([str(current), "--baseline", str(baseline)]) == 1
+    assert "N/A" in capsys.readouterr().out
+
+
+def test_committed_baseline(capsys):
+    baseline = compare.read_stats(compare.BASELINE_STATS)
+    assert "Aggregated" in baseline
+    assert compare.main([compare.BASELINE_STATS]) == 0
+    assert "Aggregated" in capsys.readouterr().out
+
+
+def test_serialization_benchmark(capsys):
+    timings = serialization.run(trainers=5, limit=5, repeat=1)
+    assert [timing.endpoint for timing in timings] == ["/trainers", "/items", "/pokemons"]
+    assert all(timing.pydantic > 0 and timing.fast > 0 for timing in timings)
+    assert serialization.main(["--trainers", "5", "--limit", "5", "--repeat", "1"]) == 0
+    assert "speedup" in capsys.readouterr().out
+
+
+def test_generate(tmp_path):
+    path = str(tmp_path / "bench.db")
+    scale = generate.scaled(0.05)
+    assert scale == generate.Scale(50, 500, 300)
+    generate.generate(path, scale, seed=1, batch_size=100)
+    with sqlite3.connect(path) as connection:
+        counts = [connection.execute(f"SELECT count(*) FROM {table}").fetchone()[0]
+                  for table in ("trainers", "items", "pokemons", "trainer_search")]
+        indexes = {name for (name,) in connection.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'index' AND name LIKE 'ix_%'")}
+        first = connection.execute("SELECT name, birthdate FROM trainers WHERE id = 1").fetchone()
+    assert counts == [50, 500, 300, 50]
+    assert "ix_items_trainer_id_id" in indexes
+    with pytest.raises(FileExistsError):
+        generate.generate(path, scale)
+
+    assert generate.main([str(tmp_path / "again.db"), "--scale", "0.05", "--seed", "1"]) == 0
+    with sqlite3.connect(tmp_path / "again.db") as connection:
+        assert connection.execute(
+            "SELECT name, birthdate FROM trainers WHERE id = 1").fetchone() == first
+    assert generate.main([path]) == 1
+
+
+def test_scaling_benchmark(tmp_path, monkeypatch):
+    monkeypatch.setattr(scaling, "WARMUP", 0)
+    results = scaling.run([0.01], str(tmp_path), repeat=2)
+    assert len(results) == len(scaling.ACTION_CASES) + len(scaling.ENDPOINT_CASES)
+    assert all(0 < result.p50 <= result.p99 for result in results)
+    lines = scaling.format_table(results).splitlines()
+    assert lines[1].split()[:3] == ["0.01", "action", "add_trainer_item"]
+    assert sum(" endpoint " in line for line in lines) == len(scaling.ENDPOINT_CASES)
@@ -0,0 +1,109 @@
+import threading
+import time
+
+from ..utils import pokeapi
+from ..utils.cache import SingleFlight, TTLCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_cache_hit_and_miss():
+    cache = TTLCache(max_bytes=100, ttl=10)
+    assert cache.get(1) is None
+    cache.set(1, {'name': 'bulbasaur'}, size=10)
+    assert cache.get(1) == {'name': 'bulbasaur'}
+    assert cache.stats()['hits'] == 1
+    assert cache.stats()['misses'] == 1
+
+
+def test_cache_entry_expires():
+    clock = FakeClock()
+    cache = TTLCache(max_bytes=100, ttl=10, clock=clock)
+    cache.set(1, 'bulbasaur', size=10)
+    clock.now = 10
+    assert cache.get(1) is None
+    assert cache.stats()['expirations'] == 1
+    assert cache.stats()['bytes'] == 0
+
+
+def test_cache_evicts_least_recently_used():
+    cache = TTLCache(max_bytes=30, ttl=10)
+    cache.set(1, 'bulbasaur', size=10)
+    cache.set(2, 'ivysaur', size=10)
+    cache.set(3, 'venusaur', size=10)
+    cache.get(1)
+    cache.set(4, 'charmander', size=10)
+    assert cache.get(2) is None
+    assert cache.get(1) == 'bulbasaur'
+    assert cache.stats()['evictions'] == 1
+    assert cache.stats()['bytes'] == 30
+
+
+def test_cache_ignores_oversized_entry():
+    cache = TTLCache(max_bytes=30, ttl=10)
+    cache.set(1, 'bulbasaur', size=31)
+    assert len(cache) == 0
+
+
+def test_single_flight_shares_result():
+    flight = SingleFlight()
+    started = threading.Event()
+    calls = []
+
+    def slow(value):
+        calls.append(value)
+        started.set()
+        time.sleep(0.1)
+        return value * 2
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(flight.do(1, slow, 21)))
+    leader.start()
+    started.wait()
+    followers = [threading.Thread(target=lambda: results.append(flight.do(1, slow, 21)))
+                 for _ in range(4)]
+    for follower in followers:
+        follower.start()
+    for thread in [leader] + followers:
+        thread.join()
+
+    assert calls == [21]
+    assert results == [42] * 5
+    assert flight.coalesced == 4
+
+
+def test_get_pokemon_data_is_cached(mocker):
+    get = mocker.patch.object(pokeapi.requests, "get")
+    get.return_value.json.return_value = {'name': 'Pikachu'}
+    get.return_value.content = b'{"name": "Pikachu"}'
+    get.return_value.status_code = 200
+    assert pokeapi.get_pokemon_name(25) == 'Pikachu'
+    assert pokeapi.get_pokemon_data(25) == {'name': 'Pikachu'}
+    get.assert_called_once_with(f"{pokeapi.BASE_URL}/pokemon/25",
+                                timeout=pokeapi.RETRY_POLICY.attempt_timeout)
+    assert pokeapi.get_cache_stats()['hits'] == 1
+
+
+def test_get_pokemon_data_reads_store(mocker):
+    get = mocker.patch.object(pokeapi.requests, "get")
+    pokeapi.POKEMON_STORE.put(25, b'{"name": "Pikachu"}')
+    assert pokeapi.get_pokemon_name(25) == 'Pikachu'
+    get.assert_not_called()
+
+
+def test_fetch_pokemon_data_fills_store(mocker):
+    get = mocker.patch.object(pokeapi.requests, "get")
+    get.return_value.json.return_value = {'name': 'Pikachu'}
+    get.return_value.content = b'{"name": "Pikachu"}'
+    get.return_value.status_code = 200
+    pokeapi.get_pokemon_data(25)
+    pokeapi.POKEMON_CACHE.clear()
+    assert pokeapi.get_pokemon_name(25) == 'Pikachu'
+    assert 25 in pokeapi.POKEMON_STORE
+    get.assert_called_once()
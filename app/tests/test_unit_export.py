@@ -0,0 +1,33 @@
+import json
+
+import pytest
+
+from .. import actions, models
+
+
+@pytest.fixture
+def trainers(database, make_trainer):
+    for index in range(12):
+        make_trainer(f"trainer {index}", inventory=[models.Item(name="potion")],
+                     pokemons=[models.Pokemon(api_id=25, name="pikachu")])
+    database.expunge_all()
+
+
+def test_iter_trainers_loads_relationships_per_batch(database, trainers, count_queries):
+    with count_queries(3 * 3):
+        trainers = list(actions.iter_trainers(database, batch_size=5))
+        assert sum(len(trainer.inventory) + len(trainer.pokemons) for trainer in trainers) == 24
+
+
+def test_export_trainers(client, trainers):
+    response = client.get("/trainers/export")
+    assert response.headers["content-type"] == "application/x-ndjson"
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert [line["name"] for line in lines] == [f"trainer {index}" for index in range(12)]
+    assert lines[0]["inventory"][0]["name"] == "potion"
+    assert lines[0]["pokemons"][0]["name"] == "pikachu"
+
+
+@pytest.mark.parametrize("path", ["/items/export", "/pokemons/export"])
+def test_export_items_and_pokemons(client, trainers, path):
+    assert len(client.get(path).text.splitlines()) == 12
@@ -0,0 +1,71 @@
+import pytest
+from sqlalchemy.exc import OperationalError
+
+from ..utils import metrics
+
+
+@pytest.fixture(autouse=True)
+def clear_metrics():
+    for histogram in metrics.REGISTRY:
+        histogram.clear()
+
+
+def server_timing(response):
+    return dict(
+        (part.split(";")[0].strip(), part) for part in response.headers["server-timing"].split(",")
+    )
+
+
+def test_histogram_text_format():
+    histogram = metrics.Histogram("test_seconds", "Test.", ("route",), buckets=(0.1, 1))
+    histogram.observe(0.05, "/a")
+    histogram.observe(0.5, "/a")
+    histogram.observe(5, "/a")
+    assert histogram.collect() == [
+        "# HELP test_seconds Test.",
+        "# TYPE test_seconds histogram",
+        'test_seconds_bucket{route="/a",le="0.1"} 1',
+        'test_seconds_bucket{route="/a",le="1"} 2',
+        'test_seconds_bucket{route="/a",le="+Inf"} 3',
+        'test_seconds_sum{route="/a"} 5.55',
+        'test_seconds_count{route="/a"} 3',
+    ]
+
+
+def test_database_timings(client, trainer):
+    response = client.get(f"/trainers/{trainer}")
+    timings = server_timing(response)
+    assert 'desc="2 queries"' in timings["db"]
+    assert "serialize" in timings and "total" in timings
+    assert metrics.HANDLER_LATENCY.count("GET", "/trainers/{trainer_id}", "200") == 1
+    assert metrics.DB_QUERIES.count("/trainers/{trainer_id}") == 1
+    assert metrics.SERIALIZATION_LATENCY.count("/trainers/{trainer_id}") == 1
+
+
+def test_failed_query_does_not_skew_the_next_ones(engine, monkeypatch):
+    metrics.instrument_engine(engine)
+    clock = iter([0.0, 10.0, 11.0])
+    monkeypatch.setattr(metrics.time, "perf_counter", lambda: next(clock))
+    with metrics.request_timings() as timings, engine.connect() as connection:
+        with pytest.raises(OperationalError):
+            connection.exec_driver_sql("SELECT * FROM missing_table")
+        connection.exec_driver_sql("SELECT 1")
+        assert "query_start" not in connection.info
+    assert timings.db_queries == 1
+    assert timings.db == 1.0
+
+
+def test_upstream_timings(client):
+    response = client.get("/pokemons/stats/1")
+    assert server_timing(response)["upstream"] != "upstream;dur=0.0"
+    assert metrics.UPSTREAM_LATENCY.count("async", "200") == 1
+
+
+def test_metrics_endpoint(client):
+    client.get("/pokemons/stats/1")
+    client.get("/unknown")
+    body = client.get("/metrics").text
+    assert ('http_request_duration_seconds_count'
+            '{method="GET",route="/pokemons/stats/{first_pokemon_id}",status="200"} 1') in body
+    assert 'route="unmatched",status="404"' in body
+    assert 'pokeapi_request_duration_seconds_count{client="async",status="200"} 1' in body
@@ -0,0 +1,105 @@
+import threading
+
+from sqlalchemy.exc import OperationalError
+
+from .. import actions, async_actions, models
+from ..utils import pokeapi, pokeapi_async
+from ..utils.name_resolver import NAME_RESOLVER
+from .test_unit_pokeapi import sample_pokemon_data
+
+
+def test_known_name_is_set_on_insert(client, trainer, mocker):
+    fetch_pokemon_data = mocker.patch.object(pokeapi_async, "fetch_pokemon_data")
+    pokeapi.POKEMON_CACHE.set(25, sample_pokemon_data)
+    response = client.post(f"/trainers/{trainer}/pokemon/", json={"api_id": 25})
+    assert response.json()["name"] == "Pikachu"
+    fetch_pokemon_data.assert_not_called()
+
+
+def test_unknown_name_is_resolved_in_background(client, trainer, database, mocker):
+    async def fetch_pokemon_data(api_id):
+        pokeapi.POKEMON_CACHE.set(api_id, sample_pokemon_data)
+        return sample_pokemon_data
+
+    fetch = mocker.patch.object(pokeapi_async, "fetch_pokemon_data",
+                                side_effect=fetch_pokemon_data)
+    for _ in range(3):
+        response = client.post(f"/trainers/{trainer}/pokemon/", json={"api_id": 25})
+        assert response.status_code == 200
+        assert response.json()["name"] is None
+
+    client.portal.call(NAME_RESOLVER.join)
+
+    names = [pokemon.name for pokemon in database.query(models.Pokemon).all()]
+    assert names == ["Pikachu"] * 3
+    assert fetch.call_count == 1
+
+
+def test_failed_resolution_is_retried(client, trainer, database, mocker, monkeypatch):
+    monkeypatch.setattr(NAME_RESOLVER, "retry_delay", 0.01)
+    calls = []
+
+    async def fetch_pokemon_data(api_id):
+        calls.append(api_id)
+        if len(calls) < 3:
+            raise ConnectionError("pokeapi is down")
+        pokeapi.POKEMON_CACHE.set(api_id, sample_pokemon_data)
+        return sample_pokemon_data
+
+    mocker.patch.object(pokeapi_async, "fetch_pokemon_data", side_effect=fetch_pokemon_data)
+    client.post(f"/trainers/{trainer}/pokemons:batch", json=[{"api_id": 25}])
+
+    client.portal.call(NAME_RESOLVER.join)
+
+    assert database.query(models.Pokemon).one().name == "Pikachu"
+    assert len(calls) == 3
+
+
+def test_failed_update_retries_each_id_once(client, trainer, database, mocker, monkeypatch):
+    monkeypatch.setattr(NAME_RESOLVER, "retry_delay", 0.01)
+    failed = set()
+
+    async def fetch_pokemon_data(api_id):
+        if api_id == 26 and api_id not in failed:
+            failed.add(api_id)
+            raise ConnectionError("pokeapi is down")
+        data = {**sample_pokemon_data, "name": f"pokemon {api_id}"}
+        pokeapi.POKEMON_CACHE.set(api_id, data)
+        return data
+
+    mocker.patch.object(pokeapi_async, "fetch_pokemon_data", side_effect=fetch_pokemon_data)
+    fill_pokemon_names = actions.fill_pokemon_names
+    updates = []
+
+    def failing_update(database, names):
+        updates.append(sorted(names))
+        if len(updates) == 1:
+            raise OperationalError("UPDATE pokemons", {}, None)
+        return fill_pokemon_names(database, names)
+
+    mocker.patch.object(actions, "fill_pokemon_names", side_effect=failing_update)
+    retry = mocker.spy(NAME_RESOLVER, "_retry")
+    client.post(f"/trainers/{trainer}/pokemons:batch", json=[{"api_id": 25}, {"api_id": 26}])
+
+    client.portal.call(NAME_RESOLVER.join)
+
+    assert updates[0] == [25]
+    assert sorted(call.args for call in retry.call_args_list) == [(25, 0), (26, 0)]
+    assert sorted(pokemon.name for pokemon in database.query(models.Pokemon)) == [
+        "pokemon 25", "pokemon 26"]
+
+
+def test_names_are_read_off_the_event_loop(client, trainer, mocker):
+    loop_thread = client.portal.call(threading.get_ident)
+    threads = []
+
+    def get_cached_pokemon_name(api_id):
+        threads.append(threading.get_ident())
+
+    mocker.patch.object(async_actions, "get_cached_pokemon_name",
+                        side_effect=get_cached_pokemon_name)
+    mocker.patch.object(actions, "get_cached_pokemon_name", side_effect=get_cached_pokemon_name)
+    client.post(f"/trainers/{trainer}/pokemon/", json={"api_id": 25})
+    client.post(f"/trainers/{trainer}/pokemons:batch", json=[{"api_id": 1}, {"api_id": 4}])
+    assert len(threads) == 3
+    assert loop_thread not in threads
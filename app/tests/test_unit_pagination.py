@@ -0,0 +1,44 @@
+import pytest
+
+from .. import actions, models
+from ..utils.pagination import CURSOR_HEADER, decode_cursor, encode_cursor
+
+
+@pytest.fixture
+def items(make_trainer):
+    make_trainer(inventory=[models.Item(name=f"item {index}") for index in range(5)])
+
+
+def test_cursor_round_trip():
+    assert decode_cursor(encode_cursor(42)) == 42
+    assert decode_cursor("") == 0
+
+
+@pytest.mark.parametrize("cursor", ["not a cursor", encode_cursor(1)[:-1] + "!", "aWQ6eA"])
+def test_decode_invalid_cursor(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
+
+
+def test_get_items_after_id(database, items):
+    assert [item.id for item in actions.get_items(database, limit=2, after_id=2)] == [3, 4]
+
+
+def test_items_endpoint_walks_pages(client, items):
+    names, cursor = [], ""
+    while cursor is not None:
+        response = client.get("/items/", params={"limit": 2, "cursor": cursor})
+        assert response.status_code == 200
+        names += [item["name"] for item in response.json()]
+        cursor = response.headers.get(CURSOR_HEADER)
+    assert names == [f"item {index}" for index in range(5)]
+
+
+def test_items_endpoint_keeps_skip_limit(client, items):
+    response = client.get("/items/", params={"skip": 3, "limit": 10})
+    assert [item["name"] for item in response.json()] == ["item 3", "item 4"]
+    assert CURSOR_HEADER not in response.headers
+
+
+def test_invalid_cursor_is_rejected(client):
+    assert client.get("/trainers", params={"cursor": "nope"}).status_code == 400
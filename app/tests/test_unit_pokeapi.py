@@ -1,3 +1,5 @@
+import json
+
 import pytest
 from ..utils import pokeapi
 
@@ -18,14 +20,16 @@ def test_get_pokemon_name(mocker):
     mocker.patch("pokeapi.requests.get").return_value.json.return_value = {'name': 'Pikachu'}
     result = pokeapi.get_pokemon_name(api_id)
     assert result == 'Pikachu'
-    pokeapi.requests.get.assert_called_once_with(f"{pokeapi.BASE_URL}/pokemon/{api_id}", timeout=10)
+    pokeapi.requests.get.assert_called_once_with(f"{pokeapi.BASE_URL}/pokemon/{api_id}",
+                                                 timeout=pokeapi.RETRY_POLICY.attempt_timeout)
 
 def test_get_pokemon_stats(mocker):
     api_id = 25
     mocker.patch("pokeapi.requests.get").return_value.json.return_value = sample_pokemon_data
     result = pokeapi.get_pokemon_stats(api_id)
     assert result == sample_pokemon_data['stats']
-    pokeapi.requests.get.assert_called_once_with(f"{pokeapi.BASE_URL}/pokemon/{api_id}", timeout=10)
+    pokeapi.requests.get.assert_called_once_with(f"{pokeapi.BASE_URL}/pokemon/{api_id}",
+                                                 timeout=pokeapi.RETRY_POLICY.attempt_timeout)
 
 
 def test_battle_compare_stats():
@@ -94,8 +98,12 @@ def test_get_battle_compare_stats():
 
 def test_get_pokemon_data(mocker):
     api_id = 25
-    mocker.patch("pokeapi.requests.get").return_value.json.return_value = sample_pokemon_data
+    response = mocker.patch.object(pokeapi.requests, "get").return_value
+    response.json.return_value = sample_pokemon_data
+    response.content = json.dumps(sample_pokemon_data).encode()
+    response.status_code = 200
     result = pokeapi.get_pokemon_data(api_id)
     assert result == sample_pokemon_data
-    pokeapi.requests.get.assert_called_once_with(f"{pokeapi.BASE_URL}/pokemon/{api_id}", timeout=10)
+    pokeapi.requests.get.assert_called_once_with(f"{pokeapi.BASE_URL}/pokemon/{api_id}",
+                                                 timeout=pokeapi.RETRY_POLICY.attempt_timeout)
 
@@ -0,0 +1,69 @@
+import asyncio
+import json
+import threading
+
+import httpx
+import pytest
+
+from ..utils import pokeapi, pokeapi_async
+from .test_unit_pokeapi import sample_pokemon_data
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    requests = []
+
+    async def handler(request):
+        requests.append(request.url.path)
+        await asyncio.sleep(0.01)
+        return httpx.Response(200, content=json.dumps(sample_pokemon_data).encode())
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(pokeapi_async, "_client", client)
+    yield requests
+    pokeapi_async._host_limits.clear()
+
+
+@pytest.mark.anyio
+async def test_get_pokemon_data_coalesces_misses(upstream):
+    results = await asyncio.gather(*[pokeapi_async.get_pokemon_name(25) for _ in range(10)])
+    assert results == ['Pikachu'] * 10
+    assert upstream == ["/api/v2/pokemon/25"]
+    assert 25 in pokeapi.POKEMON_STORE
+
+
+@pytest.mark.anyio
+async def test_battle_compare_stats(upstream):
+    assert await pokeapi_async.battle_compare_stats(25, 26) == (0, 0, 6)
+    assert sorted(upstream) == ["/api/v2/pokemon/25", "/api/v2/pokemon/26"]
+
+
+@pytest.mark.anyio
+async def test_get_pokemon_records_fetches_each_pokemon_once(upstream):
+    records = await pokeapi_async.get_pokemon_records([25, 26, 25])
+    assert [record.api_id for record in records] == [25, 26, 25]
+    assert records[0].name == 'Pikachu'
+    assert records[0].stats == (50, 55, 40, 50, 50, 90)
+    assert sorted(upstream) == ["/api/v2/pokemon/25", "/api/v2/pokemon/26"]
+
+
+@pytest.mark.anyio
+async def test_stored_payloads_are_read_off_the_event_loop(upstream, mocker):
+    pokeapi.POKEMON_STORE.put(25, json.dumps(sample_pokemon_data).encode())
+    loop_thread = threading.get_ident()
+    get_entry = pokeapi.POKEMON_STORE.get_entry
+    threads = []
+
+    def spy(api_id):
+        threads.append(threading.get_ident())
+        return get_entry(api_id)
+
+    mocker.patch.object(pokeapi.POKEMON_STORE, "get_entry", side_effect=spy)
+    assert await pokeapi_async.get_pokemon_name(25) == 'Pikachu'
+    assert upstream == []
+    assert threads and loop_thread not in threads
@@ -0,0 +1,67 @@
+import random
+import statistics
+import time
+
+import pytest
+import requests
+
+from ..utils import pokeapi
+from ..utils.pokeapi_stub import Latency, StubConfig, StubServer, make_payload, sample_latency
+
+
+@pytest.fixture
+def degraded_stub(request):
+    server = StubServer(config=request.param).start()
+    yield server
+    server.stop()
+
+
+def test_fixture_has_the_first_151_species():
+    assert make_payload(1)["name"] == "bulbasaur"
+    assert make_payload(151)["name"] == "mew"
+    assert make_payload(152) is None
+    assert [stat["stat"]["name"] for stat in make_payload(25)["stats"]] == pokeapi.STAT_NAMES
+
+
+def test_pokeapi_client_uses_the_stub(offline_pokeapi):
+    assert pokeapi.BASE_URL == offline_pokeapi.base_url
+    assert pokeapi.get_pokemon_name(25) == "pikachu"
+    assert pokeapi.get_pokemon_record(25).stats == (35, 55, 40, 50, 50, 90)
+
+
+def test_unknown_pokemon(offline_pokeapi):
+    assert requests.get(f"{offline_pokeapi.base_url}/pokemon/0", timeout=1).status_code == 404
+    assert requests.get(f"{offline_pokeapi.base_url}/ability/1", timeout=1).status_code == 404
+
+
+@pytest.mark.parametrize("distribution", ["uniform", "normal", "exponential", "lognormal"])
+def test_latency_distributions(distribution):
+    rng = random.Random(1)
+    delays = [sample_latency(Latency(distribution, 0.1, 0.02), rng) for _ in range(5000)]
+    assert min(delays) >= 0
+    assert statistics.mean(delays) == pytest.approx(0.1, rel=0.1)
+
+
+@pytest.mark.parametrize("degraded_stub", [StubConfig(latency=Latency("constant", 0.05))],
+                         indirect=True)
+def test_injected_latency(degraded_stub):
+    start = time.perf_counter()
+    requests.get(f"{degraded_stub.base_url}/pokemon/1", timeout=1)
+    assert time.perf_counter() - start >= 0.05
+
+
+@pytest.mark.parametrize("degraded_stub", [StubConfig(error_rate=0.5, seed=3)], indirect=True)
+def test_injected_errors(degraded_stub):
+    statuses = [requests.get(f"{degraded_stub.base_url}/pokemon/1", timeout=1).status_code
+                for _ in range(100)]
+    assert set(statuses) == {200, 503}
+    assert 30 < statuses.count(503) < 70
+
+
+@pytest.mark.parametrize("degraded_stub", [StubConfig(rate_limit=1, burst=3)], indirect=True)
+def test_rate_limit(degraded_stub):
+    responses = [requests.get(f"{degraded_stub.base_url}/pokemon/1", timeout=1)
+                 for _ in range(5)]
+    assert [response.status_code for response in responses] == [200, 200, 200, 429, 429]
+    assert responses[-1].headers["Retry-After"] == "1"
+    assert degraded_stub.counters == {200: 3, 429: 2}
@@ -0,0 +1,145 @@
+import inspect
+import re
+from datetime import date
+
+import pytest
+from sqlalchemy import event
+
+from .. import actions, models, schemas
+from ..utils import migrate
+
+# "SCAN trainers" reads the whole table, "SCAN trainers USING INDEX ..." does not
+FULL_SCAN = re.compile(r"^SCAN (?:TABLE )?(\w+)(?: AS \w+)?$")
+
+# Reading a table in rowid order is the point of the exports and of the
+# skip/limit pages, every other query must search an index
+QUERIES = {
+    "get_trainer": (lambda database: actions.get_trainer(database, 2), ()),
+    "trainer_exists": (lambda database: actions.trainer_exists(database, 2), ()),
+    "get_trainer_by_name": (lambda database: actions.get_trainer_by_name(database, "trainer 1"),
+                            ()),
+    "get_trainers": (lambda database: actions.get_trainers(database, limit=2, after_id=1), ()),
+    "get_trainers (skip)": (lambda database: actions.get_trainers(database, skip=1, limit=2),
+                            ("trainers",)),
+    "get_trainer_rows": (lambda database: actions.get_trainer_rows(database, limit=2, after_id=1),
+                         ()),
+    "get_trainer_rows (skip)": (lambda database: actions.get_trainer_rows(database, skip=1),
+                                ("trainers",)),
+    "search_trainers": (lambda database: actions.search_trainers(database, "trainer 1"), ()),
+    "get_trainer_team": (lambda database: actions.get_trainer_team(database, 2), ()),
+    "iter_trainers": (lambda database: list(actions.iter_trainers(database)), ("trainers",)),
+    "create_trainer": (lambda database: actions.create_trainer(
+        database, schemas.TrainerCreate(name="new", birthdate=date(2000, 1, 1))), ()),
+    "add_trainer_pokemon": (lambda database: actions.add_trainer_pokemon(
+        database, schemas.PokemonCreate(api_id=1), 2, name="bulbasaur"), ()),
+    "add_trainer_pokemons": (lambda database: actions.add_trainer_pokemons(
+        database, [schemas.PokemonCreate(api_id=4)], {}, 2), ()),
+    "add_trainer_item": (lambda database: actions.add_trainer_item(
+        database, schemas.ItemCreate(name="potion"), 2), ()),
+    "add_trainer_items": (lambda database: actions.add_trainer_items(
+        database, [schemas.ItemCreate(name="potion")], 2), ()),
+    "fill_pokemon_names": (lambda database: actions.fill_pokemon_names(
+        database, {4: "charmander"}), ()),
+    "missing_pokemon_names": (actions.missing_pokemon_names, ()),
+    "get_items": (lambda database: actions.get_items(database, limit=2, after_id=1), ()),
+    "get_items (skip)": (lambda database: actions.get_items(database, skip=1), ("items",)),
+    "get_item_rows": (lambda database: actions.get_item_rows(database, limit=2, after_id=1), ()),
+    "get_item_rows (skip)": (lambda database: actions.get_item_rows(database, skip=1),
+                             ("items",)),
+    "iter_items": (lambda database: list(actions.iter_items(database)), ("items",)),
+    "get_pokemon": (lambda database: actions.get_pokemon(database, 2), ()),
+    "get_pokemons": (lambda database: actions.get_pokemons(database, limit=2, after_id=1), ()),
+    "get_pokemons (skip)": (lambda database: actions.get_pokemons(database, skip=1),
+                            ("pokemons",)),
+    "get_pokemon_rows": (lambda database: actions.get_pokemon_rows(database, limit=2,
+                                                                   after_id=1), ()),
+    "get_pokemon_rows (skip)": (lambda database: actions.get_pokemon_rows(database, skip=1),
+                                ("pokemons",)),
+    "iter_pokemons": (lambda database: list(actions.iter_pokemons(database)), ("pokemons",)),
+}
+
+
+@pytest.fixture
+def trainers(database, make_trainer):
+    for index in range(5):
+        make_trainer(f"trainer {index}",
+                     inventory=[models.Item(name="potion"), models.Item(name="pokeball")],
+                     pokemons=[models.Pokemon(api_id=25, name="pikachu"), models.Pokemon(api_id=4)])
+    database.expunge_all()
+
+
+@pytest.fixture
+def query_plans(engine):
+    """
+        Run a function and return the query plan of each SELECT or UPDATE it executed
+    """
+    def plans(function, *args):
+        statements = []
+
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            if not executemany and statement.lstrip().upper().startswith(("SELECT", "UPDATE")):
+                statements.append((statement, parameters))
+
+        event.listen(engine, "before_cursor_execute", before_cursor_execute)
+        try:
+            function(*args)
+        finally:
+            event.remove(engine, "before_cursor_execute", before_cursor_execute)
+        with engine.connect() as connection:
+            return [
+                (statement, [row[-1] for row in connection.exec_driver_sql(
+                    f"EXPLAIN QUERY PLAN {statement}", parameters)])
+                for statement, parameters in statements
+            ]
+
+    return plans
+
+
+def full_scans(plan):
+    # Scanning the result of a subquery does not read a table
+    subqueries = {line.split()[-1] for line in plan
+                  if line.startswith(("CO-ROUTINE", "MATERIALIZE"))}
+    return [match.group(1) for match in map(FULL_SCAN.match, plan)
+            if match is not None and match.group(1) not in subqueries]
+
+
+@pytest.mark.parametrize("name", QUERIES)
+def test_queries_do_not_scan_tables(database, trainers, query_plans, name):
+    function, allowed_scans = QUERIES[name]
+    plans = query_plans(function, database)
+    assert plans
+    for statement, plan in plans:
+        scans = [table for table in full_scans(plan) if table not in allowed_scans]
+        assert not scans, f"{name} scans {scans}:\n{statement}\n" + "\n".join(plan)
+
+
+def test_every_query_is_checked():
+    functions = {
+        name for name, function in inspect.getmembers(actions, inspect.isfunction)
+        if function.__module__ == actions.__name__
+        and next(iter(inspect.signature(function).parameters)) == "database"
+    }
+    # The helpers are checked through the functions calling them
+    helpers = {"bulk_insert", "with_relationship_rows"}
+    assert functions - helpers == {name.split(" ")[0] for name in QUERIES}
+
+
+def test_full_scans_are_detected(database, trainers, query_plans):
+    plans = query_plans(lambda: database.query(models.Item)
+                        .filter(models.Item.description == "potion").all())
+    assert full_scans(plans[0][1]) == ["items"]
+
+
+def test_sync_indexes(engine):
+    with engine.begin() as connection:
+        connection.exec_driver_sql("DROP INDEX ix_items_trainer_id_id")
+        connection.exec_driver_sql("CREATE INDEX ix_items_description ON items (description)")
+        connection.exec_driver_sql("CREATE INDEX ix_items_by_hand ON items (name)")
+    migrate.migrate(engine)
+    with engine.connect() as connection:
+        indexes = {name for (name,) in connection.exec_driver_sql(
+            "SELECT name FROM sqlite_master WHERE type = 'index' AND name LIKE 'ix_%'")}
+    # The obsolete indexes are dropped, the ones added by hand are kept
+    assert indexes == {"ix_items_by_hand"} | {index.name
+                                              for table in models.Base.metadata.sorted_tables
+                                              for index in table.indexes}
@@ -0,0 +1,38 @@
+import pytest
+
+from ..utils import pokeapi, pokeapi_async, pokeapi_store
+from ..utils.random_pool import RANDOM_POOL
+
+
+@pytest.fixture
+def species(mocker):
+    for api_id in RANDOM_POOL.api_ids:
+        pokeapi.POKEMON_CACHE.set(api_id, {
+            'name': f'pokemon {api_id}',
+            'stats': [{'stat': {'name': name}, 'base_stat': api_id} for name in pokeapi.STAT_NAMES],
+        })
+    return mocker.patch.object(pokeapi_async, "fetch_pokemon_data")
+
+
+def test_random_draws_distinct_known_pokemons(client, species):
+    pokemons = client.get("/pokemons/random", params={"count": 151}).json()
+    assert sorted(pokemon["pokemon"] for pokemon in pokemons) == sorted(
+        f"pokemon {api_id}" for api_id in range(1, 152))
+    assert pokemons[0]["stats"][0][0] == "hp"
+    species.assert_not_called()
+
+
+def test_random_default_count_and_seed(client, species):
+    first = client.get("/pokemons/random", params={"seed": 42}).json()
+    second = client.get("/pokemons/random", params={"seed": 42}).json()
+    assert len(first) == 3
+    assert first == second
+
+
+@pytest.mark.parametrize("count", [0, 152])
+def test_random_count_is_bounded(client, count):
+    assert client.get("/pokemons/random", params={"count": count}).status_code == 422
+
+
+def test_warm_up_prefetches_the_pool():
+    assert list(pokeapi_store.RANDOM_POKEMON_IDS) == list(RANDOM_POOL.api_ids)
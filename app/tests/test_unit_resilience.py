@@ -0,0 +1,166 @@
+import asyncio
+import json
+import random
+import time
+
+import pytest
+
+from ..utils import pokeapi, pokeapi_async, resilience
+from ..utils.pokeapi_stub import Latency, StubConfig, StubServer
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+def fast_retries(monkeypatch):
+    policy = resilience.RetryPolicy(max_attempts=3, attempt_timeout=0.5, deadline=1.0,
+                                    base_delay=0.001, max_delay=0.002)
+    monkeypatch.setattr(pokeapi, "RETRY_POLICY", policy)
+    return policy
+
+
+@pytest.fixture
+def failing_upstream(monkeypatch):
+    server = StubServer(config=StubConfig(error_rate=1)).start()
+    monkeypatch.setattr(pokeapi, "BASE_URL", server.base_url)
+    yield server
+    server.stop()
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_circuit_breaker_opens_and_probes():
+    clock = FakeClock()
+    breaker = resilience.CircuitBreaker(failure_threshold=2, reset_timeout=10, clock=clock)
+    breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == breaker.OPEN
+    assert not breaker.allow()
+    assert breaker.retry_after() == 10
+
+    clock.now = 10
+    assert breaker.allow()
+    assert not breaker.allow()
+    breaker.record_failure()
+    assert not breaker.allow()
+
+    clock.now = 20
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == breaker.CLOSED
+    assert breaker.allow() and breaker.allow()
+
+
+def test_retry_delay_is_bounded():
+    policy = resilience.RetryPolicy(base_delay=0.1, max_delay=0.3)
+    rng = random.Random(0)
+    delays = [resilience.retry_delay(policy, attempt, rng)
+              for attempt in range(5) for _ in range(50)]
+    assert 0 <= min(delays) and max(delays) <= 0.3
+
+
+def test_retries_then_succeeds(mocker, fast_retries):
+    failure = mocker.Mock(status_code=503)
+    success = mocker.Mock(status_code=200, content=b'{"name": "Pikachu"}')
+    success.json.return_value = {"name": "Pikachu"}
+    get = mocker.patch.object(pokeapi.requests, "get", side_effect=[failure, success])
+    assert pokeapi.get_pokemon_name(25) == "Pikachu"
+    assert get.call_count == 2
+    assert pokeapi.UPSTREAM_BREAKER.state == pokeapi.UPSTREAM_BREAKER.CLOSED
+
+
+def test_not_found_is_not_retried(mocker, fast_retries):
+    get = mocker.patch.object(pokeapi.requests, "get")
+    get.return_value.status_code = 404
+    assert pokeapi.request_pokemon(10000).status_code == 404
+    get.assert_called_once()
+
+
+def test_failures_open_the_circuit(failing_upstream, fast_retries):
+    for _ in range(2):
+        with pytest.raises(resilience.UpstreamUnavailable):
+            pokeapi.get_pokemon_data(1)
+    assert failing_upstream.counters[503] == 5
+    with pytest.raises(resilience.CircuitOpen):
+        pokeapi.get_pokemon_data(1)
+    assert failing_upstream.counters[503] == 5
+
+
+def test_deadline_bounds_the_call(monkeypatch):
+    server = StubServer(config=StubConfig(latency=Latency("constant", 0.3))).start()
+    monkeypatch.setattr(pokeapi, "BASE_URL", server.base_url)
+    monkeypatch.setattr(pokeapi, "RETRY_POLICY", resilience.RetryPolicy(
+        max_attempts=5, attempt_timeout=0.1, deadline=0.25, base_delay=0.01, max_delay=0.01))
+    start = time.perf_counter()
+    try:
+        with pytest.raises(resilience.UpstreamUnavailable):
+            pokeapi.get_pokemon_data(1)
+        elapsed = time.perf_counter() - start
+    finally:
+        server.stop()
+    assert elapsed < 0.4
+
+
+def stale_store(monkeypatch, name):
+    monkeypatch.setattr(pokeapi, "STALE_AFTER", -1)
+    pokeapi.POKEMON_STORE.put(1, json.dumps({"name": name, "stats": []}).encode())
+
+
+def wait_until(predicate, timeout=2):
+    end = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < end
+        time.sleep(0.01)
+
+
+def test_stale_data_is_served_and_refreshed(monkeypatch):
+    stale_store(monkeypatch, "old")
+    assert pokeapi.get_pokemon_name(1) == "old"
+    wait_until(lambda: json.loads(pokeapi.POKEMON_STORE.get(1))["name"] == "bulbasaur")
+    wait_until(lambda: not pokeapi._refreshing)
+    assert pokeapi.POKEMON_CACHE.get(1)["name"] == "bulbasaur"
+
+
+def test_stale_data_is_kept_when_the_upstream_fails(monkeypatch, failing_upstream, fast_retries):
+    stale_store(monkeypatch, "old")
+    assert pokeapi.get_pokemon_name(1) == "old"
+    wait_until(lambda: not pokeapi._refreshing)
+    assert json.loads(pokeapi.POKEMON_STORE.get(1))["name"] == "old"
+
+
+@pytest.mark.anyio
+async def test_async_stale_data_is_served_and_refreshed(monkeypatch):
+    stale_store(monkeypatch, "old")
+    assert await pokeapi_async.get_pokemon_name(1) == "old"
+    await asyncio.gather(*pokeapi_async._refresh_tasks.values())
+    assert json.loads(pokeapi.POKEMON_STORE.get(1))["name"] == "bulbasaur"
+    await pokeapi_async.aclose()
+
+
+@pytest.mark.anyio
+async def test_async_failures_open_the_circuit(failing_upstream, fast_retries):
+    for _ in range(2):
+        with pytest.raises(resilience.UpstreamUnavailable):
+            await pokeapi_async.get_pokemon_data(1)
+    with pytest.raises(resilience.CircuitOpen):
+        await pokeapi_async.get_pokemon_data(1)
+    assert failing_upstream.counters[503] == 5
+    await pokeapi_async.aclose()
+
+
+def test_open_circuit_answers_503(client):
+    for _ in range(pokeapi.UPSTREAM_BREAKER.failure_threshold):
+        pokeapi.UPSTREAM_BREAKER.record_failure()
+    response = client.get("/pokemons/stats/1")
+    assert response.status_code == 503
+    assert int(response.headers["retry-after"]) >= 1
@@ -0,0 +1,69 @@
+import pytest
+
+from ..utils import pokeapi, pokeapi_async
+from ..utils.response_cache import RESPONSE_CACHE
+
+
+@pytest.fixture
+def species():
+    for api_id in (1, 2):
+        pokeapi.POKEMON_CACHE.set(api_id, {
+            'name': f'pokemon {api_id}',
+            'stats': [{'stat': {'name': name}, 'base_stat': api_id} for name in pokeapi.STAT_NAMES],
+        })
+
+
+def test_stats_are_cached_with_etag(client, species, mocker):
+    stats = mocker.patch("app.routers.pokemons.get_pokemon_stats",
+                         wraps=pokeapi_async.get_pokemon_stats)
+    first = client.get("/pokemons/stats/1")
+    second = client.get("/pokemons/stats/1")
+    assert first.status_code == second.status_code == 200
+    assert first.content == second.content
+    assert first.headers["etag"] == second.headers["etag"]
+    assert first.headers["etag"].startswith('"')
+    assert "max-age" in first.headers["cache-control"]
+    assert "last-modified" in first.headers
+    assert stats.call_count == 1
+
+
+def test_if_none_match_answers_not_modified(client, species):
+    etag = client.get("/pokemons/battle_stats/1/2").headers["etag"]
+    response = client.get("/pokemons/battle_stats/1/2", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["etag"] == etag
+
+    response = client.get("/pokemons/battle_stats/1/2", headers={"If-None-Match": '"other"'})
+    assert response.status_code == 200
+
+
+def test_if_modified_since_answers_not_modified(client, species):
+    last_modified = client.get("/pokemons/stats/2").headers["last-modified"]
+    response = client.get("/pokemons/stats/2", headers={"If-Modified-Since": last_modified})
+    assert response.status_code == 304
+
+
+def test_query_parameters_order_shares_the_entry(client, trainer):
+    first = client.get("/trainers?skip=0&limit=10")
+    second = client.get("/trainers?limit=10&skip=0")
+    assert first.headers["etag"] == second.headers["etag"]
+    assert len(RESPONSE_CACHE.responses) == 1
+
+
+def test_errors_are_not_cached(client):
+    assert client.get("/trainers/1").status_code == 404
+    assert "etag" not in client.get("/trainers/1").headers
+    assert len(RESPONSE_CACHE.responses) == 0
+
+
+def test_trainer_writes_invalidate_lists(client, trainer):
+    etag = client.get("/items/").headers["etag"]
+    assert client.get("/items/").json() == []
+    assert client.get(f"/trainers/{trainer}").json()["inventory"] == []
+
+    client.post(f"/trainers/{trainer}/item/", json={"name": "Potion", "description": "Heal"})
+    response = client.get("/items/", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert [item["name"] for item in response.json()] == ["Potion"]
+    assert client.get(f"/trainers/{trainer}").json()["inventory"][0]["name"] == "Potion"
@@ -0,0 +1,85 @@
+import pytest
+from sqlalchemy import create_engine
+
+from .. import actions, models
+
+
+@pytest.fixture
+def trainers(database, make_trainer):
+    for name, custom_names in (("Sacha Ketchum", ["Pika"]), ("Ondine", ["Sachet"]),
+                               ("Pierre", []), ("Régis Chen", ["Ketchup", None])):
+        make_trainer(name, pokemons=[models.Pokemon(api_id=25, custom_name=custom_name)
+                                     for custom_name in custom_names])
+    database.expunge_all()
+
+
+def names(trainers):
+    return [trainer["name"] for trainer in trainers]
+
+
+def test_search_query():
+    assert actions.search_query("  sacha ket ") == '"sacha"* "ket"*'
+    assert actions.search_query('"pika" OR *') == '"pika"* "OR"*'
+    assert actions.search_query(" - ") is None
+
+
+def test_search_by_prefix(database, trainers):
+    assert names(actions.search_trainers(database, "ket")) == ["Sacha Ketchum", "Régis Chen"]
+    assert names(actions.search_trainers(database, "KETCHUM sach")) == ["Sacha Ketchum"]
+    assert names(actions.search_trainers(database, "regis")) == ["Régis Chen"]
+    assert actions.search_trainers(database, "mew") == []
+    assert actions.search_trainers(database, "*") == []
+
+
+def test_search_ranks_the_names_first(database, trainers):
+    assert names(actions.search_trainers(database, "sach")) == ["Sacha Ketchum", "Ondine"]
+    assert names(actions.search_trainers(database, "sach", skip=1, limit=5)) == ["Ondine"]
+
+
+def test_search_returns_the_trainer_rows(database, trainers):
+    [trainer] = actions.search_trainers(database, "ondine")
+    assert list(trainer) == ["name", "birthdate", "id", "inventory", "pokemons"]
+    assert trainer["pokemons"][0]["custom_name"] == "Sachet"
+
+
+def test_search_index_follows_the_writes(database, trainers):
+    pierre = database.query(models.Trainer).filter_by(name="Pierre").one()
+    pierre.name = "Brock"
+    database.add(models.Pokemon(api_id=95, custom_name="Onix", trainer_id=pierre.id))
+    database.commit()
+    assert names(actions.search_trainers(database, "brock onix")) == ["Brock"]
+    assert actions.search_trainers(database, "pierre") == []
+
+    pokemon = database.query(models.Pokemon).filter_by(custom_name="Sachet").one()
+    pokemon.custom_name = "Psykokwak"
+    database.commit()
+    assert names(actions.search_trainers(database, "sach")) == ["Sacha Ketchum"]
+    database.delete(pokemon)
+    database.delete(database.query(models.Trainer).filter_by(name="Régis Chen").one())
+    database.commit()
+    assert actions.search_trainers(database, "psyko") == []
+    assert names(actions.search_trainers(database, "ket")) == ["Sacha Ketchum"]
+
+
+def test_search_index_of_an_existing_database(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    with engine.begin() as connection:
+        for table in (models.Trainer.__table__, models.Pokemon.__table__):
+            table.create(connection)
+        connection.execute(models.Trainer.__table__.insert(), {"id": 1, "name": "Sacha"})
+        connection.execute(models.Pokemon.__table__.insert(),
+                           {"api_id": 25, "custom_name": "Pika", "trainer_id": 1})
+    models.Base.metadata.create_all(engine)
+    with engine.connect() as connection:
+        rows = connection.exec_driver_sql(
+            "SELECT rowid, name, custom_names FROM trainer_search").all()
+    engine.dispose()
+    assert rows == [(1, "Sacha", "Pika")]
+
+
+def test_search_endpoint(client, trainers):
+    response = client.get("/trainers/search", params={"q": "sach", "limit": 1})
+    assert response.status_code == 200
+    assert names(response.json()) == ["Sacha Ketchum"]
+    assert client.get("/trainers/search", params={"q": ""}).status_code == 422
+    assert client.get("/trainers/search", params={"q": "x", "limit": 101}).status_code == 422
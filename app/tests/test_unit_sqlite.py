@@ -0,0 +1,21 @@
+from ..sqlite import POOL_SIZE, create_sqlite_engine
+
+
+def test_connections_use_the_pragma_profile(tmp_path):
+    engine = create_sqlite_engine(f"sqlite:///{tmp_path / 'test.db'}")
+    with engine.connect() as connection:
+        assert connection.exec_driver_sql("PRAGMA journal_mode").scalar() == "wal"
+        assert connection.exec_driver_sql("PRAGMA synchronous").scalar() == 1
+        assert connection.exec_driver_sql("PRAGMA busy_timeout").scalar() == 5000
+        assert connection.exec_driver_sql("PRAGMA cache_size").scalar() == -64 * 1024
+    assert engine.pool.size() == POOL_SIZE
+    engine.dispose()
+
+
+def test_custom_profile(tmp_path):
+    engine = create_sqlite_engine(f"sqlite:///{tmp_path / 'test.db'}",
+                                  pragmas={"synchronous": "FULL"})
+    with engine.connect() as connection:
+        assert connection.exec_driver_sql("PRAGMA synchronous").scalar() == 2
+        assert connection.exec_driver_sql("PRAGMA journal_mode").scalar() == "delete"
+    engine.dispose()
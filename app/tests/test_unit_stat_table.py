@@ -0,0 +1,85 @@
+import json
+
+import numpy as np
+import pytest
+
+from ..routers import pokemons
+from ..utils.stat_table import StatTable, TableRecord, count_wins
+
+bulbasaur = TableRecord(1, 'bulbasaur', (45, 49, 49, 65, 65, 45))
+ivysaur = TableRecord(2, 'ivysaur', (60, 62, 63, 80, 80, 60))
+pikachu = TableRecord(25, 'pikachu', (35, 55, 40, 50, 50, 90))
+
+
+@pytest.fixture
+def table():
+    table = StatTable()
+    for record in (bulbasaur, ivysaur, pikachu):
+        table.add(record)
+    return table
+
+
+def test_get_returns_record(table):
+    assert table.get(2) == ivysaur
+    assert table.get(3) is None
+
+
+def test_compare(table):
+    assert table.compare(1, 2) == (0, 6, 0)
+    assert table.compare(1, 1) == (0, 0, 6)
+    assert table.compare(25, 1) == (2, 4, 0)
+
+
+def test_compare_all(table):
+    assert table.compare_all(1) == {1: (0, 0, 6), 2: (0, 6, 0), 25: (4, 2, 0)}
+
+
+def test_count_wins():
+    rows = np.array([bulbasaur.stats, pikachu.stats])
+    assert count_wins(rows, rows).tolist() == [[0, 4], [2, 0]]
+
+
+def test_table_grows():
+    grown = StatTable(capacity=2)
+    for api_id in range(1, 101):
+        grown.add(TableRecord(api_id, f"pokemon {api_id}", (api_id,) * 6))
+    assert grown.get(100).stats == (100,) * 6
+    results = grown.compare_all(50)
+    assert len(results) == 100
+    assert results[1] == (6, 0, 0) and results[50] == (0, 0, 6) and results[100] == (0, 6, 0)
+
+
+def test_add_replaces_row(table):
+    table.add(TableRecord(1, 'bulbasaur', (100, 100, 100, 100, 100, 100)))
+    assert len(table) == 3
+    assert table.compare(1, 2) == (6, 0, 0)
+
+
+def test_add_rejects_wrong_width(table):
+    with pytest.raises(ValueError):
+        table.add(TableRecord(4, 'charmander', (39, 52)))
+
+
+def test_battle_matrix(table):
+    assert list(table.battle_matrix([1, 2, 25])) == [
+        (1, [0, -1, 1]),
+        (2, [1, 0, 1]),
+        (25, [-1, -1, 0]),
+    ]
+
+
+def test_tournament_endpoint(client, monkeypatch):
+    response = client.get("/pokemons/tournament", params={"api_ids": [1, 2, 25, 1]})
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert [pokemon["name"] for pokemon in lines[0]["pokemons"]] == ["bulbasaur", "ivysaur",
+                                                                      "pikachu"]
+    assert lines[1:4] == [
+        {"api_id": 1, "results": ["draw", "lose", "win"]},
+        {"api_id": 2, "results": ["win", "draw", "win"]},
+        {"api_id": 25, "results": ["lose", "lose", "draw"]},
+    ]
+    assert [score["api_id"] for score in lines[4]["leaderboard"]] == [2, 1, 25]
+
+    monkeypatch.setattr(pokemons, "MAX_TOURNAMENT_POKEMONS", 2)
+    response = client.get("/pokemons/tournament", params={"api_ids": [1, 2, 25]})
+    assert response.status_code == 400
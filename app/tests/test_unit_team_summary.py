@@ -0,0 +1,118 @@
+import asyncio
+
+import pytest
+
+from .. import models
+from ..utils import pokeapi_async
+from ..utils.team_summary import TEAM_SUMMARIES, TeamSummary, TeamSummaryCache, resolve_summary
+
+
+@pytest.fixture
+def trainer(make_trainer):
+    return make_trainer(
+        inventory=[models.Item(name="potion"), models.Item(name="potion"),
+                   models.Item(name="pokeball")],
+        pokemons=[models.Pokemon(api_id=25, name="pikachu"), models.Pokemon(api_id=4)],
+    )
+
+
+def test_summary(client, trainer):
+    response = client.get(f"/trainers/{trainer}/summary")
+    assert response.status_code == 200
+    summary = response.json()
+    assert summary["trainer_id"] == trainer
+    assert summary["pokemon_count"] == 2
+    assert summary["item_count"] == 3
+    assert summary["items"] == {"pokeball": 1, "potion": 2}
+    assert summary["stats"]["hp"] == {"total": 74, "mean": 37.0,
+                                      "best": {"api_id": 4, "name": "charmander", "value": 39}}
+    assert summary["stats"]["speed"]["best"] == {"api_id": 25, "name": "pikachu", "value": 90}
+
+
+def test_summary_of_an_empty_team(client, make_trainer):
+    summary = client.get(f"/trainers/{make_trainer('blue')}/summary").json()
+    assert summary["pokemon_count"] == summary["item_count"] == 0
+    assert summary["stats"]["attack"] == {"total": 0, "mean": 0.0, "best": None}
+
+
+def test_summary_for_unknown_trainer(client):
+    assert client.get("/trainers/404/summary").status_code == 404
+    assert TEAM_SUMMARIES.stats()["entries"] == 0
+
+
+def test_cached_summary_runs_no_query(client, trainer, count_queries, mocker):
+    first = client.get(f"/trainers/{trainer}/summary").json()
+    fetch = mocker.spy(pokeapi_async, "get_pokemon_data")
+    with count_queries(0):
+        assert client.get(f"/trainers/{trainer}/summary").json() == first
+    fetch.assert_not_called()
+
+
+def test_writes_update_the_summary(client, trainer, count_queries):
+    client.get(f"/trainers/{trainer}/summary")
+    client.post(f"/trainers/{trainer}/item/", json={"name": "potion"})
+    client.post(f"/trainers/{trainer}/items:batch", json=[{"name": "revive"}] * 2)
+    client.post(f"/trainers/{trainer}/pokemon/", json={"api_id": 150})
+    client.post(f"/trainers/{trainer}/pokemons:batch", json=[{"api_id": 25}, {"api_id": 1}])
+    with count_queries(0):
+        summary = client.get(f"/trainers/{trainer}/summary").json()
+    assert summary["items"] == {"pokeball": 1, "potion": 3, "revive": 2}
+    assert summary["pokemon_count"] == 5
+    assert summary["stats"]["hp"]["total"] == 35 + 39 + 106 + 35 + 45
+    assert summary["stats"]["special-attack"]["best"]["name"] == "mewtwo"
+
+    TEAM_SUMMARIES.clear()
+    assert client.get(f"/trainers/{trainer}/summary").json() == summary
+
+
+def test_writes_do_not_wait_for_the_pokeapi(client, trainer, mocker):
+    client.get(f"/trainers/{trainer}/summary")
+    fetch = mocker.spy(pokeapi_async, "get_pokemon_record")
+    client.post(f"/trainers/{trainer}/pokemon/", json={"api_id": 150})
+    fetch.assert_not_called()
+    assert TEAM_SUMMARIES.get(trainer).pending == [150]
+
+
+def test_unknown_species_counts_without_stats(client, trainer):
+    client.post(f"/trainers/{trainer}/pokemon/", json={"api_id": 9999})
+    summary = client.get(f"/trainers/{trainer}/summary").json()
+    assert summary["pokemon_count"] == 3
+    assert summary["stats"]["hp"] == {"total": 74, "mean": 37.0,
+                                      "best": {"api_id": 4, "name": "charmander", "value": 39}}
+
+
+def test_failed_resolution_keeps_the_pending_pokemons(mocker):
+    summary = TeamSummary(1, api_ids=[25, 25])
+    mocker.patch.object(pokeapi_async, "get_pokemon_record", side_effect=ConnectionError)
+    with pytest.raises(ConnectionError):
+        asyncio.run(resolve_summary(summary))
+    assert summary.pending == [25, 25]
+    assert summary.pokemon_count == 0
+
+
+def test_load_raced_by_a_write_is_not_cached():
+    cache = TeamSummaryCache()
+    token = cache.start_loading(1)
+    cache.add_items(1, ["potion"])
+    loaded = TeamSummary(1)
+    assert cache.finish_loading(1, token, loaded) is loaded
+    assert cache.get(1) is None
+
+    token = cache.start_loading(1)
+    assert cache.finish_loading(1, token, loaded) is loaded
+    assert cache.get(1) is loaded
+
+
+def test_summaries_are_bounded():
+    cache = TeamSummaryCache(max_entries=2)
+    for trainer_id in range(3):
+        cache.finish_loading(trainer_id, cache.start_loading(trainer_id), TeamSummary(trainer_id))
+    assert cache.get(0) is None
+    assert cache.get(2) is not None
+    assert cache.stats()["evictions"] == 1
+
+
+def test_writes_for_unknown_trainer(client, database):
+    assert client.post("/trainers/404/item/", json={"name": "potion"}).status_code == 404
+    assert client.post("/trainers/404/pokemon/", json={"api_id": 25}).status_code == 404
+    assert database.query(models.Item).count() == database.query(models.Pokemon).count() == 0
@@ -0,0 +1,289 @@
+"""
+Monte Carlo battle simulator.
+
+A battle is a one-on-one fight at level `LEVEL`, turn by turn until one
+pokemon faints (or `MAX_TURNS` turns, a draw):
+- The faster pokemon strikes first, a speed tie is a coin toss each turn.
+- Each pokemon uses its stronger side, physical (attack against defense)
+  or special (special-attack against special-defense), with a move of
+  `BASE_POWER`, of its best type against the defender.
+- The damage follows the main series formula: same-type bonus (`STAB`),
+  type effectiveness (`TYPE_CHART`), a random factor between
+  `DAMAGE_ROLL` and 1, critical hits and misses.
+
+The types come from the PokeAPI payload when it has them, a pokemon
+without types fights with neutral, typeless moves.
+
+The fights of a matchup are simulated together as NumPy arrays, one
+element per fight, so thousands of fights cost a few array operations per
+turn. The matchups of a large tournament are spread over a process pool,
+whose workers are spawned (not forked) and stopped by `shutdown()`.
+
+1. **Fighter:** A pokemon ready to fight (base stats and types).
+2. **simulate_battle(first, second, fights, seed):** Simulate the fights
+   of a matchup, return a `BattleResult`.
+3. **win_interval(wins, fights):** Wilson score interval of a win rate.
+4. **battle_report(result):** The result as a dict, with the win
+   probabilities and their confidence intervals.
+5. **simulate_tournament(fighters, fights, seed, workers):** Simulate every
+   matchup of a round-robin tournament, in a process pool above
+   `PARALLEL_THRESHOLD` fights.
+6. **shutdown():** Stop the process pool, on application shutdown.
+
+Example:
+```python
+pikachu = Fighter(25, "pikachu", (35, 55, 40, 50, 50, 90), ("electric",))
+gyarados = Fighter(130, "gyarados", (95, 125, 79, 60, 100, 81), ("water", "flying"))
+battle_report(simulate_battle(pikachu, gyarados, fights=1000, seed=1))
+```
+"""
+
+import math
+import multiprocessing
+import threading
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from itertools import combinations
+
+import numpy as np
+
+LEVEL = 50
+BASE_POWER = 80
+STAB = 1.5
+ACCURACY = 0.95
+CRITICAL_RATE = 1 / 24
+CRITICAL_MULTIPLIER = 1.5
+DAMAGE_ROLL = 0.85
+MAX_TURNS = 1000
+
+DEFAULT_FIGHTS = 1000
+MAX_FIGHTS = 100_000
+MAX_TOURNAMENT_FIGHTS = 10_000_000
+CONFIDENCE_Z = 1.96
+
+# Below this number of fights, a tournament is cheaper in process
+PARALLEL_THRESHOLD = 200_000
+WORKERS = 4
+
+HP, ATTACK, DEFENSE, SPECIAL_ATTACK, SPECIAL_DEFENSE, SPEED = range(6)
+
+# Attacking type: multiplier against the defending types, 1 when not listed
+TYPE_CHART = {
+    "normal": {"rock": 0.5, "ghost": 0, "steel": 0.5},
+    "fire": {"fire": 0.5, "water": 0.5, "grass": 2, "ice": 2, "bug": 2, "rock": 0.5,
+             "dragon": 0.5, "steel": 2},
+    "water": {"fire": 2, "water": 0.5, "grass": 0.5, "ground": 2, "rock": 2, "dragon": 0.5},
+    "electric": {"water": 2, "electric": 0.5, "grass": 0.5, "ground": 0, "flying": 2,
+                 "dragon": 0.5},
+    "grass": {"fire": 0.5, "water": 2, "grass": 0.5, "poison": 0.5, "ground": 2, "flying": 0.5,
+              "bug": 0.5, "rock": 2, "dragon": 0.5, "steel": 0.5},
+    "ice": {"fire": 0.5, "water": 0.5, "grass": 2, "ice": 0.5, "ground": 2, "flying": 2,
+            "dragon": 2, "steel": 0.5},
+    "fighting": {"normal": 2, "ice": 2, "poison": 0.5, "flying": 0.5, "psychic": 0.5,
+                 "bug": 0.5, "rock": 2, "ghost": 0, "dark": 2, "steel": 2, "fairy": 0.5},
+    "poison": {"grass": 2, "poison": 0.5, "ground": 0.5, "rock": 0.5, "ghost": 0.5, "steel": 0,
+               "fairy": 2},
+    "ground": {"fire": 2, "electric": 2, "grass": 0.5, "poison": 2, "flying": 0, "bug": 0.5,
+               "rock": 2, "steel": 2},
+    "flying": {"electric": 0.5, "grass": 2, "fighting": 2, "bug": 2, "rock": 0.5, "steel": 0.5},
+    "psychic": {"fighting": 2, "poison": 2, "psychic": 0.5, "dark": 0, "steel": 0.5},
+    "bug": {"fire": 0.5, "grass": 2, "fighting": 0.5, "poison": 0.5, "flying": 0.5,
+            "psychic": 2, "ghost": 0.5, "dark": 2, "steel": 0.5, "fairy": 0.5},
+    "rock": {"fire": 2, "ice": 2, "fighting": 0.5, "ground": 0.5, "flying": 2, "bug": 2,
+             "steel": 0.5},
+    "ghost": {"normal": 0, "psychic": 2, "ghost": 2, "dark": 0.5},
+    "dragon": {"dragon": 2, "steel": 0.5, "fairy": 0},
+    "dark": {"fighting": 0.5, "psychic": 2, "ghost": 2, "dark": 0.5, "fairy": 0.5},
+    "steel": {"fire": 0.5, "water": 0.5, "electric": 0.5, "ice": 2, "rock": 2, "steel": 0.5,
+              "fairy": 2},
+    "fairy": {"fire": 0.5, "fighting": 2, "poison": 0.5, "dragon": 2, "dark": 2, "steel": 0.5},
+}
+
+Fighter = namedtuple("Fighter", ["api_id", "name", "stats", "types"], defaults=[()])
+Fighter.__doc__ = """
+    Pokemon of a battle: its base stats, in the order of pokeapi.STAT_NAMES, and its types
+"""
+
+BattleResult = namedtuple("BattleResult", ["first", "second", "fights", "wins", "losses", "draws"])
+BattleResult.__doc__ = """
+    Outcome of the fights of a matchup, wins and losses of the first fighter
+"""
+
+_process_pool = None
+_process_pool_lock = threading.Lock()
+
+
+def battle_stats(fighter):
+    """
+        Return the stats of a fighter at LEVEL, from its base stats
+    """
+    return tuple(
+        (2 * base + 31) * LEVEL // 100 + (LEVEL + 10 if index == HP else 5)
+        for index, base in enumerate(fighter.stats)
+    )
+
+
+def effectiveness(move_type, defender_types):
+    """
+        Return the damage multiplier of a move type against the types of a defender
+    """
+    chart = TYPE_CHART.get(move_type, {})
+    return math.prod(chart.get(defender_type, 1) for defender_type in defender_types)
+
+
+def type_modifier(attacker, defender):
+    """
+        Return the best same-type bonus and effectiveness of the attacker types
+    """
+    if not attacker.types:
+        return 1.0
+    return max(STAB * effectiveness(move_type, defender.types) for move_type in attacker.types)
+
+
+def base_damage(attacker, defender):
+    """
+        Return the damage of a hit before the random factor and critical hits
+    """
+    attack, defense = battle_stats(attacker), battle_stats(defender)
+    if attack[ATTACK] >= attack[SPECIAL_ATTACK]:
+        ratio = attack[ATTACK] / defense[DEFENSE]
+    else:
+        ratio = attack[SPECIAL_ATTACK] / defense[SPECIAL_DEFENSE]
+    return ((2 * LEVEL / 5 + 2) * BASE_POWER * ratio / 50 + 2) * type_modifier(attacker, defender)
+
+
+def simulate_battle(first, second, fights=DEFAULT_FIGHTS, seed=None):
+    """
+        Simulate fights between two fighters, all at once as arrays
+        seed is anything numpy.random.default_rng accepts
+    """
+    rng = np.random.default_rng(seed)
+    first_stats, second_stats = battle_stats(first), battle_stats(second)
+    # damage[0] is dealt by the first fighter, damage[1] by the second
+    damage = np.array([[base_damage(first, second)], [base_damage(second, first)]])
+    hp = np.array([[first_stats[HP]], [second_stats[HP]]], dtype=float).repeat(fights, axis=1)
+    speed = first_stats[SPEED] - second_stats[SPEED]
+    active = np.ones(fights, dtype=bool)
+
+    for _ in range(MAX_TURNS):
+        hits = rng.random((2, fights)) < ACCURACY
+        rolls = rng.uniform(DAMAGE_ROLL, 1.0, (2, fights))
+        critical = np.where(rng.random((2, fights)) < CRITICAL_RATE, CRITICAL_MULTIPLIER, 1.0)
+        dealt = damage * rolls * critical * hits * active
+        first_leads = np.full(fights, speed > 0) if speed else rng.random(fights) < 0.5
+        # The faster fighter strikes, then the other strikes back if it is still standing
+        hp[1] -= np.where(first_leads, dealt[0], 0)
+        hp[0] -= np.where(first_leads, 0, dealt[1])
+        hp[1] -= np.where(~first_leads & (hp[0] > 0), dealt[0], 0)
+        hp[0] -= np.where(first_leads & (hp[1] > 0), dealt[1], 0)
+        active &= (hp[0] > 0) & (hp[1] > 0)
+        if not active.any():
+            break
+
+    wins = int(np.count_nonzero(hp[1] <= 0))
+    losses = int(np.count_nonzero(hp[0] <= 0))
+    return BattleResult(first, second, fights, wins, losses, fights - wins - losses)
+
+
+def win_interval(wins, fights, z=CONFIDENCE_Z):
+    """
+        Return the Wilson score interval of a win rate, 95% by default
+    """
+    if fights == 0:
+        return 0.0, 1.0
+    rate = wins / fights
+    denominator = 1 + z ** 2 / fights
+    center = (rate + z ** 2 / (2 * fights)) / denominator
+    margin = z * math.sqrt(rate * (1 - rate) / fights + z ** 2 / (4 * fights ** 2)) / denominator
+    return max(center - margin, 0.0), min(center + margin, 1.0)
+
+
+def battle_report(result):
+    """
+        Return a battle result as a dict, with the win probabilities
+        of each fighter and their confidence intervals
+    """
+    def side(fighter, wins):
+        low, high = win_interval(wins, result.fights)
+        return {
+            "api_id": fighter.api_id,
+            "name": fighter.name,
+            "wins": wins,
+            "win_probability": wins / result.fights if result.fights else 0.0,
+            "confidence_interval": [low, high],
+        }
+
+    return {
+        "fights": result.fights,
+        "first": side(result.first, result.wins),
+        "second": side(result.second, result.losses),
+        "draws": result.draws,
+    }
+
+
+def _simulate_matchup(arguments):
+    return simulate_battle(*arguments)
+
+
+def get_process_pool(workers=WORKERS):
+    """
+        Return the process pool of the tournaments, creating it on first use
+    """
+    global _process_pool  # pylint: disable=global-statement
+    with _process_pool_lock:
+        if _process_pool is None:
+            # The pool is created from a worker thread of the server, forking
+            # there could copy locks held by the other threads (thread pool,
+            # HTTP client, database pool), the workers are spawned instead
+            _process_pool = ProcessPoolExecutor(
+                max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+        return _process_pool
+
+
+def shutdown():
+    """
+        Stop the process pool of the tournaments
+    """
+    global _process_pool  # pylint: disable=global-statement
+    with _process_pool_lock:
+        if _process_pool is not None:
+            _process_pool.shutdown(cancel_futures=True)
+            _process_pool = None
+
+
+def simulate_tournament(fighters, fights=DEFAULT_FIGHTS, seed=None, workers=WORKERS):
+    """
+        Simulate every matchup of a round-robin tournament
+        Each matchup has its own seed, so the results do not depend on the workers
+    """
+    pairs = list(combinations(fighters, 2))
+    seeds = np.random.SeedSequence(seed).spawn(len(pairs))
+    matchups = [(first, second, fights, matchup_seed)
+                for (first, second), matchup_seed in zip(pairs, seeds)]
+    if workers > 1 and len(matchups) > 1 and len(matchups) * fights >= PARALLEL_THRESHOLD:
+        chunksize = max(len(matchups) // (workers * 4), 1)
+        return list(get_process_pool(workers).map(_simulate_matchup, matchups,
+                                                   chunksize=chunksize))
+    return [_simulate_matchup(matchup) for matchup in matchups]
+
+
+def tournament_report(fighters, results):
+    """
+        Return the matchups of a tournament and its leaderboard,
+        ranked by expected wins
+    """
+    expected = {fighter.api_id: 0.0 for fighter in fighters}
+    for result in results:
+        if result.fights:
+            expected[result.first.api_id] += (result.wins + result.draws / 2) / result.fights
+            expected[result.second.api_id] += (result.losses + result.draws / 2) / result.fights
+    leaderboard = sorted(
+        ({"api_id": fighter.api_id, "name": fighter.name, "expected_wins": expected[fighter.api_id]}
+         for fighter in fighters),
+        key=lambda score: -score["expected_wins"],
+    )
+    return {
+        "pokemons": [{"api_id": fighter.api_id, "name": fighter.name} for fighter in fighters],
+        "matchups": [battle_report(result) for result in results],
+        "leaderboard": leaderboard,
+    }
@@ -0,0 +1,181 @@
+"""
+In-process caching helpers.
+
+This module provides the building blocks used to avoid repeating
+expensive work, such as upstream calls to the PokeAPI.
+
+1. **TTLCache:**
+    - LRU cache whose entries expire after a time-to-live.
+    - The cache is bounded by the total size (in bytes) of its entries,
+      and optionally by a number of entries.
+    - Hit, miss and eviction counters are available through `stats()`.
+
+2. **SingleFlight:**
+    - Coalesce concurrent calls for the same key, so that only one
+      of them does the work and the others wait for its result.
+
+Example:
+```python
+cache = TTLCache(max_bytes=1024 * 1024, ttl=60)
+cache.set("bulbasaur", data, size=2048)
+cache.get("bulbasaur")
+```
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """
+        LRU cache with a time-to-live and a byte-size cap
+        Parameters:
+            max_bytes (int): Maximum total size of the stored entries
+            ttl (float): Lifetime of an entry, in seconds
+            max_entries (int): Optional maximum number of entries
+            clock (callable): Time source, defaults to time.monotonic
+    """
+
+    def __init__(self, max_bytes, ttl, max_entries=None, clock=time.monotonic):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return self.get(key, count=False) is not None
+
+    def get(self, key, count=True):
+        """
+            Return the value stored for key, or None if it is missing or expired
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[2] <= self._clock():
+                self._remove(key)
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                if count:
+                    self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            if count:
+                self.hits += 1
+            return entry[0]
+
+    def set(self, key, value, size=1):
+        """
+            Store a value, evicting the least recently used entries if needed
+            Entries bigger than the whole cache are not stored
+        """
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, size, self._clock() + self.ttl)
+            self.current_bytes += size
+            while self.current_bytes > self.max_bytes or (
+                self.max_entries is not None and len(self._entries) > self.max_entries
+            ):
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def delete(self, key):
+        """
+            Remove an entry if it exists
+        """
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+    def clear(self):
+        """
+            Remove every entry and reset the counters
+        """
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+            self.hits = self.misses = self.evictions = self.expirations = 0
+
+    def stats(self):
+        """
+            Return the cache counters
+        """
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self.current_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+    def _remove(self, key):
+        _, size, _ = self._entries.pop(key)
+        self.current_bytes -= size
+
+
+class _Call:
+    """
+        A call in progress, shared by every caller of the same key
+    """
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+        Run at most one call per key at a time
+        Concurrent callers of the same key wait and share the result
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.coalesced = 0
+
+    def do(self, key, function, *args):
+        """
+            Call function(*args), unless a call for key is already running
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            else:
+                self.coalesced += 1
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+        try:
+            call.result = function(*args)
+            return call.result
+        except Exception as error:
+            call.error = error
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
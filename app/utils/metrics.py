@@ -0,0 +1,286 @@
+"""
+Request timing instrumentation and metrics in the Prometheus text format.
+
+Each request gets a `RequestTimings` (in a context variable) where the
+hooks add the time spent in their layer:
+
+1. **Database:** `instrument_engine(engine)` listens to the cursor events
+   of an engine, and counts the queries and their time.
+2. **PokeAPI:** `observe_upstream(client, status, seconds)` is called by
+   the `pokeapi` clients after each upstream request.
+3. **Serialization:** `instrument_serialization()` times the Pydantic
+   validation and encoding of the FastAPI responses.
+4. **Handler:** `MetricsMiddleware` times the whole request, observes the
+   histograms with the route label and sends a `Server-Timing` header.
+
+`render()` returns every histogram of `REGISTRY` in the Prometheus text
+exposition format, for the `/metrics` endpoint.
+
+Example:
+```python
+app.add_middleware(MetricsMiddleware, routes=app.routes)
+with request_timings() as timings:
+    ...
+timings.server_timing()  # 'db;dur=1.2;desc="3 queries", upstream;dur=80.0'
+```
+"""
+
+import bisect
+import contextlib
+import contextvars
+import threading
+import time
+
+from fastapi import routing
+from sqlalchemy import event
+from starlette.routing import Match
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+UNMATCHED_ROUTE = "unmatched"
+
+
+class Histogram:
+    """
+        Cumulative histogram of observed values, by label values
+        Parameters:
+            name (str): Metric name
+            documentation (str): HELP line of the metric
+            labelnames (tuple): Names of the labels
+            buckets (tuple): Upper bounds of the buckets, in increasing order
+    """
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labelvalues):
+        """
+            Add a value to the series of the given label values
+        """
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labelvalues)
+            if series is None:
+                series = self._series[labelvalues] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def count(self, *labelvalues):
+        """
+            Return the number of values observed in a series
+        """
+        series = self._series.get(labelvalues)
+        return 0 if series is None else series[2]
+
+    def clear(self):
+        """
+            Remove every series
+        """
+        with self._lock:
+            self._series.clear()
+
+    def collect(self):
+        """
+            Return the lines of the metric, in the Prometheus text format
+        """
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = sorted((labels, list(counts), total, count)
+                            for labels, (counts, total, count) in self._series.items())
+        for labelvalues, counts, total, count in series:
+            labels = [f'{name}="{value}"' for name, value in zip(self.labelnames, labelvalues)]
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + ("+Inf",), counts):
+                cumulative += bucket_count
+                bucket_labels = ",".join(labels + [f'le="{bound}"'])
+                lines.append(f"{self.name}_bucket{{{bucket_labels}}} {cumulative}")
+            suffix = "{" + ",".join(labels) + "}" if labels else ""
+            lines.append(f"{self.name}_sum{suffix} {total}")
+            lines.append(f"{self.name}_count{suffix} {count}")
+        return lines
+
+
+HANDLER_LATENCY = Histogram(
+    "http_request_duration_seconds", "Time to handle a request.",
+    ("method", "route", "status"))
+UPSTREAM_LATENCY = Histogram(
+    "pokeapi_request_duration_seconds", "Time of a request to the PokeAPI.",
+    ("client", "status"))
+DB_QUERIES = Histogram(
+    "db_queries_per_request", "Number of SQL queries run by a request.",
+    ("route",), COUNT_BUCKETS)
+DB_LATENCY = Histogram(
+    "db_request_duration_seconds", "Time spent in SQL queries by a request.", ("route",))
+SERIALIZATION_LATENCY = Histogram(
+    "serialization_duration_seconds", "Time spent validating and encoding a response.",
+    ("route",))
+
+REGISTRY = [HANDLER_LATENCY, UPSTREAM_LATENCY, DB_QUERIES, DB_LATENCY, SERIALIZATION_LATENCY]
+
+
+class RequestTimings:
+    """
+        Time spent by a request in each layer, in seconds
+    """
+
+    def __init__(self):
+        self.db_queries = 0
+        self.db = 0.0
+        self.upstream = 0.0
+        self.serialization = 0.0
+
+    def server_timing(self, total=None):
+        """
+            Return the value of the Server-Timing header of the request
+        """
+        metrics = [
+            f'db;dur={self.db * 1000:.1f};desc="{self.db_queries} queries"',
+            f"upstream;dur={self.upstream * 1000:.1f}",
+            f"serialize;dur={self.serialization * 1000:.1f}",
+        ]
+        if total is not None:
+            metrics.append(f"total;dur={total * 1000:.1f}")
+        return ", ".join(metrics)
+
+
+_timings = contextvars.ContextVar("request_timings", default=None)
+
+
+def current_timings():
+    """
+        Return the timings of the current request, or None outside of a request
+    """
+    return _timings.get()
+
+
+@contextlib.contextmanager
+def request_timings():
+    """
+        Collect the timings of the code run in the block
+    """
+    timings = RequestTimings()
+    token = _timings.set(timings)
+    try:
+        yield timings
+    finally:
+        _timings.reset(token)
+
+
+def observe_upstream(client, status, seconds):
+    """
+        Record a PokeAPI request, status is the HTTP status or "error"
+    """
+    UPSTREAM_LATENCY.observe(seconds, client, str(status))
+    timings = _timings.get()
+    if timings is not None:
+        timings.upstream += seconds
+
+
+# The start time is kept on the execution context of the statement, so a
+# failed query (without after_cursor_execute) leaves nothing behind
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # pylint: disable=unused-argument,too-many-arguments
+    context.query_start = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # pylint: disable=unused-argument,too-many-arguments
+    elapsed = time.perf_counter() - context.query_start
+    timings = _timings.get()
+    if timings is not None:
+        timings.db_queries += 1
+        timings.db += elapsed
+
+
+def instrument_engine(engine):
+    """
+        Count the queries of a (sync) engine and their time in the request timings
+    """
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def instrument_serialization():
+    """
+        Time the serialization of the FastAPI responses in the request timings
+    """
+    serialize_response = routing.serialize_response
+    if getattr(serialize_response, "timed", False):
+        return
+
+    async def timed_serialize_response(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return await serialize_response(*args, **kwargs)
+        finally:
+            timings = _timings.get()
+            if timings is not None:
+                timings.serialization += time.perf_counter() - start
+
+    timed_serialize_response.timed = True
+    routing.serialize_response = timed_serialize_response
+
+
+def route_label(routes, scope):
+    """
+        Return the path template of the route matching a request
+    """
+    partial = None
+    for route in routes:
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return route.path
+        if match == Match.PARTIAL and partial is None:
+            partial = route.path
+    return partial or UNMATCHED_ROUTE
+
+
+class MetricsMiddleware:
+    """
+        ASGI middleware timing the requests and sending a Server-Timing header
+    """
+
+    def __init__(self, app, routes=()):
+        self.app = app
+        self.routes = routes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        route = route_label(self.routes, scope)
+        start = time.perf_counter()
+        status = 500
+
+        with request_timings() as timings:
+            async def send_with_timing(message):
+                nonlocal status
+                if message["type"] == "http.response.start":
+                    status = message["status"]
+                    server_timing = timings.server_timing(time.perf_counter() - start)
+                    message = {**message, "headers": list(message.get("headers", []))
+                               + [(b"server-timing", server_timing.encode())]}
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_with_timing)
+            finally:
+                HANDLER_LATENCY.observe(time.perf_counter() - start,
+                                        scope["method"], route, str(status))
+                DB_QUERIES.observe(timings.db_queries, route)
+                DB_LATENCY.observe(timings.db, route)
+                SERIALIZATION_LATENCY.observe(timings.serialization, route)
+
+
+def render():
+    """
+        Return every metric of the registry in the Prometheus text format
+    """
+    return "\n".join(line for metric in REGISTRY for line in metric.collect()) + "\n"
@@ -0,0 +1,44 @@
+"""
+Schema upgrade of an existing database.
+
+`models.Base.metadata.create_all` creates the missing tables, but leaves
+the tables that exist untouched. This command brings their indexes in
+line with the models (see `models.sync_indexes`). It issues DDL, so it is
+run explicitly, once per deployment, and never on import.
+
+1. **migrate(bind):**
+    - Create the missing tables, then sync the indexes.
+
+2. **Command line:**
+    ```
+    python -m app.utils.migrate
+    SQLITE_URL=sqlite:///./other.db python -m app.utils.migrate
+    ```
+"""
+
+import argparse
+
+from .. import models
+from ..sqlite import engine
+
+
+def migrate(bind):
+    """
+        Create the missing tables and indexes, and drop the obsolete indexes
+    """
+    models.Base.metadata.create_all(bind=bind)
+    models.sync_indexes(bind)
+
+
+def main(argv=None):
+    """
+        Command line entry point
+    """
+    parser = argparse.ArgumentParser(description="Upgrade the schema of the database.")
+    parser.parse_args(argv)
+    migrate(engine)
+    print(f"Schema of {engine.url} is up to date")
+
+
+if __name__ == "__main__":
+    main()
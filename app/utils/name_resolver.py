@@ -0,0 +1,189 @@
+"""
+Background resolution of Pokemon names.
+
+Pokemon are inserted without waiting for the PokeAPI. When their name is
+not in the local PokeAPI data, their `api_id` is scheduled on the
+`NAME_RESOLVER` worker, which runs in the event loop of the application:
+
+1. The scheduled ids are grouped in batches (up to `batch_size` ids, or
+   what arrived within `batch_delay` seconds).
+2. The names of a batch are requested concurrently from the PokeAPI.
+3. The pokemons still without a name are updated in one transaction, and
+   the cached list responses are invalidated.
+4. Failed ids, whether their request or the update failed, are scheduled
+   again once with an exponential backoff, up to `max_attempts` attempts.
+
+On startup, the ids of the pokemons left without a name (for example by
+a restart) are scheduled again.
+
+Example:
+```python
+NAME_RESOLVER.start()
+NAME_RESOLVER.schedule(25)
+await NAME_RESOLVER.join()
+await NAME_RESOLVER.stop()
+```
+"""
+
+import asyncio
+import logging
+
+from .. import actions
+from ..sqlite import AsyncSessionLocal
+from . import pokeapi_async
+from .response_cache import DATABASE_TAGS, RESPONSE_CACHE
+
+logger = logging.getLogger(__name__)
+
+
+class NameResolver:
+    """
+        Worker filling the names of the pokemons in the background
+        Parameters:
+            session_factory (callable): Factory of AsyncSession
+            batch_size (int): Maximum number of ids resolved together
+            batch_delay (float): Seconds to wait for more ids before resolving
+            max_attempts (int): Number of attempts before giving up an id
+            retry_delay (float): Delay before the first retry, doubled at each retry
+    """
+
+    def __init__(self, session_factory=AsyncSessionLocal, batch_size=50, batch_delay=0.05,
+                 max_attempts=5, retry_delay=1.0):
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.batch_delay = batch_delay
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self._queue = None
+        self._task = None
+        self._retries = set()
+
+    @property
+    def running(self):
+        """
+            Tell if the worker is started
+        """
+        return self._task is not None and not self._task.done()
+
+    def start(self):
+        """
+            Start the worker in the running event loop
+        """
+        if not self.running:
+            self._queue = asyncio.Queue()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """
+            Stop the worker, dropping the pending ids
+        """
+        for retry in self._retries:
+            retry.cancel()
+        self._retries.clear()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self._queue = None
+
+    async def join(self):
+        """
+            Wait until every scheduled id is processed
+        """
+        while self._queue is not None:
+            await self._queue.join()
+            if not self._retries:
+                break
+            await asyncio.sleep(0.01)
+
+    def schedule(self, api_id, attempt=0):
+        """
+            Resolve the name of the pokemons with this api_id in the background
+        """
+        if self._queue is None:
+            logger.warning("Name resolver not started, api_id %s is not resolved", api_id)
+            return
+        self._queue.put_nowait((api_id, attempt))
+
+    async def schedule_missing(self):
+        """
+            Schedule every api_id of the pokemons without a name
+        """
+        async with self.session_factory() as database:
+            api_ids = await database.run_sync(actions.missing_pokemon_names)
+        for api_id in api_ids:
+            self.schedule(api_id)
+
+    async def _run(self):
+        while True:
+            batch = await self._next_batch()
+            try:
+                await self._resolve(batch)
+            except Exception:  # pylint: disable=broad-except
+                # _resolve schedules the retries itself, each id has one retry path
+                logger.exception("Failed to resolve the pokemon names %s", sorted(batch))
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def _next_batch(self):
+        api_id, attempt = await self._queue.get()
+        batch = {api_id: attempt}
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.batch_delay
+        while len(batch) < self.batch_size:
+            try:
+                api_id, attempt = await asyncio.wait_for(
+                    self._queue.get(), max(deadline - loop.time(), 0)
+                )
+            except asyncio.TimeoutError:
+                break
+            if api_id in batch:
+                self._queue.task_done()
+            batch[api_id] = min(attempt, batch.get(api_id, attempt))
+        return batch
+
+    async def _resolve(self, batch):
+        api_ids = list(batch)
+        results = await asyncio.gather(
+            *[pokeapi_async.get_pokemon_record(api_id) for api_id in api_ids],
+            return_exceptions=True,
+        )
+        names = {}
+        for api_id, result in zip(api_ids, results):
+            if isinstance(result, Exception):
+                logger.warning("Failed to resolve the name of api_id %s: %r", api_id, result)
+                self._retry(api_id, batch[api_id])
+            else:
+                names[api_id] = result.name
+        if names:
+            try:
+                async with self.session_factory() as database:
+                    await database.run_sync(actions.fill_pokemon_names, names)
+            except Exception:  # pylint: disable=broad-except
+                logger.exception("Failed to save the pokemon names %s", sorted(names))
+                # The failed fetches are already scheduled above
+                for api_id in names:
+                    self._retry(api_id, batch[api_id])
+                return
+            RESPONSE_CACHE.invalidate(*DATABASE_TAGS)
+
+    def _retry(self, api_id, attempt):
+        if attempt + 1 >= self.max_attempts:
+            logger.error("Giving up the name of api_id %s after %s attempts", api_id, attempt + 1)
+            return
+
+        def schedule_retry():
+            self._retries.discard(retry)
+            self.schedule(api_id, attempt + 1)
+
+        retry = asyncio.get_running_loop().call_later(
+            self.retry_delay * 2 ** attempt, schedule_retry
+        )
+        self._retries.add(retry)
+
+
+NAME_RESOLVER = NameResolver()
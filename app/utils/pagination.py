@@ -0,0 +1,94 @@
+"""
+Keyset (cursor) pagination helpers.
+
+A cursor is an opaque string holding the id of the last row of a page.
+The next page is read with `id > last_seen_id`, so every page costs the
+same as the first one, whatever its depth.
+
+1. **encode_cursor(last_id):**
+    - Return the cursor pointing after the row `last_id`.
+
+2. **decode_cursor(cursor):**
+    - Return the id stored in a cursor. An empty cursor starts from the
+      first row.
+    - Raises:
+        - ValueError: If the cursor is invalid.
+
+3. **next_cursor(rows, limit):**
+    - Return the cursor of the page following `rows`, or None on the last page.
+
+4. **cursor_after_id(cursor):**
+    - Like `decode_cursor`, for the endpoints: None stays None (skip/limit
+      mode) and an invalid cursor raises an HTTPException (400).
+
+5. **set_next_cursor(response, rows, limit):**
+    - Send the cursor of the next page in the `X-Next-Cursor` header.
+
+Example:
+```python
+cursor = encode_cursor(42)
+decode_cursor(cursor)  # 42
+```
+"""
+
+import base64
+
+from fastapi import HTTPException
+
+CURSOR_HEADER = "X-Next-Cursor"
+
+_PREFIX = "id:"
+
+
+def encode_cursor(last_id):
+    """
+        Return the cursor pointing after the row last_id
+    """
+    token = f"{_PREFIX}{last_id}".encode()
+    return base64.urlsafe_b64encode(token).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    """
+        Return the id stored in a cursor, 0 for an empty cursor
+    """
+    if not cursor:
+        return 0
+    try:
+        token = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError("Invalid cursor") from e
+    if not token.startswith(_PREFIX) or not token[len(_PREFIX):].isdigit():
+        raise ValueError("Invalid cursor")
+    return int(token[len(_PREFIX):])
+
+
+def next_cursor(rows, limit):
+    """
+        Return the cursor of the next page, or None if rows is the last page
+    """
+    if limit <= 0 or len(rows) < limit:
+        return None
+    last = rows[-1]
+    return encode_cursor(last["id"] if isinstance(last, dict) else last.id)
+
+
+def cursor_after_id(cursor):
+    """
+        Return the id stored in a cursor parameter, None if there is no cursor
+    """
+    if cursor is None:
+        return None
+    try:
+        return decode_cursor(cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail="Invalid cursor") from e
+
+
+def set_next_cursor(response, rows, limit):
+    """
+        Send the cursor of the next page in the response headers
+    """
+    cursor = next_cursor(rows, limit)
+    if cursor is not None:
+        response.headers[CURSOR_HEADER] = cursor
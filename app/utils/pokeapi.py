@@ -4,21 +4,113 @@ Utility functions for interacting with the PokeAPI and conducting Pokemon battle
 Includes functions to:
 1. Retrieve a Pokemon's name from the PokeAPI.
 2. Get Pokemon stats from the PokeAPI.
-3. Conduct a battle between two Pokemon.
+3. Conduct a battle between two Pokemon, simulated by `battle`.
 4. Get a specific stat of a Pokemon.
 5. Compare stats between two Pokemon.
-6. Get three random Pokemon and their stats.
+6. Get a parsed record of a Pokemon (name and stat vector) in one fetch.
+7. Get a Pokemon's name from the local data only, without any request.
+
+The three random Pokemon are drawn by `random_pool.RANDOM_POOL`.
+
+The records are kept in `STAT_TABLE`, a compact table with one row of six
+base stats per known pokemon, so battle comparisons are row comparisons.
+
+The PokeAPI payloads are kept in an in-process LRU cache (`POKEMON_CACHE`)
+with a time-to-live and a byte-size cap. Concurrent misses for the same
+`api_id` share a single upstream request. Counters are returned by
+`get_cache_stats()`. Behind the cache, payloads are persisted on disk in
+`POKEMON_STORE` so they survive a restart. The upstream requests are
+timed in `metrics`.
+
+The upstream requests go through a circuit breaker (`UPSTREAM_BREAKER`)
+and are retried with a jittered backoff within the deadline of
+`RETRY_POLICY`. When they fail, `resilience.UpstreamUnavailable` is
+raised. Stored payloads older than `STALE_AFTER` are still served, and
+refreshed in the background (stale-while-revalidate), so a degraded
+upstream does not slow down the known pokemons.
+
+The API root is `BASE_URL`, overridable with the `POKEAPI_BASE_URL`
+environment variable (for example to use `pokeapi_stub` in load tests).
 
 Dependencies:
 - `requests`: Library for making HTTP requests.
-- `random`: Module for generating random numbers.
+- `cache`: In-process caching helpers.
+- `pokeapi_store`: Persistent on-disk store of PokeAPI payloads.
+- `resilience`: Circuit breaker and retry policy.
+- `battle`: Monte Carlo battle simulator.
 """
 
-import random
+import json
+import logging
+import os
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
 import requests
 
+from . import battle, metrics, resilience
+from .cache import SingleFlight, TTLCache
+from .pokeapi_store import PokeapiStore
+from .stat_table import StatTable
+
+
+BASE_URL = os.environ.get("POKEAPI_BASE_URL", "https://pokeapi.co/api/v2")
+
+CACHE_TTL = 24 * 60 * 60
+CACHE_MAX_BYTES = 64 * 1024 * 1024
+
+POKEMON_CACHE = TTLCache(max_bytes=CACHE_MAX_BYTES, ttl=CACHE_TTL)
+POKEMON_STORE = PokeapiStore()
+_pokemon_requests = SingleFlight()
 
-BASE_URL = "https://pokeapi.co/api/v2"
+UPSTREAM_BREAKER = resilience.CircuitBreaker(failure_threshold=5, reset_timeout=30)
+RETRY_POLICY = resilience.RetryPolicy(max_attempts=3, attempt_timeout=2.0, deadline=5.0)
+STALE_AFTER = 7 * 24 * 60 * 60
+REFRESH_WORKERS = 2
+
+_refresh_executor = None
+_refreshing = set()
+_refresh_lock = threading.Lock()
+
+logger = logging.getLogger(__name__)
+
+STAT_NAMES = ['hp', 'attack', 'defense', 'special-attack', 'special-defense', 'speed']
+
+PokemonRecord = namedtuple("PokemonRecord", ["api_id", "name", "stats"])
+PokemonRecord.__doc__ = """
+    Parsed pokemon: its name and its base stats, in the order of STAT_NAMES
+"""
+
+STAT_TABLE = StatTable(record_type=PokemonRecord)
+
+
+def get_pokemon_record(api_id):
+    """
+    Get the name and the stat vector of a pokemon with a single fetch
+    """
+    record = STAT_TABLE.get(api_id)
+    if record is None:
+        record = make_pokemon_record(api_id, get_pokemon_data(api_id))
+    return record
+
+
+def make_pokemon_record(api_id, data):
+    """
+    Build a pokemon record from the data of the API pokeapi
+    and add it to the stat table
+    """
+    record = PokemonRecord(api_id, data['name'], stat_vector(data['stats']))
+    STAT_TABLE.add(record)
+    return record
+
+
+def stat_vector(pokemon_stats):
+    """
+    Give the base stats of a pokemon, in the order of STAT_NAMES
+    """
+    return tuple(get_stat(pokemon_stats, stat_name) for stat_name in STAT_NAMES)
 
 
 def get_pokemon_name(api_id):
@@ -28,6 +120,24 @@ def get_pokemon_name(api_id):
     return get_pokemon_data(api_id)['name']
 
 
+def get_cached_pokemon_name(api_id):
+    """
+    Get a pokemon name from the stat table, the cache or the store
+    Return None instead of requesting the API pokeapi
+    """
+    record = STAT_TABLE.get(api_id)
+    if record is not None:
+        return record.name
+    data = POKEMON_CACHE.get(api_id)
+    if data is None:
+        payload = POKEMON_STORE.get(api_id)
+        if payload is None:
+            return None
+        data = json.loads(payload)
+        POKEMON_CACHE.set(api_id, data, size=len(payload))
+    return make_pokemon_record(api_id, data).name
+
+
 def get_pokemon_stats(api_id):
     """
     Get pokemon stats from the API pokeapi
@@ -38,73 +148,150 @@ def get_pokemon_stats(api_id):
 def get_pokemon_data(api_id):
     """
     Get data of pokemon name from the API pokeapi
+    The data is served from the cache when possible
     """
-    return requests.get(f"{BASE_URL}/pokemon/{api_id}", timeout=10).json()
+    data = POKEMON_CACHE.get(api_id)
+    if data is None:
+        data = _pokemon_requests.do(api_id, load_pokemon_data, api_id)
+    return data
 
 
-def battle_pokemon(first_api_id, second_api_id):
+def load_pokemon_data(api_id):
     """
-    Do battle between 2 pokemons
+    Read the data of a pokemon from the local store,
+    or request the API pokeapi if it is not stored
+    Stale data is served and refreshed in the background
     """
-    first_p = get_pokemon_data(first_api_id)
-    second_p = get_pokemon_data(second_api_id)
-    battle_result = 0
-    return first_p if battle_result > 0 else second_p if battle_result < 0 else {'winner': 'draw'}
+    entry = POKEMON_STORE.get_entry(api_id)
+    if entry is None:
+        return fetch_pokemon_data(api_id)
+    payload, fetched_at = entry
+    data = json.loads(payload)
+    POKEMON_CACHE.set(api_id, data, size=len(payload))
+    if time.time() - fetched_at > STALE_AFTER:
+        schedule_refresh(api_id)
+    return data
 
 
-def get_stat(pokemon_stats, stat_name):
+def schedule_refresh(api_id):
     """
-    Give a specific stat value of a Pokemon.
+    Fetch again the data of a pokemon in a background thread
     """
-    for stat in pokemon_stats:
-        if stat['stat']['name'] == stat_name:
-            return stat['base_stat']
-    return None
+    global _refresh_executor  # pylint: disable=global-statement
+    with _refresh_lock:
+        if api_id in _refreshing:
+            return
+        _refreshing.add(api_id)
+        if _refresh_executor is None:
+            _refresh_executor = ThreadPoolExecutor(max_workers=REFRESH_WORKERS,
+                                                   thread_name_prefix="pokeapi-refresh")
+    _refresh_executor.submit(refresh_pokemon_data, api_id)
 
 
-def battle_compare_stats(first_pokemon_stats, second_pokemon_stats):
+def refresh_pokemon_data(api_id):
     """
-    Compare given stat between two pokemons
+    Fetch again the data of a pokemon, keeping the stale data on failure
     """
-    first_pokemon = get_pokemon_stats(first_pokemon_stats)
-    second_pokemon = get_pokemon_stats(second_pokemon_stats)
+    try:
+        data = fetch_pokemon_data(api_id)
+        if api_id in STAT_TABLE:
+            make_pokemon_record(api_id, data)
+    except Exception as error:  # pylint: disable=broad-except
+        logger.warning("Failed to refresh the data of api_id %s: %r", api_id, error)
+    finally:
+        with _refresh_lock:
+            _refreshing.discard(api_id)
 
-    first_pokemon_counter = 0
-    second_pokemon_counter = 0
-    equal_counter = 0
 
-    stat_names = ['hp', 'attack', 'defense', 'special-attack', 'special-defense', 'speed']
+def request_pokemon(api_id):
+    """
+    Request the API pokeapi through the circuit breaker,
+    retrying the failed attempts within the deadline of RETRY_POLICY
+    """
+    url = f"{BASE_URL}/pokemon/{api_id}"
+    deadline = resilience.Deadline(RETRY_POLICY.deadline)
+    error = None
+    for attempt in range(RETRY_POLICY.max_attempts):
+        if not UPSTREAM_BREAKER.allow():
+            raise resilience.CircuitOpen(UPSTREAM_BREAKER.retry_after()) from error
+        start = time.perf_counter()
+        try:
+            response = requests.get(
+                url, timeout=min(RETRY_POLICY.attempt_timeout, deadline.remaining()))
+        except requests.RequestException as request_error:
+            metrics.observe_upstream("sync", "error", time.perf_counter() - start)
+            error = request_error
+        else:
+            metrics.observe_upstream("sync", response.status_code, time.perf_counter() - start)
+            if not resilience.is_retryable(response.status_code):
+                UPSTREAM_BREAKER.record_success()
+                return response
+            error = requests.HTTPError(f"{response.status_code} for {url}", response=response)
+        UPSTREAM_BREAKER.record_failure()
+        delay = resilience.retry_delay(RETRY_POLICY, attempt)
+        if attempt + 1 == RETRY_POLICY.max_attempts or delay >= deadline.remaining():
+            break
+        time.sleep(delay)
+    raise resilience.UpstreamUnavailable(f"PokeAPI failed for api_id {api_id}") from error
 
-    for stat_name in stat_names:
-        first_pokemon_stat = get_stat(first_pokemon, stat_name)
-        second_pokemon_stat = get_stat(second_pokemon, stat_name)
 
-        if first_pokemon_stat > second_pokemon_stat:
-            first_pokemon_counter += 1
-        elif first_pokemon_stat < second_pokemon_stat:
-            second_pokemon_counter += 1
-        else:
-            equal_counter += 1
+def fetch_pokemon_data(api_id):
+    """
+    Request the API pokeapi, then cache and store successful responses
+    """
+    response = request_pokemon(api_id)
+    data = response.json()
+    if response.ok:
+        POKEMON_CACHE.set(api_id, data, size=len(response.content))
+        POKEMON_STORE.put(api_id, response.content)
+    return data
 
-    return first_pokemon_counter, second_pokemon_counter, equal_counter
 
+def get_cache_stats():
+    """
+    Return the hit, miss and eviction counters of the pokeapi cache
+    """
+    stats = POKEMON_CACHE.stats()
+    stats["coalesced"] = _pokemon_requests.coalesced
+    return stats
 
-def random_pokemon():
+
+def make_fighter(api_id, data):
     """
-    Gives three random pokemons and their stats
+    Build a battle fighter from the data of the API pokeapi
     """
-    pokemons = []
-    pokemons_names = []
-    stat_names = ['hp', 'attack', 'defense', 'special-attack', 'special-defense', 'speed']
+    types = sorted(data.get('types', []), key=lambda pokemon_type: pokemon_type.get('slot', 0))
+    return battle.Fighter(api_id, data['name'], stat_vector(data['stats']),
+                          tuple(pokemon_type['type']['name'] for pokemon_type in types))
 
-    for _ in range(3):
-        random_number = random.randint(0, 150)
-        pokemon_name = get_pokemon_name(random_number)
-        pokemon = get_pokemon_stats(random_number)
 
-        pokemons_names.append(pokemon_name)
-        for stat_name in stat_names:
-            pokemon_stat = get_stat(pokemon, stat_name)
-            pokemons.append((stat_name, pokemon_stat))
+def battle_pokemon(first_api_id, second_api_id, fights=battle.DEFAULT_FIGHTS, seed=None):
+    """
+    Do battle between 2 pokemons
+    The winner is the pokemon winning most of the simulated fights
+    """
+    first_p = get_pokemon_data(first_api_id)
+    second_p = get_pokemon_data(second_api_id)
+    result = battle.simulate_battle(make_fighter(first_api_id, first_p),
+                                    make_fighter(second_api_id, second_p), fights, seed)
+    battle_result = result.wins - result.losses
+    return first_p if battle_result > 0 else second_p if battle_result < 0 else {'winner': 'draw'}
+
+
+def get_stat(pokemon_stats, stat_name):
+    """
+    Give a specific stat value of a Pokemon.
+    """
+    for stat in pokemon_stats:
+        if stat['stat']['name'] == stat_name:
+            return stat['base_stat']
+    return None
+
 
-    return pokemons, pokemons_names
+def battle_compare_stats(first_pokemon_stats, second_pokemon_stats):
+    """
+    Compare given stat between two pokemons
+    """
+    get_pokemon_record(first_pokemon_stats)
+    get_pokemon_record(second_pokemon_stats)
+    return STAT_TABLE.compare(first_pokemon_stats, second_pokemon_stats)
@@ -0,0 +1,244 @@
+"""
+Asynchronous client for the PokeAPI.
+
+Async counterparts of the functions of `pokeapi`, meant to be awaited
+from `async def` endpoints so that an upstream round trip does not hold
+a worker thread.
+
+All the requests share one pooled, keep-alive `httpx.AsyncClient`, and
+the number of in-flight requests per host is limited by a semaphore.
+The in-process cache and the on-disk store of `pokeapi` are shared with
+the synchronous client, and concurrent misses for the same `api_id` share
+a single upstream request. So are the circuit breaker and the retry policy:
+failed attempts are retried with a jittered backoff within a deadline,
+and stale stored payloads are served while a background task refreshes them.
+
+Includes functions to:
+1. Retrieve a Pokemon's data, name, stats, parsed record or battle fighter
+   from the PokeAPI.
+2. Compare stats between two Pokemon.
+3. Close the shared HTTP client (`aclose()`), on application shutdown.
+
+Dependencies:
+- `httpx`: HTTP client with asyncio support.
+- `anyio`: Run the blocking store reads and writes in a worker thread.
+- `pokeapi`: Synchronous client, cache and store.
+- `metrics`: Timing of the upstream requests.
+- `resilience`: Circuit breaker and retry policy.
+"""
+
+import asyncio
+import json
+import logging
+import time
+from urllib.parse import urlsplit
+
+import anyio
+import httpx
+
+from . import metrics, pokeapi, resilience
+
+TIMEOUT = 10
+MAX_CONNECTIONS = 100
+MAX_KEEPALIVE_CONNECTIONS = 20
+MAX_REQUESTS_PER_HOST = 50
+
+_client = None
+_host_limits = {}
+_pending = {}
+_refresh_tasks = {}
+
+logger = logging.getLogger(__name__)
+
+
+def get_client():
+    """
+    Return the shared HTTP client, creating it on first use
+    """
+    global _client  # pylint: disable=global-statement
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            timeout=TIMEOUT,
+            limits=httpx.Limits(
+                max_connections=MAX_CONNECTIONS,
+                max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+            ),
+        )
+    return _client
+
+
+async def aclose():
+    """
+    Close the shared HTTP client
+    """
+    global _client  # pylint: disable=global-statement
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+    for task in list(_refresh_tasks.values()):
+        task.cancel()
+    _refresh_tasks.clear()
+    _host_limits.clear()
+
+
+def _host_limit(url):
+    host = urlsplit(url).netloc
+    if host not in _host_limits:
+        _host_limits[host] = asyncio.Semaphore(MAX_REQUESTS_PER_HOST)
+    return _host_limits[host]
+
+
+async def get_pokemon_name(api_id):
+    """
+    Get a pokemon name from the API pokeapi
+    """
+    return (await get_pokemon_data(api_id))['name']
+
+
+async def get_pokemon_stats(api_id):
+    """
+    Get pokemon stats from the API pokeapi
+    """
+    return (await get_pokemon_data(api_id))['stats']
+
+
+async def get_pokemon_record(api_id):
+    """
+    Get the name and the stat vector of a pokemon with a single fetch
+    """
+    record = pokeapi.STAT_TABLE.get(api_id)
+    if record is None:
+        record = pokeapi.make_pokemon_record(api_id, await get_pokemon_data(api_id))
+    return record
+
+
+async def get_pokemon_records(api_ids):
+    """
+    Get the records of several pokemons concurrently
+    Each distinct pokemon is fetched once
+    """
+    unique_ids = list(dict.fromkeys(api_ids))
+    records = await asyncio.gather(*[get_pokemon_record(api_id) for api_id in unique_ids])
+    records = dict(zip(unique_ids, records))
+    return [records[api_id] for api_id in api_ids]
+
+
+async def get_fighters(api_ids):
+    """
+    Get the battle fighters of several pokemons concurrently
+    Each distinct pokemon is fetched once
+    """
+    unique_ids = list(dict.fromkeys(api_ids))
+    payloads = await asyncio.gather(*[get_pokemon_data(api_id) for api_id in unique_ids])
+    fighters = {api_id: pokeapi.make_fighter(api_id, data)
+                for api_id, data in zip(unique_ids, payloads)}
+    return [fighters[api_id] for api_id in api_ids]
+
+
+async def get_pokemon_data(api_id):
+    """
+    Get data of pokemon name from the API pokeapi
+    The data is served from the cache when possible
+    """
+    data = pokeapi.POKEMON_CACHE.get(api_id)
+    if data is not None:
+        return data
+    pending = _pending.get(api_id)
+    if pending is not None:
+        return await asyncio.shield(pending)
+    pending = _pending[api_id] = asyncio.ensure_future(load_pokemon_data(api_id))
+    pending.add_done_callback(lambda _: _pending.pop(api_id, None))
+    return await asyncio.shield(pending)
+
+
+async def load_pokemon_data(api_id):
+    """
+    Read the data of a pokemon from the local store,
+    or request the API pokeapi if it is not stored
+    """
+    entry = await anyio.to_thread.run_sync(pokeapi.POKEMON_STORE.get_entry, api_id)
+    if entry is None:
+        return await fetch_pokemon_data(api_id)
+    payload, fetched_at = entry
+    data = json.loads(payload)
+    pokeapi.POKEMON_CACHE.set(api_id, data, size=len(payload))
+    if time.time() - fetched_at > pokeapi.STALE_AFTER:
+        schedule_refresh(api_id)
+    return data
+
+
+def schedule_refresh(api_id):
+    """
+    Fetch again the data of a pokemon in a background task
+    """
+    if api_id not in _refresh_tasks:
+        task = _refresh_tasks[api_id] = asyncio.ensure_future(refresh_pokemon_data(api_id))
+        task.add_done_callback(lambda _: _refresh_tasks.pop(api_id, None))
+
+
+async def refresh_pokemon_data(api_id):
+    """
+    Fetch again the data of a pokemon, keeping the stale data on failure
+    """
+    try:
+        data = await fetch_pokemon_data(api_id)
+        if api_id in pokeapi.STAT_TABLE:
+            pokeapi.make_pokemon_record(api_id, data)
+    except Exception as error:  # pylint: disable=broad-except
+        logger.warning("Failed to refresh the data of api_id %s: %r", api_id, error)
+
+
+async def request_pokemon(api_id):
+    """
+    Request the API pokeapi through the circuit breaker,
+    retrying the failed attempts within the deadline of the retry policy
+    """
+    url = f"{pokeapi.BASE_URL}/pokemon/{api_id}"
+    breaker, policy = pokeapi.UPSTREAM_BREAKER, pokeapi.RETRY_POLICY
+    deadline = resilience.Deadline(policy.deadline)
+    error = None
+    for attempt in range(policy.max_attempts):
+        if not breaker.allow():
+            raise resilience.CircuitOpen(breaker.retry_after()) from error
+        async with _host_limit(url):
+            start = time.perf_counter()
+            try:
+                response = await get_client().get(
+                    url, timeout=min(policy.attempt_timeout, deadline.remaining()))
+            except httpx.HTTPError as request_error:
+                metrics.observe_upstream("async", "error", time.perf_counter() - start)
+                error = request_error
+            else:
+                metrics.observe_upstream("async", response.status_code,
+                                         time.perf_counter() - start)
+                if not resilience.is_retryable(response.status_code):
+                    breaker.record_success()
+                    return response
+                error = httpx.HTTPStatusError(f"{response.status_code} for {url}",
+                                              request=response.request, response=response)
+        breaker.record_failure()
+        delay = resilience.retry_delay(policy, attempt)
+        if attempt + 1 == policy.max_attempts or delay >= deadline.remaining():
+            break
+        await asyncio.sleep(delay)
+    raise resilience.UpstreamUnavailable(f"PokeAPI failed for api_id {api_id}") from error
+
+
+async def fetch_pokemon_data(api_id):
+    """
+    Request the API pokeapi, then cache and store successful responses
+    """
+    response = await request_pokemon(api_id)
+    data = response.json()
+    if response.is_success:
+        pokeapi.POKEMON_CACHE.set(api_id, data, size=len(response.content))
+        await anyio.to_thread.run_sync(pokeapi.POKEMON_STORE.put, api_id, response.content)
+    return data
+
+
+async def battle_compare_stats(first_pokemon_stats, second_pokemon_stats):
+    """
+    Compare given stat between two pokemons
+    """
+    await get_pokemon_records([first_pokemon_stats, second_pokemon_stats])
+    return pokeapi.STAT_TABLE.compare(first_pokemon_stats, second_pokemon_stats)
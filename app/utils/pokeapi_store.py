@@ -0,0 +1,186 @@
+"""
+Persistent on-disk store for PokeAPI payloads.
+
+The payloads returned by the PokeAPI are saved, compressed, in a SQLite
+file next to `sqlite.db`. The in-process cache of `pokeapi` reads from this
+store before requesting the API, so a restarted process does not have to
+request the upstream again for data it already knows. The file is
+`STORE_PATH`, overridable with the `POKEAPI_STORE` environment variable.
+
+1. **PokeapiStore:**
+    - `get(api_id)`: Return the raw JSON payload of a pokemon, or None.
+    - `get_entry(api_id)`: Return the payload and its fetch timestamp, or None.
+    - `put(api_id, payload)`: Save the raw JSON payload of a pokemon.
+    - `ids()`: Return the stored ids.
+    - The database file is only opened on first use.
+
+2. **warm_up(api_ids, workers, refresh):**
+    - Prefetch the given pokemons into the store.
+
+3. **Command line:**
+    - Prefetch the 151 first species (the ids of the `RandomPool`) and
+      every `api_id` of the `pokemons` table:
+        ```
+        python -m app.utils.pokeapi_store warm
+        ```
+"""
+
+import argparse
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+from .. import models
+from ..sqlite import SessionLocal
+
+STORE_PATH = os.environ.get("POKEAPI_STORE", "./pokeapi.db")
+
+RANDOM_POKEMON_IDS = range(1, 152)
+
+
+class PokeapiStore:
+    """
+        SQLite table of compressed PokeAPI payloads
+        Parameters:
+            path (str): Path of the SQLite file
+    """
+
+    def __init__(self, path=STORE_PATH):
+        self.path = str(path)
+        self._connection = None
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        if self._connection is None:
+            connection = sqlite3.connect(self.path, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS pokemon_payloads ("
+                "api_id INTEGER PRIMARY KEY, "
+                "payload BLOB NOT NULL, "
+                "fetched_at REAL NOT NULL)"
+            )
+            connection.commit()
+            self._connection = connection
+        return self._connection
+
+    def get(self, api_id):
+        """
+            Return the raw JSON payload of a pokemon, or None if it is not stored
+        """
+        entry = self.get_entry(api_id)
+        return None if entry is None else entry[0]
+
+    def get_entry(self, api_id):
+        """
+            Return the raw JSON payload of a pokemon and its fetch timestamp,
+            or None if it is not stored
+        """
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT payload, fetched_at FROM pokemon_payloads WHERE api_id = ?", (api_id,)
+            ).fetchone()
+        return None if row is None else (zlib.decompress(row[0]), row[1])
+
+    def put(self, api_id, payload):
+        """
+            Save the raw JSON payload of a pokemon
+        """
+        blob = zlib.compress(payload)
+        with self._lock:
+            connection = self._connect()
+            connection.execute(
+                "INSERT OR REPLACE INTO pokemon_payloads (api_id, payload, fetched_at) "
+                "VALUES (?, ?, ?)",
+                (api_id, blob, time.time()),
+            )
+            connection.commit()
+
+    def __contains__(self, api_id):
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT 1 FROM pokemon_payloads WHERE api_id = ?", (api_id,)
+            ).fetchone()
+        return row is not None
+
+    def ids(self):
+        """
+            Return the ids of the stored pokemons
+        """
+        with self._lock:
+            rows = self._connect().execute("SELECT api_id FROM pokemon_payloads").fetchall()
+        return {row[0] for row in rows}
+
+    def close(self):
+        """
+            Close the database file
+        """
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+
+def trainer_pokemon_ids():
+    """
+        Return the api_id of every pokemon owned by a trainer
+    """
+    database = SessionLocal()
+    try:
+        rows = database.query(models.Pokemon.api_id).distinct().all()
+    finally:
+        database.close()
+    return {api_id for (api_id,) in rows if api_id is not None}
+
+
+def warm_up(api_ids, workers=8, refresh=False):
+    """
+        Prefetch pokemons from the API pokeapi into the store
+        Return the ids that were fetched and the ids that failed
+    """
+    # pylint: disable=import-outside-toplevel
+    from . import pokeapi
+
+    store = pokeapi.POKEMON_STORE
+    if not refresh:
+        api_ids = set(api_ids) - store.ids()
+
+    def fetch(api_id):
+        try:
+            pokeapi.fetch_pokemon_data(api_id)
+        except Exception:  # pylint: disable=broad-except
+            return api_id, False
+        return api_id, api_id in store
+
+    fetched, failed = [], []
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for api_id, success in executor.map(fetch, sorted(api_ids)):
+            (fetched if success else failed).append(api_id)
+    return fetched, failed
+
+
+def main(argv=None):
+    """
+        Command line entry point
+    """
+    parser = argparse.ArgumentParser(description="Manage the local PokeAPI store.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    warm = commands.add_parser("warm", help="Prefetch pokemons into the store.")
+    warm.add_argument("--workers", type=int, default=8,
+                      help="Number of concurrent requests (default: 8).")
+    warm.add_argument("--refresh", action="store_true",
+                      help="Fetch again the pokemons already stored.")
+    arguments = parser.parse_args(argv)
+
+    if arguments.command == "warm":
+        api_ids = set(RANDOM_POKEMON_IDS) | trainer_pokemon_ids()
+        fetched, failed = warm_up(api_ids, workers=arguments.workers,
+                                  refresh=arguments.refresh)
+        print(f"Fetched {len(fetched)} pokemons, {len(failed)} failed: {failed}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,314 @@
+"""
+Local stand-in for the PokeAPI, for offline and repeatable tests and load tests.
+
+Serves `GET /api/v2/pokemon/{api_id}` for the 151 first species, with
+payloads shaped like the ones of the PokeAPI (`id`, `name` and `stats`)
+built from the fixture `pokeapi_species.csv`. Any other path answers 404.
+
+The behaviour of the upstream can be degraded with a `StubConfig`:
+- `latency`: Delay before each answer, drawn from a `Latency` distribution
+  (`constant`, `uniform`, `normal`, `exponential` or `lognormal`, with a
+  mean and a standard deviation in seconds).
+- `error_rate`: Share of the requests answered with `error_status`.
+- `rate_limit`: Requests per second allowed (token bucket of `burst`
+  requests), the others are answered 429 with a `Retry-After` header.
+- `seed`: Seed of the latency and error draws, for repeatable runs.
+
+1. **make_payload(api_id):**
+    - Return the payload of a pokemon, as a dict, or None if it is unknown.
+
+2. **StubServer(host, port, config):**
+    - `start()`: Serve in a background thread, return the server.
+    - `base_url`: API root to use as `POKEAPI_BASE_URL`.
+    - `counters`: Number of answers per status.
+    - `stop()`: Stop serving.
+
+3. **Command line:**
+    - Serve until interrupted:
+        ```
+        python -m app.utils.pokeapi_stub --port 8001 \\
+            --latency lognormal --latency-mean 0.08 --latency-deviation 0.05 \\
+            --error-rate 0.01 --rate-limit 100
+        POKEAPI_BASE_URL=http://127.0.0.1:8001/api/v2 uvicorn main:app
+        ```
+"""
+
+import argparse
+import csv
+import json
+import math
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter, namedtuple
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from .pokeapi import STAT_NAMES
+
+API_ROOT = "/api/v2"
+STAT_URL = "https://pokeapi.co/api/v2/stat/{}/"
+POKEMON_PATH = re.compile(r"^/api/v2/pokemon/(\d+)/?$")
+SPECIES_PATH = os.path.join(os.path.dirname(__file__), "pokeapi_species.csv")
+
+LATENCY_DISTRIBUTIONS = ("constant", "uniform", "normal", "exponential", "lognormal")
+
+Latency = namedtuple("Latency", ["distribution", "mean", "deviation"],
+                     defaults=["constant", 0.0, 0.0])
+Latency.__doc__ = """
+    Distribution of the answer delays, mean and deviation in seconds
+"""
+
+StubConfig = namedtuple("StubConfig",
+                        ["latency", "error_rate", "error_status", "rate_limit", "burst", "seed"],
+                        defaults=[Latency(), 0.0, 503, None, 10, None])
+StubConfig.__doc__ = """
+    Latency, failures and rate limit of the stand-in, no degradation by default
+"""
+
+
+def load_species(path=SPECIES_PATH):
+    """
+        Read the species fixture, return a dict of api_id to payload
+    """
+    species = {}
+    with open(path, newline="", encoding="utf-8") as species_file:
+        for row in csv.DictReader(species_file):
+            api_id = int(row["id"])
+            species[api_id] = {
+                "id": api_id,
+                "name": row["name"],
+                "stats": [
+                    {
+                        "base_stat": int(row[name]),
+                        "effort": int(row[f"effort-{name}"]),
+                        "stat": {"name": name, "url": STAT_URL.format(index + 1)},
+                    }
+                    for index, name in enumerate(STAT_NAMES)
+                ],
+            }
+    return species
+
+
+SPECIES = load_species()
+
+
+def make_payload(api_id):
+    """
+        Return the payload of a pokemon, or None if it is not in the fixture
+    """
+    return SPECIES.get(api_id)
+
+
+def sample_latency(latency, rng):
+    """
+        Draw a delay in seconds from a latency distribution
+    """
+    mean, deviation = latency.mean, latency.deviation
+    if latency.distribution == "constant" or mean <= 0:
+        delay = mean
+    elif latency.distribution == "uniform":
+        half_width = deviation * math.sqrt(3)
+        delay = rng.uniform(mean - half_width, mean + half_width)
+    elif latency.distribution == "normal":
+        delay = rng.gauss(mean, deviation)
+    elif latency.distribution == "exponential":
+        delay = rng.expovariate(1 / mean)
+    elif latency.distribution == "lognormal":
+        sigma = math.sqrt(math.log(1 + (deviation / mean) ** 2))
+        delay = rng.lognormvariate(math.log(mean) - sigma ** 2 / 2, sigma)
+    else:
+        raise ValueError(f"Unknown latency distribution {latency.distribution!r}")
+    return max(delay, 0.0)
+
+
+class TokenBucket:
+    """
+        Allow rate requests per second, with bursts of up to burst requests
+    """
+
+    def __init__(self, rate, burst, clock=time.monotonic):
+        self.rate = rate
+        self.burst = burst
+        self._clock = clock
+        self._tokens = burst
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """
+            Take a token, return 0 or the seconds to wait for the next one
+        """
+        with self._lock:
+            now = self._clock()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0
+            return (1 - self._tokens) / self.rate
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """
+        Answer the pokemon requests of the PokeAPI
+    """
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        """
+            Send the payload of the requested pokemon, or the injected failure
+        """
+        stub = self.server.stub
+        retry_after = stub.bucket.acquire() if stub.bucket is not None else 0
+        if retry_after:
+            self.send_json(429, {"detail": "Too many requests"},
+                           {"Retry-After": str(math.ceil(retry_after))})
+            return
+        delay, failed = stub.draw()
+        if delay:
+            time.sleep(delay)
+        match = POKEMON_PATH.match(self.path)
+        payload = make_payload(int(match.group(1))) if match is not None else None
+        if failed:
+            self.send_json(stub.config.error_status, {"detail": "Injected failure"})
+        elif payload is None:
+            self.send_json(404, {"detail": "Not found"})
+        else:
+            self.send_json(200, payload)
+
+    def send_json(self, status, data, headers=None):
+        """
+            Send a JSON response
+        """
+        body = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+        self.server.stub.counters[status] += 1
+
+    def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+        pass
+
+
+class QuietServer(ThreadingHTTPServer):
+    """
+        HTTP server ignoring the clients that close the connection early
+    """
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+class StubServer:
+    """
+        PokeAPI stand-in served from a background thread
+        Parameters:
+            host (str): Listened address
+            port (int): Listened port, 0 for any free port
+            config (StubConfig): Injected latency, failures and rate limit
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, config=None, handler=StubHandler):
+        self.config = StubConfig() if config is None else config
+        if self.config.latency.distribution not in LATENCY_DISTRIBUTIONS:
+            raise ValueError(f"Unknown latency distribution {self.config.latency.distribution!r}")
+        self.bucket = (TokenBucket(self.config.rate_limit, self.config.burst)
+                       if self.config.rate_limit else None)
+        self.counters = Counter()
+        self._rng = random.Random(self.config.seed)
+        self._rng_lock = threading.Lock()
+        self.server = QuietServer((host, port), handler)
+        self.server.stub = self
+        self._thread = None
+
+    @property
+    def base_url(self):
+        """
+            API root of the server, to use as POKEAPI_BASE_URL
+        """
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}{API_ROOT}"
+
+    def draw(self):
+        """
+            Draw the delay and the injected failure of a request
+        """
+        with self._rng_lock:
+            delay = sample_latency(self.config.latency, self._rng)
+            failed = self._rng.random() < self.config.error_rate
+        return delay, failed
+
+    def start(self):
+        """
+            Serve in a background thread
+        """
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """
+            Stop serving and close the socket
+        """
+        self.server.shutdown()
+        self.server.server_close()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+
+def main(argv=None):
+    """
+        Command line entry point
+    """
+    parser = argparse.ArgumentParser(description="Serve a local stand-in of the PokeAPI.")
+    parser.add_argument("--host", default="127.0.0.1", help="Listened address.")
+    parser.add_argument("--port", type=int, default=8001,
+                        help="Listened port (default: 8001).")
+    parser.add_argument("--latency", choices=LATENCY_DISTRIBUTIONS, default="constant",
+                        help="Distribution of the answer delays (default: constant).")
+    parser.add_argument("--latency-mean", type=float, default=0.0,
+                        help="Mean answer delay, in seconds (default: 0).")
+    parser.add_argument("--latency-deviation", type=float, default=0.0,
+                        help="Standard deviation of the answer delay, in seconds (default: 0).")
+    parser.add_argument("--error-rate", type=float, default=0.0,
+                        help="Share of the requests answered with an error (default: 0).")
+    parser.add_argument("--error-status", type=int, default=503,
+                        help="Status of the injected errors (default: 503).")
+    parser.add_argument("--rate-limit", type=float, default=None,
+                        help="Requests per second allowed, answered 429 above (default: none).")
+    parser.add_argument("--burst", type=int, default=10,
+                        help="Requests allowed in a burst by the rate limit (default: 10).")
+    parser.add_argument("--seed", type=int, default=None,
+                        help="Seed of the latency and error draws.")
+    arguments = parser.parse_args(argv)
+
+    config = StubConfig(
+        latency=Latency(arguments.latency, arguments.latency_mean, arguments.latency_deviation),
+        error_rate=arguments.error_rate,
+        error_status=arguments.error_status,
+        rate_limit=arguments.rate_limit,
+        burst=arguments.burst,
+        seed=arguments.seed,
+    )
+    server = StubServer(arguments.host, arguments.port, config)
+    print(f"Serving the PokeAPI stub on {server.base_url}")
+    try:
+        server.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Pool of the Pokemon that can be drawn randomly.
+
+The records (name and stats) of the 151 first Pokemon are fetched once,
+on first use, and kept in an immutable tuple. Drawing Pokemon is then an
+in-memory sample, without replacement, instead of upstream requests.
+
+1. **RandomPool:**
+    - `get()`: Return the loaded pool, loading it on first use.
+    - `draw(count, seed)`: Draw distinct Pokemon from the loaded pool.
+      A seed gives reproducible draws, for load tests.
+
+Example:
+```python
+pool = await RANDOM_POOL.get()
+pool.draw(3, seed=42)
+```
+"""
+
+import asyncio
+import random
+
+from . import pokeapi_async
+
+POOL_IDS = range(1, 152)
+
+
+class RandomPool:
+    """
+        Immutable pool of pokemon records to draw from
+        Parameters:
+            api_ids (iterable): Ids of the pokemons of the pool
+    """
+
+    def __init__(self, api_ids=POOL_IDS):
+        self.api_ids = tuple(api_ids)
+        self.records = None
+        self._lock = None
+
+    def __len__(self):
+        return len(self.api_ids)
+
+    async def get(self):
+        """
+            Return the pool, fetching the records on first use
+        """
+        if self.records is None:
+            if self._lock is None:
+                self._lock = asyncio.Lock()
+            async with self._lock:
+                if self.records is None:
+                    self.records = tuple(await pokeapi_async.get_pokemon_records(self.api_ids))
+        return self
+
+    def draw(self, count=3, seed=None):
+        """
+            Draw count distinct pokemon records
+        """
+        generator = random if seed is None else random.Random(seed)
+        return generator.sample(self.records, count)
+
+    def clear(self):
+        """
+            Forget the records, they are fetched again on next use
+        """
+        self.records = None
+
+
+RANDOM_POOL = RandomPool()
@@ -0,0 +1,169 @@
+"""
+Resilience helpers for the calls to an unreliable upstream.
+
+1. **CircuitBreaker:**
+    - Opened after `failure_threshold` consecutive failures, the calls then
+      fail fast with `CircuitOpen` instead of waiting for the upstream.
+    - After `reset_timeout` seconds, one probe call is let through
+      (half-open): its success closes the circuit, its failure opens it again.
+
+2. **RetryPolicy:**
+    - At most `max_attempts` attempts of `attempt_timeout` seconds each,
+      within a `deadline` budget for the whole call.
+    - `retry_delay(policy, attempt)`: Jittered exponential backoff
+      ("full jitter") before the next attempt.
+
+3. **Deadline:**
+    - `remaining()`: Seconds left in the budget of a call.
+
+4. **UpstreamUnavailable:**
+    - Raised when the upstream failed every attempt, or when its circuit
+      is open (`CircuitOpen`).
+
+Example:
+```python
+breaker = CircuitBreaker(failure_threshold=5, reset_timeout=30)
+if not breaker.allow():
+    raise CircuitOpen(breaker.retry_after())
+```
+"""
+
+import random
+import threading
+import time
+from collections import namedtuple
+
+
+class UpstreamUnavailable(Exception):
+    """
+        The upstream did not answer successfully
+    """
+
+
+class CircuitOpen(UpstreamUnavailable):
+    """
+        The circuit of the upstream is open, the call was not attempted
+    """
+
+    def __init__(self, retry_after):
+        super().__init__(f"Circuit open, retry in {retry_after:.1f}s")
+        self.retry_after = retry_after
+
+
+def is_retryable(status):
+    """
+        Tell if a response status is worth another attempt
+    """
+    return status == 429 or status >= 500
+
+
+class CircuitBreaker:
+    """
+        Fail fast after repeated failures of an upstream
+        Parameters:
+            failure_threshold (int): Consecutive failures opening the circuit
+            reset_timeout (float): Seconds before a probe call is let through
+            clock (callable): Time source, defaults to time.monotonic
+    """
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half-open"
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+
+    @property
+    def state(self):
+        """
+            Return the state of the circuit
+        """
+        with self._lock:
+            if self._state == self.OPEN and self._clock() - self._opened_at >= self.reset_timeout:
+                return self.HALF_OPEN
+            return self._state
+
+    def allow(self):
+        """
+            Tell if a call may be attempted
+            In the half-open state, only one probe call is allowed at a time
+        """
+        with self._lock:
+            if self._state == self.CLOSED:
+                return True
+            # A probe whose outcome was never recorded does not block the circuit
+            now = self._clock()
+            if now - self._opened_at >= self.reset_timeout:
+                self._state = self.HALF_OPEN
+                self._opened_at = now
+                return True
+            return False
+
+    def retry_after(self):
+        """
+            Return the seconds before the next probe call
+        """
+        with self._lock:
+            if self._state == self.CLOSED:
+                return 0.0
+            return max(self.reset_timeout - (self._clock() - self._opened_at), 0.0)
+
+    def record_success(self):
+        """
+            Close the circuit
+        """
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+
+    def record_failure(self):
+        """
+            Count a failure, open the circuit after too many or after a failed probe
+        """
+        with self._lock:
+            self._failures += 1
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                self._state = self.OPEN
+                self._opened_at = self._clock()
+
+    def reset(self):
+        """
+            Close the circuit and forget the failures
+        """
+        self.record_success()
+
+
+class Deadline:
+    """
+        Time budget of a call
+    """
+
+    def __init__(self, budget, clock=time.monotonic):
+        self._clock = clock
+        self._end = clock() + budget
+
+    def remaining(self):
+        """
+            Return the seconds left, 0 once the budget is spent
+        """
+        return max(self._end - self._clock(), 0.0)
+
+
+RetryPolicy = namedtuple(
+    "RetryPolicy",
+    ["max_attempts", "attempt_timeout", "deadline", "base_delay", "max_delay"],
+    defaults=[3, 2.0, 5.0, 0.1, 1.0],
+)
+RetryPolicy.__doc__ = """
+    Number, timeout and time budget of the attempts of a call, backoff between them
+"""
+
+
+def retry_delay(policy, attempt, rng=random):
+    """
+        Return a jittered exponential backoff before the attempt following attempt
+    """
+    return rng.uniform(0, min(policy.max_delay, policy.base_delay * 2 ** attempt))
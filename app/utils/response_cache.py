@@ -0,0 +1,208 @@
+"""
+Response caching for the read endpoints.
+
+`ResponseCacheMiddleware` is an ASGI middleware caching the encoded
+responses of the GET endpoints matching a `CacheRule`. The cache key is
+the route path and its sorted query parameters.
+
+- Cached responses are sent with a strong `ETag` (hash of the body),
+  `Last-Modified` and the `Cache-Control` of their rule.
+- A request whose `If-None-Match` (or `If-Modified-Since`) matches the
+  cached response is answered with `304 Not Modified`, without a body.
+- Each rule has a tag. `RESPONSE_CACHE.invalidate(*tags)` drops the
+  cached responses of these tags, for example after a write.
+
+Attributes:
+- `CACHE_RULES` (list): Cached endpoints, their lifetime and `Cache-Control`.
+- `DATABASE_TAGS` (tuple): Tags of the responses built from the database.
+- `RESPONSE_CACHE` (ResponseCache): Cache shared by the middleware and the
+  write endpoints.
+
+Example:
+```python
+app.add_middleware(ResponseCacheMiddleware, cache=RESPONSE_CACHE)
+RESPONSE_CACHE.invalidate(*DATABASE_TAGS)
+```
+"""
+
+import hashlib
+import re
+import time
+from collections import namedtuple
+from email.utils import formatdate, parsedate_to_datetime
+from urllib.parse import parse_qsl, urlencode
+
+from .cache import TTLCache
+
+CacheRule = namedtuple("CacheRule", ["pattern", "ttl", "cache_control", "tag"])
+CacheRule.__doc__ = """
+    Cache the GET responses of the paths matching pattern, for ttl seconds
+"""
+
+CachedResponse = namedtuple("CachedResponse",
+                            ["status", "headers", "body", "etag", "last_modified"])
+
+DAY = 24 * 60 * 60
+
+CACHE_RULES = [
+    CacheRule(re.compile(r"^/pokemons/stats/\d+$"), DAY, f"public, max-age={DAY}", "pokeapi"),
+    CacheRule(re.compile(r"^/pokemons/battle_stats/\d+/\d+$"), DAY,
+              f"public, max-age={DAY}", "pokeapi"),
+    CacheRule(re.compile(r"^/trainers/?$"), 60, "no-cache", "trainers"),
+    CacheRule(re.compile(r"^/trainers/\d+$"), 60, "no-cache", "trainers"),
+    CacheRule(re.compile(r"^/trainers/search$"), 60, "no-cache", "trainers"),
+    CacheRule(re.compile(r"^/items/?$"), 60, "no-cache", "items"),
+    CacheRule(re.compile(r"^/pokemons/?$"), 60, "no-cache", "pokemons"),
+]
+
+DATABASE_TAGS = ("trainers", "items", "pokemons")
+
+CACHE_MAX_BYTES = 32 * 1024 * 1024
+
+# Headers computed again for every response
+_SKIPPED_HEADERS = {b"content-length", b"date", b"server", b"etag",
+                    b"last-modified", b"cache-control"}
+
+
+class ResponseCache:
+    """
+        Encoded responses, keyed by route, parameters and tag generation
+        Parameters:
+            rules (list): Cached endpoints
+            max_bytes (int): Maximum total size of the cached bodies
+    """
+
+    def __init__(self, rules=None, max_bytes=CACHE_MAX_BYTES):
+        self.rules = CACHE_RULES if rules is None else rules
+        self.max_ttl = max((rule.ttl for rule in self.rules), default=0)
+        self.responses = TTLCache(max_bytes=max_bytes, ttl=self.max_ttl)
+        self._generations = {}
+
+    def match(self, path):
+        """
+            Return the rule of a path, or None if it is not cached
+        """
+        for rule in self.rules:
+            if rule.pattern.match(path):
+                return rule
+        return None
+
+    def key(self, rule, path, query_string):
+        """
+            Return the cache key of a request
+        """
+        query = urlencode(sorted(parse_qsl(query_string.decode("latin-1"),
+                                           keep_blank_values=True)))
+        return rule.tag, self._generations.get(rule.tag, 0), path, query
+
+    def get(self, key, rule):
+        """
+            Return the cached response of a key, if it is younger than its rule ttl
+        """
+        response = self.responses.get(key)
+        if response is not None and response.last_modified + rule.ttl <= time.time():
+            self.responses.delete(key)
+            return None
+        return response
+
+    def set(self, key, status, headers, body):
+        """
+            Cache an encoded response and return it
+        """
+        etag = '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+        response = CachedResponse(status, headers, body, etag, int(time.time()))
+        self.responses.set(key, response, size=len(body))
+        return response
+
+    def invalidate(self, *tags):
+        """
+            Drop the cached responses of the given tags
+        """
+        for tag in tags:
+            self._generations[tag] = self._generations.get(tag, 0) + 1
+
+    def clear(self):
+        """
+            Drop every cached response
+        """
+        self.responses.clear()
+        self._generations.clear()
+
+
+def _not_modified(request_headers, response):
+    if_none_match = request_headers.get(b"if-none-match")
+    if if_none_match is not None:
+        etags = [etag.strip() for etag in if_none_match.decode("latin-1").split(",")]
+        return response.etag in etags or "*" in etags
+    if_modified_since = request_headers.get(b"if-modified-since")
+    if if_modified_since is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since.decode("latin-1")).timestamp()
+        except (TypeError, ValueError):
+            return False
+        return response.last_modified <= since
+    return False
+
+
+class ResponseCacheMiddleware:
+    """
+        ASGI middleware serving the cached responses and revalidations
+    """
+
+    def __init__(self, app, cache=None):
+        self.app = app
+        self.cache = RESPONSE_CACHE if cache is None else cache
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "GET":
+            await self.app(scope, receive, send)
+            return
+        rule = self.cache.match(scope["path"])
+        if rule is None:
+            await self.app(scope, receive, send)
+            return
+
+        key = self.cache.key(rule, scope["path"], scope["query_string"])
+        response = self.cache.get(key, rule)
+        if response is None:
+            response = await self._call_app(scope, receive, send, key)
+            if response is None:
+                return
+        await self._send(scope, send, rule, response)
+
+    async def _call_app(self, scope, receive, send, key):
+        start, body = {}, []
+
+        async def capture(message):
+            if message["type"] == "http.response.start":
+                start.update(message)
+            else:
+                body.append(message.get("body", b""))
+
+        await self.app(scope, receive, capture)
+        headers = [(name, value) for name, value in start.get("headers", [])
+                   if name.lower() not in _SKIPPED_HEADERS]
+        if start["status"] != 200:
+            await send({**start, "headers": start.get("headers", [])})
+            await send({"type": "http.response.body", "body": b"".join(body)})
+            return None
+        return self.cache.set(key, start["status"], headers, b"".join(body))
+
+    async def _send(self, scope, send, rule, response):
+        headers = [
+            (b"etag", response.etag.encode()),
+            (b"last-modified", formatdate(response.last_modified, usegmt=True).encode()),
+            (b"cache-control", rule.cache_control.encode()),
+        ]
+        if _not_modified(dict(scope["headers"]), response):
+            await send({"type": "http.response.start", "status": 304, "headers": headers})
+            await send({"type": "http.response.body", "body": b""})
+            return
+        headers += response.headers
+        headers.append((b"content-length", str(len(response.body)).encode()))
+        await send({"type": "http.response.start", "status": response.status,
+                    "headers": headers})
+        await send({"type": "http.response.body", "body": response.body})
+
+
+RESPONSE_CACHE = ResponseCache()
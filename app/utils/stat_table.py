@@ -0,0 +1,173 @@
+"""
+Compact in-memory table of Pokemon base stats.
+
+Each known pokemon is a fixed-width row of its six base stats (in the order
+of `pokeapi.STAT_NAMES`) in a NumPy (N, 6) array, so that comparing
+pokemons is one broadcast comparison of rows instead of a scan of the raw
+PokeAPI payloads or a Python loop: `compare_all` compares a pokemon
+against the whole table at once.
+
+1. **count_wins(rows, others):** Count the stats each row wins against
+   each other row, as a (len(rows), len(others)) array.
+2. **StatTable:**
+    - `add(record)`: Add or replace the row of a pokemon record.
+    - `get(api_id)`: Return the record of a pokemon, or None.
+    - `compare(first_api_id, second_api_id)`: Count the stats won by each
+      pokemon and the equal stats.
+    - `compare_all(api_id)`: Compare a pokemon against every known pokemon.
+    - `battle_matrix(api_ids)`: Yield the battle outcomes of a round-robin
+      tournament, one row per pokemon, from a single `count_wins` of the
+      pokemons against each other.
+
+Example:
+```python
+table = StatTable()
+table.add(PokemonRecord(1, "bulbasaur", (45, 49, 49, 65, 65, 45)))
+table.add(PokemonRecord(2, "ivysaur", (60, 62, 63, 80, 80, 60)))
+table.compare(1, 2)  # (0, 6, 0)
+```
+"""
+
+import threading
+from collections import namedtuple
+
+import numpy as np
+
+STAT_COUNT = 6
+# Rows allocated up front, the table doubles when it is full
+INITIAL_CAPACITY = 256
+
+WIN, DRAW, LOSE = 1, 0, -1
+
+TableRecord = namedtuple("TableRecord", ["api_id", "name", "stats"])
+
+
+def count_wins(rows, others):
+    """
+        Count the stats each row wins against each other row, in one broadcast
+        Return an array of shape (len(rows), len(others))
+    """
+    return (rows[:, None, :] > others[None, :, :]).sum(axis=-1)
+
+
+def compare_rows(first_row, second_row):
+    """
+        Count the stats won by each row and the equal stats
+    """
+    first_row, second_row = np.asarray(first_row), np.asarray(second_row)
+    first_counter = int(np.count_nonzero(first_row > second_row))
+    second_counter = int(np.count_nonzero(first_row < second_row))
+    return first_counter, second_counter, first_row.size - first_counter - second_counter
+
+
+class StatTable:
+    """
+        Fixed-width rows of base stats, indexed by api_id
+    """
+
+    def __init__(self, record_type=TableRecord, capacity=INITIAL_CAPACITY):
+        self._record_type = record_type
+        self._stats = np.zeros((capacity, STAT_COUNT), dtype=np.uint16)
+        self._rows = {}
+        self._ids = []
+        self._names = []
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._ids)
+
+    def __contains__(self, api_id):
+        return api_id in self._rows
+
+    def ids(self):
+        """
+            Return the api_id of every row, in insertion order
+        """
+        return list(self._ids)
+
+    def add(self, record):
+        """
+            Add or replace the row of a pokemon record
+        """
+        stats = np.asarray(record.stats, dtype=np.uint16)
+        if stats.shape != (STAT_COUNT,):
+            raise ValueError(f"Expected {STAT_COUNT} stats, got {stats.size}")
+        with self._lock:
+            row = self._rows.get(record.api_id)
+            if row is None:
+                row = len(self._ids)
+                if row == len(self._stats):
+                    self._stats = np.concatenate([self._stats, np.zeros_like(self._stats)])
+                # The row is filled before its api_id is visible to the readers
+                self._stats[row] = stats
+                self._names.append(record.name)
+                self._rows[record.api_id] = row
+                self._ids.append(record.api_id)
+            else:
+                self._names[row] = record.name
+                self._stats[row] = stats
+
+    def row(self, api_id):
+        """
+            Return the stats of a pokemon, as a copy of its row
+        """
+        return self._stats[self._rows[api_id]].copy()
+
+    def rows(self, api_ids):
+        """
+            Return the stats of several pokemons, as a (len(api_ids), 6) array
+        """
+        return self._stats[[self._rows[api_id] for api_id in api_ids]]
+
+    def get(self, api_id):
+        """
+            Return the record of a pokemon, or None if it is not in the table
+        """
+        row = self._rows.get(api_id)
+        if row is None:
+            return None
+        return self._record_type(api_id, self._names[row], tuple(self._stats[row].tolist()))
+
+    def compare(self, first_api_id, second_api_id):
+        """
+            Count the stats won by each pokemon and the equal stats
+        """
+        return compare_rows(self.row(first_api_id), self.row(second_api_id))
+
+    def compare_all(self, api_id):
+        """
+            Compare a pokemon against every pokemon of the table
+            Return a dict of api_id to (wins, losses, draws)
+        """
+        with self._lock:
+            ids = list(self._ids)
+            stats = self._stats[:len(ids)]
+            first_row = stats[self._rows[api_id]][None, :]
+        wins = count_wins(first_row, stats)[0].tolist()
+        losses = count_wins(stats, first_row)[:, 0].tolist()
+        return {
+            other_id: (won, lost, STAT_COUNT - won - lost)
+            for other_id, won, lost in zip(ids, wins, losses)
+        }
+
+    def battle_matrix(self, api_ids):
+        """
+            Yield (api_id, outcomes) for each pokemon of a round-robin tournament
+            outcomes[j] is WIN, DRAW or LOSE against api_ids[j]
+            The whole matrix is computed in one pass, the rows are yielded one by one
+        """
+        wins = count_wins(self.rows(api_ids), self.rows(api_ids))
+        # The stats lost against j are the stats j wins, the transpose
+        outcomes = np.sign(wins - wins.T)
+        for api_id, row in zip(api_ids, outcomes):
+            yield api_id, row.tolist()
+
+    def clear(self):
+        """
+            Remove every row
+        """
+        with self._lock:
+            self._stats = np.zeros_like(self._stats)
+            self._rows.clear()
+            self._ids.clear()
+            self._names.clear()
@@ -0,0 +1,265 @@
+"""
+Cached summaries of the trainers' teams.
+
+A `TeamSummary` holds the aggregates of a trainer: number of Pokemon and
+items, items count by name, and for each stat the team total, mean and
+best Pokemon. It is computed once from the database (`load_summary`) and
+kept in `TEAM_SUMMARIES`.
+
+The writes do not throw it away: `add_items` and `add_pokemons` fold the
+new rows into the cached summary. The new Pokemon are only queued, their
+stats are read on the next summary read (`resolve_summary`), one fetch per
+new species, so the writes never wait for the PokeAPI. A species unknown to
+the PokeAPI counts in the team but not in the stats.
+
+A summary loaded while a write of its trainer was in flight may miss that
+write, so it is returned but not cached (see `start_loading`).
+
+1. **TeamSummary:**
+    - `add_items(names)` / `add_pokemons(api_ids)`: Fold new rows in.
+    - `as_dict()`: The summary, as returned by the API.
+
+2. **TeamSummaryCache:**
+    - `get(trainer_id)`: Return the cached summary, or None.
+    - `start_loading(trainer_id)` / `finish_loading(trainer_id, token, summary)`:
+      Cache a summary loaded from the database, unless a write raced it.
+    - `add_items(trainer_id, names)` / `add_pokemons(trainer_id, api_ids)`:
+      Update the cached summary of a trainer after a write.
+
+3. **get_team_summary(database, trainer_id):**
+    - Return the summary of a trainer as a dict, or None if the trainer
+      does not exist.
+
+Example:
+```python
+summary = await get_team_summary(database, trainer_id=1)
+TEAM_SUMMARIES.add_items(1, ["potion"])
+```
+"""
+
+import asyncio
+import threading
+from collections import Counter
+
+from .. import async_actions
+from . import pokeapi_async
+from .cache import TTLCache
+from .pokeapi import STAT_NAMES
+
+MAX_SUMMARIES = 10_000
+# The writes keep the summaries up to date, the lifetime only bounds
+# the staleness after a change made outside of the API
+SUMMARY_TTL = 60 * 60
+
+
+class TeamSummary:
+    """
+        Aggregates of the Pokemon and the items of a trainer
+    """
+
+    def __init__(self, trainer_id, api_ids=(), items=None):
+        self.trainer_id = trainer_id
+        self.pokemon_count = 0
+        self.rated_count = 0
+        self.totals = [0] * len(STAT_NAMES)
+        self.best = [None] * len(STAT_NAMES)
+        self.items = Counter(items or {})
+        self.pending = list(api_ids)
+        self.lock = asyncio.Lock()
+
+    def add_items(self, names):
+        """
+            Count new items
+        """
+        self.items.update(names)
+
+    def add_pokemons(self, api_ids):
+        """
+            Queue new pokemons, their stats are added by add_records
+        """
+        self.pending.extend(api_ids)
+
+    def add_records(self, records):
+        """
+            Add the stats of pokemon records, None for an unknown species
+        """
+        for record in records:
+            self.pokemon_count += 1
+            if record is None:
+                continue
+            self.rated_count += 1
+            for index, value in enumerate(record.stats):
+                self.totals[index] += value
+                best = self.best[index]
+                if best is None or value > best[0]:
+                    self.best[index] = (value, record.api_id, record.name)
+
+    def as_dict(self):
+        """
+            Return the summary, the queued pokemons are not counted
+        """
+        stats = {}
+        for index, name in enumerate(STAT_NAMES):
+            best = self.best[index]
+            stats[name] = {
+                "total": self.totals[index],
+                "mean": self.totals[index] / self.rated_count if self.rated_count else 0.0,
+                "best": None if best is None else
+                        {"api_id": best[1], "name": best[2], "value": best[0]},
+            }
+        return {
+            "trainer_id": self.trainer_id,
+            "pokemon_count": self.pokemon_count,
+            "item_count": sum(self.items.values()),
+            "items": dict(sorted(self.items.items())),
+            "stats": stats,
+        }
+
+
+class TeamSummaryCache:
+    """
+        Summaries of the trainers, updated by the writes
+        Parameters:
+            max_entries (int): Maximum number of cached summaries
+            ttl (float): Lifetime of a summary, in seconds
+    """
+
+    def __init__(self, max_entries=MAX_SUMMARIES, ttl=SUMMARY_TTL):
+        self._summaries = TTLCache(max_bytes=max_entries, ttl=ttl, max_entries=max_entries)
+        self._loading = {}
+        self._lock = threading.Lock()
+
+    def get(self, trainer_id):
+        """
+            Return the cached summary of a trainer, or None
+        """
+        return self._summaries.get(trainer_id)
+
+    def start_loading(self, trainer_id):
+        """
+            Return a token to pass to finish_loading, before reading the database
+        """
+        token = {"stale": False}
+        with self._lock:
+            self._loading.setdefault(trainer_id, []).append(token)
+        return token
+
+    def finish_loading(self, trainer_id, token, summary):
+        """
+            Cache a loaded summary, unless a write happened since start_loading
+            Return the summary to use
+        """
+        with self._lock:
+            tokens = self._loading[trainer_id]
+            tokens.remove(token)
+            if not tokens:
+                del self._loading[trainer_id]
+            if token["stale"] or summary is None:
+                return summary
+            cached = self._summaries.get(trainer_id, count=False)
+            if cached is not None:
+                return cached
+            self._summaries.set(trainer_id, summary)
+            return summary
+
+    def add_items(self, trainer_id, names):
+        """
+            Count new items in the summary of a trainer
+        """
+        self._update(trainer_id, TeamSummary.add_items, names)
+
+    def add_pokemons(self, trainer_id, api_ids):
+        """
+            Queue new pokemons in the summary of a trainer
+        """
+        self._update(trainer_id, TeamSummary.add_pokemons, api_ids)
+
+    def _update(self, trainer_id, update, rows):
+        with self._lock:
+            for token in self._loading.get(trainer_id, ()):
+                token["stale"] = True
+            summary = self._summaries.get(trainer_id, count=False)
+            if summary is not None:
+                update(summary, rows)
+
+    def delete(self, trainer_id):
+        """
+            Forget the summary of a trainer
+        """
+        self._summaries.delete(trainer_id)
+
+    def clear(self):
+        """
+            Forget every summary
+        """
+        with self._lock:
+            self._summaries.clear()
+            self._loading.clear()
+
+    def stats(self):
+        """
+            Return the counters of the cache
+        """
+        return self._summaries.stats()
+
+
+TEAM_SUMMARIES = TeamSummaryCache()
+
+
+async def load_summary(database, trainer_id):
+    """
+        Read the team of a trainer from the database, or return None
+        if the trainer does not exist
+    """
+    token = TEAM_SUMMARIES.start_loading(trainer_id)
+    try:
+        team = await async_actions.get_trainer_team(database, trainer_id)
+    except BaseException:
+        TEAM_SUMMARIES.finish_loading(trainer_id, token, None)
+        raise
+    if team is None:
+        TEAM_SUMMARIES.finish_loading(trainer_id, token, None)
+        return None
+    api_ids, items = team
+    return TEAM_SUMMARIES.finish_loading(trainer_id, token,
+                                         TeamSummary(trainer_id, api_ids, items))
+
+
+async def get_record(api_id):
+    """
+        Return the record of a pokemon, or None if the PokeAPI does not know it
+    """
+    try:
+        return await pokeapi_async.get_pokemon_record(api_id)
+    except (KeyError, ValueError):
+        # A 404 answer has no stats, or is not even JSON
+        return None
+
+
+async def resolve_summary(summary):
+    """
+        Add the stats of the queued pokemons to a summary
+        Each distinct species is fetched once, from the cache when possible
+    """
+    async with summary.lock:
+        if not summary.pending:
+            return
+        api_ids = list(summary.pending)
+        unique_ids = list(dict.fromkeys(api_ids))
+        records = dict(zip(unique_ids, await asyncio.gather(*map(get_record, unique_ids))))
+        del summary.pending[:len(api_ids)]
+        summary.add_records(records[api_id] for api_id in api_ids)
+
+
+async def get_team_summary(database, trainer_id):
+    """
+        Return the team summary of a trainer as a dict,
+        or None if the trainer does not exist
+    """
+    summary = TEAM_SUMMARIES.get(trainer_id)
+    if summary is None:
+        summary = await load_summary(database, trainer_id)
+        if summary is None:
+            return None
+    await resolve_summary(summary)
+    return summary.as_dict()
@@ -13,7 +13,20 @@ This module includes functions for database access and date-related calculations
             # Perform database operations
         ```
 
-2. **age_from_birthdate(birthdate):**
+2. **get_async_db():**
+    - Async dependency giving an `AsyncSession`, for `async def` endpoints.
+    - Returns:
+        - An asyncio database session using SQLite (aiosqlite).
+
+3. **ndjson_response(rows, schema):**
+    - Stream rows as NDJSON, one `schema` document per line.
+    - Parameters:
+        - `rows` (iterable): ORM objects, read lazily while streaming.
+        - `schema` (BaseModel): Pydantic model used to serialize each row.
+    - Returns:
+        - A `StreamingResponse`.
+
+4. **age_from_birthdate(birthdate):**
     - Calculate age from a given birthdate.
     - Parameters:
         - `birthdate` (date): Date object representing the birthdate.
@@ -27,8 +40,9 @@ This module includes functions for database access and date-related calculations
 """
 
 from datetime import date
+from fastapi.responses import StreamingResponse
 from .. import models
-from ..sqlite import SessionLocal, engine
+from ..sqlite import AsyncSessionLocal, SessionLocal, engine
 models.Base.metadata.create_all(bind=engine)
 
 def get_db():
@@ -42,6 +56,21 @@ def get_db():
         database.close()
 
 
+async def get_async_db():
+    """
+        Get an async session on the DB
+    """
+    async with AsyncSessionLocal() as database:
+        yield database
+
+
+def ndjson_response(rows, schema):
+    """
+        Stream rows as NDJSON, one line per row
+    """
+    lines = (schema.from_orm(row).json() + "\n" for row in rows)
+    return StreamingResponse(lines, media_type="application/x-ndjson")
+
 
 def age_from_birthdate(birthdate):
     """
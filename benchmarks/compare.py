@@ -0,0 +1,155 @@
+"""
+Compare the results of a locust run against a baseline run.
+
+Both files are the `*_stats.csv` written by `locust --csv`. For each
+request name found in both runs, the throughput (`Requests/s`) and the
+`95%` and `99%` latency percentiles are compared, and a regression is
+reported when they are worse than the baseline by more than a tolerance.
+Locust writes "N/A" for the percentiles of a request without samples, these
+metrics are missing and are not compared.
+
+The default baseline, `BASELINE_STATS`, is a run of `locustfile.py` with
+the settings of `.locust.conf` against the local PokeAPI stand-in.
+
+1. **read_stats(path):** Read a stats CSV into a dict of name to metrics.
+2. **compare(baseline, current, ...):** Return the list of `Regression`.
+3. **Command line:** Print a report, exit with status 1 on regression:
+    ```
+    python -m benchmarks.compare res_stats.csv
+    python -m benchmarks.compare res_stats.csv --baseline other_stats.csv --max-rps-drop 0.05
+    ```
+"""
+
+import argparse
+import csv
+import os
+import sys
+from collections import namedtuple
+
+BASELINE_STATS = os.path.join(os.path.dirname(__file__), "baseline_stats.csv")
+
+AGGREGATED = "Aggregated"
+
+MAX_RPS_DROP = 0.10
+MAX_LATENCY_INCREASE = 0.20
+
+# Latencies under this value (ms) are too noisy to be compared
+MIN_LATENCY = 5
+
+Metrics = namedtuple("Metrics", ["requests", "failures", "rps", "p95", "p99"])
+Metrics.__doc__ = """
+    Metrics of a request name, None when locust has no value ("N/A")
+"""
+
+Regression = namedtuple("Regression", ["name", "metric", "baseline", "current", "change"])
+Regression.__doc__ = """
+    A metric of a request name worse than the baseline, change is relative
+"""
+
+
+def parse_metric(cell):
+    """
+        Parse a number of a stats CSV, None for "N/A" or an empty cell
+    """
+    cell = cell.strip()
+    return None if cell in ("", "N/A") else float(cell)
+
+
+def read_stats(path):
+    """
+        Read a locust stats CSV, return a dict of "Type Name" to Metrics
+    """
+    stats = {}
+    with open(path, newline="", encoding="utf-8") as stats_file:
+        for row in csv.DictReader(stats_file):
+            name = row["Name"] if row["Name"] == AGGREGATED else f"{row['Type']} {row['Name']}"
+            stats[name] = Metrics(
+                requests=int(row["Request Count"]),
+                failures=int(row["Failure Count"]),
+                rps=parse_metric(row["Requests/s"]),
+                p95=parse_metric(row["95%"]),
+                p99=parse_metric(row["99%"]),
+            )
+    return stats
+
+
+def compare(baseline, current, max_rps_drop=MAX_RPS_DROP,
+            max_latency_increase=MAX_LATENCY_INCREASE):
+    """
+        Return the regressions of current against baseline
+        Only the request names found in both runs and the metrics
+        known in both are compared
+    """
+    regressions = []
+    for name, before in baseline.items():
+        after = current.get(name)
+        if after is None:
+            continue
+        if None not in (before.rps, after.rps) and before.rps > 0 \
+                and after.rps < before.rps * (1 - max_rps_drop):
+            regressions.append(Regression(name, "rps", before.rps, after.rps,
+                                          after.rps / before.rps - 1))
+        for metric in ("p95", "p99"):
+            latency_before, latency_after = getattr(before, metric), getattr(after, metric)
+            if None in (latency_before, latency_after):
+                continue
+            if max(latency_before, latency_after) < MIN_LATENCY:
+                continue
+            if latency_after > max(latency_before, 1) * (1 + max_latency_increase):
+                regressions.append(Regression(name, metric, latency_before, latency_after,
+                                              latency_after / max(latency_before, 1) - 1))
+    return regressions
+
+
+def format_metric(value):
+    """
+        Format a metric on 7 characters, "N/A" when it is missing
+    """
+    return f"{'N/A':>7}" if value is None else f"{value:>7.1f}"
+
+
+def format_report(baseline, current, regressions):
+    """
+        Return a text table of the compared metrics, regressions marked with "!"
+    """
+    regressed = {(regression.name, regression.metric) for regression in regressions}
+    lines = [f"{'name':<45} {'rps':>17} {'p95 (ms)':>17} {'p99 (ms)':>17}"]
+    for name in sorted(set(baseline) & set(current)):
+        before, after = baseline[name], current[name]
+        cells = []
+        for field in ("rps", "p95", "p99"):
+            mark = "!" if (name, field) in regressed else " "
+            cells.append(f"{format_metric(getattr(before, field))} -> "
+                         f"{format_metric(getattr(after, field))}{mark}")
+        lines.append(f"{name:<45} " + " ".join(cells))
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    """
+        Command line entry point
+    """
+    parser = argparse.ArgumentParser(description="Compare a locust run against a baseline.")
+    parser.add_argument("current", help="Stats CSV of the compared run.")
+    parser.add_argument("--baseline", default=BASELINE_STATS,
+                        help="Stats CSV of the baseline run (default: the committed baseline).")
+    parser.add_argument("--max-rps-drop", type=float, default=MAX_RPS_DROP,
+                        help=f"Tolerated relative throughput drop (default: {MAX_RPS_DROP}).")
+    parser.add_argument("--max-latency-increase", type=float, default=MAX_LATENCY_INCREASE,
+                        help="Tolerated relative p95/p99 increase "
+                             f"(default: {MAX_LATENCY_INCREASE}).")
+    arguments = parser.parse_args(argv)
+
+    baseline, current = read_stats(arguments.baseline), read_stats(arguments.current)
+    regressions = compare(baseline, current, arguments.max_rps_drop,
+                          arguments.max_latency_increase)
+    print(format_report(baseline, current, regressions))
+    for regression in regressions:
+        print(f"REGRESSION {regression.name} {regression.metric}: "
+              f"{regression.baseline:.1f} -> {regression.current:.1f} "
+              f"({regression.change:+.0%})")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
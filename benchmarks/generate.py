@@ -0,0 +1,201 @@
+"""
+Generate a synthetic database of trainers, items and Pokemon.
+
+The rows are realistic (names, birthdates, item descriptions, species of
+the 151 first Pokemon with some nicknames), drawn from a seeded random
+generator so a given scale and seed always give the same database.
+
+The size is a multiple of `SCALE_UNIT` (1 000 trainers, 10 000 items and
+6 000 Pokemon): `--scale 1000` gives 10⁶ trainers and 10⁷ items.
+
+The tables are created without their indexes and filled with `executemany`
+batches on a connection with the journal and the syncs turned off. The
+indexes and the trainer search index are built once the rows are loaded
+(`models.sync_indexes` and `models.create_search_index`), which is much
+faster than updating them row by row.
+
+1. **scaled(factor):** Return the `Scale` (row counts) of a scale factor.
+2. **generate(path, scale, seed, batch_size):** Create and fill a database.
+3. **Command line:**
+    ```
+    python -m benchmarks.generate bench.db --scale 100
+    SQLITE_URL=sqlite:///./bench.db uvicorn main:app
+    ```
+"""
+
+import argparse
+import itertools
+import os
+import random
+import sqlite3
+import sys
+import time
+from collections import namedtuple
+from datetime import date, timedelta
+
+from sqlalchemy import create_engine
+from sqlalchemy.schema import CreateTable
+
+from app import models
+from app.utils.pokeapi_stub import SPECIES
+
+Scale = namedtuple("Scale", ["trainers", "items", "pokemons"])
+Scale.__doc__ = """
+    Number of rows of each table
+"""
+
+SCALE_UNIT = Scale(trainers=1_000, items=10_000, pokemons=6_000)
+BATCH_SIZE = 50_000
+
+# Settings of the loading connection only, the database is rebuilt on failure
+LOAD_PRAGMAS = {"journal_mode": "OFF", "synchronous": "OFF", "cache_size": -256 * 1024}
+
+FIRST_NAMES = ["Sacha", "Ondine", "Pierre", "Régis", "Flora", "Max", "Aurore", "Tili",
+               "Iris", "Lem", "Serena", "Lilie", "Chen", "Jessie", "James", "Cynthia",
+               "Morgane", "Olga", "Peter", "Sandra", "Blue", "Red", "Gold", "Silver"]
+LAST_NAMES = ["Ketchum", "Waterflower", "Harrison", "Oak", "Birch", "Rowan", "Juniper",
+              "Sycamore", "Kukui", "Magnolia", "Elm", "Willow", "Maple", "Cedar", "Aspen"]
+ITEMS = [
+    ("potion", "Restores 20 HP."),
+    ("super potion", "Restores 50 HP."),
+    ("hyper potion", "Restores 200 HP."),
+    ("revive", "Revives a fainted Pokemon with half its HP."),
+    ("antidote", "Cures a poisoned Pokemon."),
+    ("pokeball", "A device for catching wild Pokemon."),
+    ("great ball", "A good Ball with a higher catch rate."),
+    ("ultra ball", "A very high performance Ball."),
+    ("rare candy", "Raises the level of a Pokemon by one."),
+    ("escape rope", "Escapes from a cave or a dungeon."),
+    ("repel", "Keeps weak wild Pokemon away for 100 steps."),
+    ("ether", "Restores 10 PP of a move."),
+]
+NICKNAMES = ["Sparky", "Bubbles", "Rocky", "Blaze", "Shadow", "Leafy", "Ziggy", "Nugget",
+             "Pebble", "Thunder", "Misty", "Coco", "Biscuit", "Pixel", "Tofu", "Nemo"]
+NICKNAME_RATE = 0.2
+
+FIRST_BIRTHDATE = date(1950, 1, 1)
+BIRTHDATE_DAYS = (date(2015, 12, 31) - FIRST_BIRTHDATE).days
+
+
+def scaled(factor):
+    """
+        Return the row counts of a scale factor, at least one trainer
+    """
+    return Scale(*(max(int(count * factor), 1 if name == "trainers" else 0)
+                   for name, count in zip(Scale._fields, SCALE_UNIT)))
+
+
+def trainer_rows(count, rng):
+    """
+        Yield (id, name, birthdate) rows
+    """
+    for trainer_id in range(1, count + 1):
+        name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+        birthdate = FIRST_BIRTHDATE + timedelta(days=rng.randrange(BIRTHDATE_DAYS))
+        yield trainer_id, name, birthdate.isoformat()
+
+
+def item_rows(count, trainers, rng):
+    """
+        Yield (name, description, trainer_id) rows
+    """
+    for _ in range(count):
+        name, description = rng.choice(ITEMS)
+        yield name, description, rng.randint(1, trainers)
+
+
+def pokemon_rows(count, trainers, rng):
+    """
+        Yield (api_id, name, custom_name, trainer_id) rows
+    """
+    api_ids = sorted(SPECIES)
+    for _ in range(count):
+        api_id = rng.choice(api_ids)
+        custom_name = rng.choice(NICKNAMES) if rng.random() < NICKNAME_RATE else None
+        yield api_id, SPECIES[api_id]["name"], custom_name, rng.randint(1, trainers)
+
+
+def load(connection, statement, rows, batch_size):
+    """
+        Insert rows with one executemany per batch
+    """
+    while True:
+        batch = list(itertools.islice(rows, batch_size))
+        if not batch:
+            return
+        connection.executemany(statement, batch)
+
+
+def generate(path, scale=SCALE_UNIT, seed=0, batch_size=BATCH_SIZE):
+    """
+        Create a database at path and fill it with the rows of a scale
+        Return the loading time in seconds
+    """
+    if os.path.exists(path):
+        raise FileExistsError(f"{path} already exists")
+    start = time.perf_counter()
+    engine = create_engine(f"sqlite:///{path}")
+    try:
+        with engine.begin() as connection:
+            for table in models.Base.metadata.sorted_tables:
+                connection.execute(CreateTable(table))
+
+        rng = random.Random(seed)
+        connection = sqlite3.connect(path)
+        try:
+            for name, value in LOAD_PRAGMAS.items():
+                connection.execute(f"PRAGMA {name}={value}")
+            with connection:
+                load(connection, "INSERT INTO trainers (id, name, birthdate) VALUES (?, ?, ?)",
+                     trainer_rows(scale.trainers, rng), batch_size)
+                load(connection,
+                     "INSERT INTO items (name, description, trainer_id) VALUES (?, ?, ?)",
+                     item_rows(scale.items, scale.trainers, rng), batch_size)
+                load(connection, "INSERT INTO pokemons (api_id, name, custom_name, trainer_id) "
+                                 "VALUES (?, ?, ?, ?)",
+                     pokemon_rows(scale.pokemons, scale.trainers, rng), batch_size)
+        finally:
+            connection.close()
+
+        models.sync_indexes(engine)
+        with engine.begin() as connection:
+            models.create_search_index(connection)
+            connection.exec_driver_sql("ANALYZE")
+    finally:
+        engine.dispose()
+    return time.perf_counter() - start
+
+
+def main(argv=None):
+    """
+        Command line entry point
+    """
+    parser = argparse.ArgumentParser(description="Generate a synthetic database.")
+    parser.add_argument("path", help="Database file to create.")
+    parser.add_argument("--scale", type=float, default=1,
+                        help=f"Multiple of {SCALE_UNIT.trainers} trainers, "
+                             f"{SCALE_UNIT.items} items and {SCALE_UNIT.pokemons} Pokemon "
+                             "(default: 1).")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the rows (default: 0).")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE,
+                        help=f"Rows per executemany (default: {BATCH_SIZE}).")
+    parser.add_argument("--force", action="store_true", help="Replace an existing database.")
+    arguments = parser.parse_args(argv)
+
+    if arguments.force:
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(arguments.path + suffix):
+                os.remove(arguments.path + suffix)
+    scale = scaled(arguments.scale)
+    try:
+        elapsed = generate(arguments.path, scale, arguments.seed, arguments.batch_size)
+    except FileExistsError as error:
+        print(f"{error}, use --force to replace it", file=sys.stderr)
+        return 1
+    print(f"{arguments.path}: {scale.trainers} trainers, {scale.items} items, "
+          f"{scale.pokemons} Pokemon in {elapsed:.1f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,290 @@
+"""
+Latency of the database layer at several database sizes.
+
+For each scale factor, a database is generated with `benchmarks.generate`,
+then every function of `app.actions` and every database backed endpoint
+of the routers is called `repeat` times with random ids, and its p50 and
+p99 latencies are reported.
+
+The endpoints are called in process through the FastAPI test client, with
+the response cache cleared before each request, and with the PokeAPI
+served by `pokeapi_stub`. The exports (`iter_*` and `GET /*/export`) read
+whole tables and are left out, as are the PokeAPI only endpoints. The
+write cases add a few rows to the generated database.
+
+1. **ACTION_CASES / ENDPOINT_CASES:** The measured calls.
+2. **run(scales, directory, repeat, seed):** Return the list of `Result`.
+3. **format_table(results):** One line per scale and call, sorted, so the
+   output of two commits can be diffed.
+4. **Command line:**
+    ```
+    python -m benchmarks.scaling --scales 1 10 100 --repeat 200 > scaling.txt
+    diff baseline-scaling.txt scaling.txt
+    ```
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from collections import namedtuple
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
+
+from app import actions, schemas
+from app.sqlite import create_async_sqlite_engine, create_sqlite_engine
+from app.utils import pokeapi
+from app.utils.pagination import encode_cursor
+from app.utils.pokeapi_stub import StubServer
+
+from . import generate
+
+Case = namedtuple("Case", ["name", "call"])
+Case.__doc__ = """
+    A measured call, call(target, rng, scale) where target is a session or a client
+"""
+
+Result = namedtuple("Result", ["scale", "kind", "name", "p50", "p99"])
+Result.__doc__ = """
+    Latency percentiles of a call at a scale factor, in seconds
+"""
+
+SCALES = (1, 10)
+REPEAT = 100
+WARMUP = 5
+
+
+def trainer_id(rng, scale):
+    """
+        Return a random trainer id
+    """
+    return rng.randint(1, scale.trainers)
+
+
+def middle(rng, count):
+    """
+        Return a random id in the second half of a table of count rows
+    """
+    return rng.randint(count // 2, max(count, 1))
+
+
+ACTION_CASES = [
+    Case("get_trainer", lambda db, rng, scale: actions.get_trainer(db, trainer_id(rng, scale))),
+    Case("trainer_exists",
+         lambda db, rng, scale: actions.trainer_exists(db, trainer_id(rng, scale))),
+    Case("get_trainer_by_name", lambda db, rng, scale: actions.get_trainer_by_name(
+        db, f"{rng.choice(generate.FIRST_NAMES)} {rng.choice(generate.LAST_NAMES)}")),
+    Case("get_trainers (skip)",
+         lambda db, rng, scale: actions.get_trainers(db, skip=middle(rng, scale.trainers))),
+    Case("get_trainers (cursor)",
+         lambda db, rng, scale: actions.get_trainers(db, after_id=middle(rng, scale.trainers))),
+    Case("get_trainer_rows (cursor)",
+         lambda db, rng, scale: actions.get_trainer_rows(db, after_id=middle(rng, scale.trainers))),
+    Case("search_trainers", lambda db, rng, scale: actions.search_trainers(
+        db, rng.choice(generate.FIRST_NAMES)[:3], limit=20)),
+    Case("create_trainer", lambda db, rng, scale: actions.create_trainer(
+        db, schemas.TrainerCreate(name="Bench Trainer", birthdate="2000-01-01"))),
+    Case("add_trainer_item", lambda db, rng, scale: actions.add_trainer_item(
+        db, schemas.ItemCreate(name="potion"), trainer_id(rng, scale))),
+    Case("add_trainer_items", lambda db, rng, scale: actions.add_trainer_items(
+        db, [schemas.ItemCreate(name="potion")] * 10, trainer_id(rng, scale))),
+    Case("add_trainer_pokemon", lambda db, rng, scale: actions.add_trainer_pokemon(
+        db, schemas.PokemonCreate(api_id=25), trainer_id(rng, scale), name="pikachu")),
+    Case("add_trainer_pokemons", lambda db, rng, scale: actions.add_trainer_pokemons(
+        db, [schemas.PokemonCreate(api_id=25)] * 6, {25: "pikachu"}, trainer_id(rng, scale))),
+    Case("fill_pokemon_names",
+         lambda db, rng, scale: actions.fill_pokemon_names(db, {25: "pikachu"})),
+    Case("missing_pokemon_names", lambda db, rng, scale: actions.missing_pokemon_names(db)),
+    Case("get_items (skip)",
+         lambda db, rng, scale: actions.get_items(db, skip=middle(rng, scale.items))),
+    Case("get_items (cursor)",
+         lambda db, rng, scale: actions.get_items(db, after_id=middle(rng, scale.items))),
+    Case("get_item_rows (cursor)",
+         lambda db, rng, scale: actions.get_item_rows(db, after_id=middle(rng, scale.items))),
+    Case("get_pokemon", lambda db, rng, scale: actions.get_pokemon(
+        db, rng.randint(1, max(scale.pokemons, 1)))),
+    Case("get_pokemons (skip)",
+         lambda db, rng, scale: actions.get_pokemons(db, skip=middle(rng, scale.pokemons))),
+    Case("get_pokemons (cursor)",
+         lambda db, rng, scale: actions.get_pokemons(db, after_id=middle(rng, scale.pokemons))),
+    Case("get_pokemon_rows (cursor)",
+         lambda db, rng, scale: actions.get_pokemon_rows(db, after_id=middle(rng, scale.pokemons))),
+]
+
+ENDPOINT_CASES = [
+    Case("GET /trainers", lambda client, rng, scale: client.get("/trainers")),
+    Case("GET /trainers?cursor", lambda client, rng, scale: client.get(
+        "/trainers", params={"cursor": encode_cursor(middle(rng, scale.trainers))})),
+    Case("GET /trainers/{id}",
+         lambda client, rng, scale: client.get(f"/trainers/{trainer_id(rng, scale)}")),
+    Case("GET /trainers/search", lambda client, rng, scale: client.get(
+        "/trainers/search", params={"q": rng.choice(generate.LAST_NAMES)[:3]})),
+    Case("GET /items/", lambda client, rng, scale: client.get("/items/")),
+    Case("GET /items/?cursor", lambda client, rng, scale: client.get(
+        "/items/", params={"cursor": encode_cursor(middle(rng, scale.items))})),
+    Case("GET /pokemons/", lambda client, rng, scale: client.get("/pokemons/")),
+    Case("GET /pokemons/?cursor", lambda client, rng, scale: client.get(
+        "/pokemons/", params={"cursor": encode_cursor(middle(rng, scale.pokemons))})),
+    Case("POST /trainers/", lambda client, rng, scale: client.post(
+        "/trainers/", json={"name": "Bench Trainer", "birthdate": "2000-01-01"})),
+    Case("POST /trainers/{id}/item/", lambda client, rng, scale: client.post(
+        f"/trainers/{trainer_id(rng, scale)}/item/", json={"name": "potion"})),
+    Case("POST /trainers/{id}/pokemon/", lambda client, rng, scale: client.post(
+        f"/trainers/{trainer_id(rng, scale)}/pokemon/", json={"api_id": 25})),
+    Case("POST /trainers/{id}/items:batch", lambda client, rng, scale: client.post(
+        f"/trainers/{trainer_id(rng, scale)}/items:batch", json=[{"name": "potion"}] * 10)),
+    Case("POST /trainers/{id}/pokemons:batch", lambda client, rng, scale: client.post(
+        f"/trainers/{trainer_id(rng, scale)}/pokemons:batch", json=[{"api_id": 25}] * 6)),
+]
+
+
+def percentile(samples, fraction):
+    """
+        Return the nearest-rank percentile of sorted samples
+    """
+    return samples[min(int(fraction * len(samples)), len(samples) - 1)]
+
+
+def measure(call, target, rng, scale, repeat=REPEAT, before=None):
+    """
+        Return the p50 and p99 latencies of repeat calls, after a warmup
+    """
+    samples = []
+    for index in range(WARMUP + repeat):
+        if before is not None:
+            before()
+        start = time.perf_counter()
+        call(target, rng, scale)
+        elapsed = time.perf_counter() - start
+        if index >= WARMUP:
+            samples.append(elapsed)
+    samples.sort()
+    return percentile(samples, 0.50), percentile(samples, 0.99)
+
+
+def measure_actions(path, factor, scale, repeat, seed):
+    """
+        Measure every action case on a database
+    """
+    engine = create_sqlite_engine(f"sqlite:///{path}", poolclass=NullPool)
+    database = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    results = []
+    try:
+        for case in ACTION_CASES:
+            rng = random.Random(seed)
+            p50, p99 = measure(case.call, database, rng, scale, repeat,
+                               before=database.expunge_all)
+            results.append(Result(factor, "action", case.name, p50, p99))
+    finally:
+        database.close()
+        engine.dispose()
+    return results
+
+
+def measure_endpoints(path, factor, scale, repeat, seed):
+    """
+        Measure every endpoint case on a database
+    """
+    # pylint: disable=import-outside-toplevel
+    from fastapi.testclient import TestClient
+    from main import app
+    from app.utils.name_resolver import NAME_RESOLVER
+    from app.utils.response_cache import RESPONSE_CACHE
+    from app.utils.utils import get_async_db, get_db
+
+    engine = create_sqlite_engine(f"sqlite:///{path}", poolclass=NullPool)
+    async_engine = create_async_sqlite_engine(f"sqlite+aiosqlite:///{path}", poolclass=NullPool)
+    session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    def async_session():
+        return AsyncSession(async_engine, autoflush=False, expire_on_commit=False)
+
+    def get_bench_db():
+        database = session_factory()
+        try:
+            yield database
+        finally:
+            database.close()
+
+    async def get_bench_async_db():
+        async with async_session() as database:
+            yield database
+
+    stub = StubServer().start()
+    base_url, resolver_factory = pokeapi.BASE_URL, NAME_RESOLVER.session_factory
+    pokeapi.BASE_URL, NAME_RESOLVER.session_factory = stub.base_url, async_session
+    app.dependency_overrides[get_db] = get_bench_db
+    app.dependency_overrides[get_async_db] = get_bench_async_db
+    results = []
+    try:
+        with TestClient(app) as client:
+            for case in ENDPOINT_CASES:
+                rng = random.Random(seed)
+                p50, p99 = measure(case.call, client, rng, scale, repeat,
+                                   before=RESPONSE_CACHE.clear)
+                results.append(Result(factor, "endpoint", case.name, p50, p99))
+    finally:
+        app.dependency_overrides.clear()
+        pokeapi.BASE_URL, NAME_RESOLVER.session_factory = base_url, resolver_factory
+        stub.stop()
+        engine.dispose()
+    return results
+
+
+def run(scales=SCALES, directory=".", repeat=REPEAT, seed=0, reuse=False):
+    """
+        Generate a database per scale factor and measure every case on it
+    """
+    results = []
+    for factor in scales:
+        scale = generate.scaled(factor)
+        path = os.path.join(directory, f"bench-scale-{factor:g}.db")
+        if not (reuse and os.path.exists(path)):
+            for suffix in ("", "-wal", "-shm"):
+                if os.path.exists(path + suffix):
+                    os.remove(path + suffix)
+            generate.generate(path, scale, seed)
+        results.extend(measure_actions(path, factor, scale, repeat, seed))
+        results.extend(measure_endpoints(path, factor, scale, repeat, seed))
+    return results
+
+
+def format_table(results):
+    """
+        Return the results as a table, one line per scale and call
+    """
+    lines = [f"{'scale':>8}  {'kind':<8}  {'call':<36}  {'p50 ms':>9}  {'p99 ms':>9}"]
+    for result in sorted(results, key=lambda result: (result.scale, result.kind, result.name)):
+        lines.append(f"{result.scale:>8g}  {result.kind:<8}  {result.name:<36}  "
+                     f"{result.p50 * 1000:>9.3f}  {result.p99 * 1000:>9.3f}")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    """
+        Command line entry point
+    """
+    parser = argparse.ArgumentParser(description="Time the database layer at several scales.")
+    parser.add_argument("--scales", type=float, nargs="+", default=list(SCALES),
+                        help=f"Scale factors of the databases, see benchmarks.generate "
+                             f"(default: {' '.join(map(str, SCALES))}).")
+    parser.add_argument("--repeat", type=int, default=REPEAT,
+                        help=f"Calls measured per case (default: {REPEAT}).")
+    parser.add_argument("--directory", default=".",
+                        help="Directory of the generated databases (default: .).")
+    parser.add_argument("--seed", type=int, default=0,
+                        help="Seed of the rows and of the ids (default: 0).")
+    parser.add_argument("--reuse", action="store_true",
+                        help="Reuse the databases generated by a previous run.")
+    arguments = parser.parse_args(argv)
+
+    print(format_table(run(arguments.scales, arguments.directory, arguments.repeat,
+                           arguments.seed, arguments.reuse)))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
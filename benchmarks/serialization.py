@@ -0,0 +1,142 @@
+"""
+Micro-benchmark of the encoding of the list endpoints.
+
+Times the two ways of answering `GET /trainers`, `GET /items` and
+`GET /pokemons` from a seeded in-memory database:
+
+- `pydantic`: Load ORM objects, validate them with the `orm_mode` schema,
+  then encode them with `jsonable_encoder` and the stdlib `json`, as
+  FastAPI does for a `response_model`.
+- `fast`: Select the schema columns as dicts (`actions.get_*_rows`) and
+  encode them with orjson, as the list endpoints do.
+
+1. **seed(database, trainers, items, pokemons):** Fill a database.
+2. **run(trainers, limit, repeat):** Return the list of `Timing`.
+3. **Command line:** Print the best time of each path and the speedup:
+    ```
+    python -m benchmarks.serialization
+    python -m benchmarks.serialization --trainers 1000 --limit 100 --repeat 50
+    ```
+"""
+
+import argparse
+import json
+import sys
+import time
+from collections import namedtuple
+from datetime import date
+from typing import List
+
+import orjson
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app import actions, models, schemas
+from app.sqlite import create_sqlite_engine
+
+ENDPOINTS = (
+    ("/trainers", actions.get_trainers, actions.get_trainer_rows, schemas.Trainer),
+    ("/items", actions.get_items, actions.get_item_rows, schemas.Item),
+    ("/pokemons", actions.get_pokemons, actions.get_pokemon_rows, schemas.Pokemon),
+)
+
+Timing = namedtuple("Timing", ["endpoint", "pydantic", "fast"])
+Timing.__doc__ = """
+    Best time of each path for an endpoint, in seconds
+"""
+
+
+def seed(database, trainers=200, items=3, pokemons=6):
+    """
+        Add trainers, each with items and pokemons
+    """
+    for index in range(trainers):
+        trainer = models.Trainer(name=f"trainer {index}", birthdate=date(2000, 1, 1))
+        trainer.inventory = [models.Item(name=f"item {number}", description="bench")
+                             for number in range(items)]
+        trainer.pokemons = [models.Pokemon(api_id=number + 1, name=f"pokemon {number}")
+                            for number in range(pokemons)]
+        database.add(trainer)
+    database.commit()
+
+
+def encode_pydantic(database, get_models, schema, limit):
+    """
+        Encode a list page through the ORM and the Pydantic schema
+    """
+    database.expunge_all()
+    rows = get_models(database, limit=limit)
+    validated = [schema.from_orm(row) for row in rows]
+    return json.dumps(jsonable_encoder(validated)).encode()
+
+
+def encode_fast(database, get_rows, limit):
+    """
+        Encode a list page from column dicts with orjson
+    """
+    return orjson.dumps(get_rows(database, limit=limit))
+
+
+def best_time(function, repeat, *args):
+    """
+        Return the best time of repeat calls
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def run(trainers=200, limit=100, repeat=20):
+    """
+        Time both paths for every list endpoint
+    """
+    engine = create_sqlite_engine("sqlite://", poolclass=StaticPool)
+    models.Base.metadata.create_all(bind=engine)
+    database = sessionmaker(bind=engine)()
+    try:
+        seed(database, trainers)
+        return [
+            Timing(endpoint,
+                   best_time(encode_pydantic, repeat, database, get_models, schema, limit),
+                   best_time(encode_fast, repeat, database, get_rows, limit))
+            for endpoint, get_models, get_rows, schema in ENDPOINTS
+        ]
+    finally:
+        database.close()
+        engine.dispose()
+
+
+def format_report(timings: List[Timing]):
+    """
+        Return the timings as a table
+    """
+    lines = [f"{'Endpoint':<12} {'pydantic (ms)':>14} {'fast (ms)':>10} {'speedup':>8}"]
+    for timing in timings:
+        lines.append(f"{timing.endpoint:<12} {timing.pydantic * 1000:>14.2f} "
+                     f"{timing.fast * 1000:>10.2f} {timing.pydantic / timing.fast:>7.1f}x")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    """
+        Command line entry point
+    """
+    parser = argparse.ArgumentParser(description="Time the encoding of the list endpoints.")
+    parser.add_argument("--trainers", type=int, default=200,
+                        help="Trainers in the database (default: 200).")
+    parser.add_argument("--limit", type=int, default=100,
+                        help="Rows per page (default: 100).")
+    parser.add_argument("--repeat", type=int, default=20,
+                        help="Runs of each path, the best one is kept (default: 20).")
+    arguments = parser.parse_args(argv)
+
+    print(format_report(run(arguments.trainers, arguments.limit, arguments.repeat)))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,189 @@
+"""
+Load test of the API, run by `locust` with the settings of `.locust.conf`.
+
+Each router is exercised by a weighted user class:
+
+1. **TrainerWriter:** Create trainers, add items and Pokemon (one by one
+   and in batch).
+2. **ListReader:** Read the trainers, items and Pokemon lists, with offset
+   and cursor pagination, and the trainers by id.
+3. **PokeapiReader:** Read Pokemon stats, battles and random draws.
+
+The PokeAPI backed endpoints must be served from the local stand-in, so
+that the runs work offline and are repeatable:
+```
+python -m app.utils.pokeapi_stub --port 8001 &
+SQLITE_URL=sqlite:///./bench.db POKEAPI_STORE=./bench-pokeapi.db \\
+POKEAPI_BASE_URL=http://127.0.0.1:8001/api/v2 uvicorn main:app &
+locust --config .locust.conf
+python -m benchmarks.compare res_stats.csv
+```
+The run statistics are written to `res_stats.csv` (and `res.html`) and
+compared with the committed `benchmarks/baseline_stats.csv`; copy them
+over it to make them the new baseline.
+"""
+
+import random
+from datetime import date
+
+from locust import HttpUser, between, task
+
+POKEMON_IDS = range(1, 152)
+PAGE_SIZE = 20
+BATCH_SIZE = 10
+
+
+def random_trainer():
+    """
+        Return the body of a new trainer
+    """
+    return {
+        "name": f"trainer-{random.randrange(1_000_000)}",
+        "birthdate": date(random.randint(1970, 2010), random.randint(1, 12),
+                          random.randint(1, 28)).isoformat(),
+    }
+
+
+def random_item():
+    """
+        Return the body of a new item
+    """
+    return {"name": random.choice(["potion", "pokeball", "revive", "antidote"]),
+            "description": "load test"}
+
+
+def random_pokemon():
+    """
+        Return the body of a new Pokemon
+    """
+    return {"api_id": random.choice(POKEMON_IDS)}
+
+
+class TrainerWriter(HttpUser):
+    """
+        Create trainers and fill their inventory and team
+    """
+    weight = 1
+    wait_time = between(0.5, 1.5)
+    trainer_id = None
+
+    def on_start(self):
+        self.create_trainer()
+
+    @task(1)
+    def create_trainer(self):
+        """
+            POST /trainers/
+        """
+        response = self.client.post("/trainers/", json=random_trainer())
+        if response.ok:
+            self.trainer_id = response.json()["id"]
+
+    @task(4)
+    def add_item(self):
+        """
+            POST /trainers/{trainer_id}/item/
+        """
+        if self.trainer_id is not None:
+            self.client.post(f"/trainers/{self.trainer_id}/item/", json=random_item(),
+                             name="/trainers/[id]/item/")
+
+    @task(4)
+    def add_pokemon(self):
+        """
+            POST /trainers/{trainer_id}/pokemon/
+        """
+        if self.trainer_id is not None:
+            self.client.post(f"/trainers/{self.trainer_id}/pokemon/", json=random_pokemon(),
+                             name="/trainers/[id]/pokemon/")
+
+    @task(1)
+    def add_batches(self):
+        """
+            POST /trainers/{trainer_id}/items:batch and pokemons:batch
+        """
+        if self.trainer_id is not None:
+            self.client.post(f"/trainers/{self.trainer_id}/items:batch",
+                             json=[random_item() for _ in range(BATCH_SIZE)],
+                             name="/trainers/[id]/items:batch")
+            self.client.post(f"/trainers/{self.trainer_id}/pokemons:batch",
+                             json=[random_pokemon() for _ in range(BATCH_SIZE)],
+                             name="/trainers/[id]/pokemons:batch")
+
+
+class ListReader(HttpUser):
+    """
+        Read the paginated lists and the trainers
+    """
+    weight = 3
+    wait_time = between(0.2, 1)
+
+    @task(3)
+    def list_trainers(self):
+        """
+            GET /trainers with offset pagination
+        """
+        self.client.get("/trainers", params={"skip": random.randrange(5) * PAGE_SIZE,
+                                             "limit": PAGE_SIZE}, name="/trainers")
+
+    @task(2)
+    def walk_pokemons(self):
+        """
+            GET /pokemons/ with cursor pagination, up to 5 pages
+        """
+        cursor = ""
+        for _ in range(5):
+            response = self.client.get("/pokemons/", params={"cursor": cursor, "limit": PAGE_SIZE},
+                                       name="/pokemons/?cursor")
+            cursor = response.headers.get("X-Next-Cursor")
+            if not cursor:
+                break
+
+    @task(2)
+    def list_items(self):
+        """
+            GET /items/
+        """
+        self.client.get("/items/", params={"limit": PAGE_SIZE}, name="/items/")
+
+    @task(2)
+    def get_trainer(self):
+        """
+            GET /trainers/{trainer_id}, including unknown trainers
+        """
+        with self.client.get(f"/trainers/{random.randint(1, 200)}", name="/trainers/[id]",
+                             catch_response=True) as response:
+            if response.status_code == 404:
+                response.success()
+
+
+class PokeapiReader(HttpUser):
+    """
+        Read the PokeAPI backed endpoints
+    """
+    weight = 4
+    wait_time = between(0.2, 1)
+
+    @task(4)
+    def stats(self):
+        """
+            GET /pokemons/stats/{id}
+        """
+        self.client.get(f"/pokemons/stats/{random.choice(POKEMON_IDS)}",
+                        name="/pokemons/stats/[id]")
+
+    @task(4)
+    def battle(self):
+        """
+            GET /pokemons/battle_stats/{a}/{b}
+        """
+        first, second = random.sample(POKEMON_IDS, 2)
+        self.client.get(f"/pokemons/battle_stats/{first}/{second}",
+                        name="/pokemons/battle_stats/[a]/[b]")
+
+    @task(2)
+    def random_draw(self):
+        """
+            GET /pokemons/random
+        """
+        self.client.get("/pokemons/random")
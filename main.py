@@ -4,6 +4,20 @@ FastAPI Application Configuration.
 This module configures a FastAPI application and includes 
 routers for trainers, items, and pokemons.
 
+The read endpoints are served through `ResponseCacheMiddleware`, which
+caches their encoded responses and answers revalidations with 304.
+
+Every request is timed by `MetricsMiddleware` (handler, database, PokeAPI
+and serialization time), sent back in a `Server-Timing` header. The
+histograms are exposed on `GET /metrics`, in the Prometheus text format.
+
+The responses are encoded with orjson (`ORJSONResponse`) by default.
+The trainer, item and Pokemon lists skip the Pydantic validation: they
+are read as dicts of the response schema columns and encoded directly.
+
+When the PokeAPI is unavailable (failed retries or open circuit), the
+PokeAPI backed endpoints answer 503 with a `Retry-After` header.
+
 Attributes:
 - `app` (FastAPI): FastAPI application instance.
 
@@ -19,11 +33,57 @@ app.include_router(items.router, prefix="/items")
 app.include_router(pokemons.router, prefix="/pokemons")
 
 """
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, ORJSONResponse, PlainTextResponse
 from app.routers import trainers, pokemons, items
+from app.utils import battle, metrics, pokeapi, pokeapi_async
+from app.utils.resilience import UpstreamUnavailable
+from app.utils.name_resolver import NAME_RESOLVER
+from app.utils.response_cache import RESPONSE_CACHE, ResponseCacheMiddleware
 
 
-app = FastAPI()
+app = FastAPI(default_response_class=ORJSONResponse)
+app.add_middleware(ResponseCacheMiddleware, cache=RESPONSE_CACHE)
+app.add_middleware(metrics.MetricsMiddleware, routes=app.routes)
+metrics.instrument_serialization()
+
+
+@app.on_event("startup")
+async def start_name_resolver():
+    """
+        Start resolving the pokemon names in the background
+    """
+    NAME_RESOLVER.start()
+    await NAME_RESOLVER.schedule_missing()
+
+
+@app.on_event("shutdown")
+async def close_pokeapi_client():
+    """
+        Stop the background workers, the battle process pool
+        and close the pooled PokeAPI client
+    """
+    await NAME_RESOLVER.stop()
+    await pokeapi_async.aclose()
+    battle.shutdown()
+
+
+@app.exception_handler(UpstreamUnavailable)
+async def upstream_unavailable(request: Request, error: UpstreamUnavailable):
+    """
+        Answer 503 when the PokeAPI cannot be reached
+    """
+    retry_after = max(int(pokeapi.UPSTREAM_BREAKER.retry_after()), 1)
+    return JSONResponse(status_code=503, content={"detail": "PokeAPI unavailable"},
+                        headers={"Retry-After": str(retry_after)})
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def get_metrics():
+    """
+        Return the timing histograms, in the Prometheus text format
+    """
+    return metrics.render()
 
 
 app.include_router(trainers.router,